@@ -0,0 +1,107 @@
+"""
+Fábrica de la aplicación Flask
+
+`create_app()` arma la app sin efectos secundarios (sin prints ni chequeos
+del filesystem), para poder usarla desde el servidor de desarrollo
+(simple_app.py), desde un servidor WSGI de producción (wsgi.py) o desde
+scripts. `preparar_arranque()` aplica migraciones y, según el modo
+(variable de entorno DN_ARRANQUE), deja listas las caches en memoria:
+
+- 'precargado' (por defecto): importa las dependencias pesadas y construye
+  las caches antes de atender requests. Conviene con gunicorn --preload.
+- 'diferido': solo migraciones; caches y dependencias se cargan en el primer
+  request que las usa. Para workers que se reinician seguido o serverless.
+
+Cada proceso inicia en su primer request el programador de listas de
+precios (utils/listas_precios.py) y antes de cada request revalida sus
+caches contra la BD (utils/coherencia.py).
+"""
+
+import logging
+import os
+
+from flask import Flask
+from flask_cors import CORS
+
+from config.database import database_path
+from utils.arranque import medir, marcar_listo, precargar_dependencias, reporte_arranque
+
+logger = logging.getLogger(__name__)
+
+# Clave por defecto histórica: se mantiene para no invalidar tokens ya emitidos
+SECRET_KEY_DEFAULT = 'tu_clave_secreta_muy_segura_aqui_cambiar_en_produccion'
+
+MODOS_ARRANQUE = ('precargado', 'diferido')
+
+
+def create_app(config=None):
+    """Crear y configurar la aplicación Flask con todas las rutas registradas"""
+    with medir('modelos'):
+        from models import db
+    from routes import register_routes
+
+    app = Flask(__name__)
+    CORS(app)
+
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{database_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', SECRET_KEY_DEFAULT)
+    if config:
+        app.config.update(config)
+
+    db.init_app(app)
+
+    @app.route('/')
+    def index():
+        return "Backend funcionando - Aplicación modularizada"
+
+    register_routes(app)
+
+    @app.before_request
+    def _iniciar_programador():
+        # Por proceso y en el primer request: un hilo creado antes del fork no pasa a los workers
+        from utils.listas_precios import iniciar_programador
+        iniciar_programador()
+
+    @app.before_request
+    def _revalidar_caches():
+        # Otro worker pudo haber escrito: descartar las caches que quedaron viejas
+        from utils.coherencia import revalidar_caches
+        revalidar_caches()
+
+    return app
+
+
+def preparar_arranque(app, modo=None):
+    """
+    Aplicar migraciones y, en modo 'precargado', precargar dependencias y caches
+
+    Con un servidor que hace preload (gunicorn --preload) esto corre una sola
+    vez en el proceso master: los workers heredan las estructuras ya armadas
+    por copy-on-write y atienden el primer request sin reconstruir nada.
+    """
+    from config.migraciones import aplicar_migraciones
+    from utils.cache import precalentar_todas
+
+    modo = modo or os.environ.get('DN_ARRANQUE', 'precargado')
+    if modo not in MODOS_ARRANQUE:
+        raise ValueError(f"Modo de arranque inválido: {modo} (opciones: {', '.join(MODOS_ARRANQUE)})")
+
+    if not os.path.exists(database_path):
+        logger.error("Base de datos no encontrada en %s", database_path)
+        return reporte_arranque()
+
+    with app.app_context():
+        # También recarga el registro de esquema
+        with medir('migraciones'):
+            aplicar_migraciones()
+        if modo == 'precargado':
+            precargar_dependencias()
+            precalentar_todas()
+    marcar_listo(modo)
+
+    reporte = reporte_arranque()
+    for fase in reporte['fases']:
+        logger.info("Arranque: %-24s %8.1f ms", fase['nombre'], fase['ms'])
+    logger.info("Arranque '%s' listo en %.1f ms", modo, reporte['hasta_listo_ms'])
+    return reporte
@@ -0,0 +1,145 @@
+"""
+Benchmark de checkouts concurrentes contra el control de stock
+
+Trabaja sobre una copia temporal de la base de datos (la original no se
+toca). Deja un producto con stock limitado y lanza varios hilos que crean
+pedidos por POST /api/pedidos al mismo tiempo, pidiendo en total más de lo
+que hay. Al final verifica que no se vendió de más y muestra throughput,
+latencias y cuántos checkouts fueron rechazados por falta de stock.
+
+Uso:
+    python benchmark_stock.py --hilos 8 --pedidos 50 --stock 100
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Agregar el directorio backend al path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))] if ordenados else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Checkouts concurrentes contra el control de stock')
+    parser.add_argument('--bd', default=os.path.join(current_dir, 'instance', 'database.db'))
+    parser.add_argument('--hilos', type=int, default=8)
+    parser.add_argument('--pedidos', type=int, default=50, help='pedidos por hilo')
+    parser.add_argument('--stock', type=float, default=100, help='stock inicial del producto')
+    parser.add_argument('--cantidad', type=int, default=1, help='unidades por pedido')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.bd):
+        print(f"❌ Base de datos no encontrada en {args.bd}")
+        return 1
+
+    directorio = tempfile.mkdtemp(prefix='dn_benchmark_')
+    copia = os.path.join(directorio, 'database.db')
+    shutil.copy(args.bd, copia)
+    # Antes de importar la app: config/database.py lee la ruta al importarse
+    os.environ['DN_DATABASE_PATH'] = copia
+    os.environ['DN_PROGRAMADOR'] = '0'
+
+    import jwt
+    from aplicacion import create_app, preparar_arranque
+    from config.database import get_db
+
+    app = create_app()
+    preparar_arranque(app, 'diferido')
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute("SELECT id FROM usuarios WHERE activo = 1 ORDER BY id LIMIT 1")
+    fila = cursor.fetchone()
+    if fila is None:
+        print("❌ La BD no tiene usuarios para firmar los pedidos")
+        return 1
+    usuario_id = fila[0]
+    # Un producto por unidad para que el consumo sea exactamente la cantidad pedida
+    # Disponible y con precio: los pedidos se cotizan en el servidor
+    cursor.execute("SELECT id, nombre FROM producto ORDER BY id LIMIT 1")
+    producto_id, nombre = cursor.fetchone()
+    cursor.execute('''
+        UPDATE producto SET stock = ?, tipo_calculo = 'unidad', disponible = 1,
+               precio_venta_publico = COALESCE(NULLIF(precio_venta_publico, 0), 100)
+        WHERE id = ?
+    ''', (args.stock, producto_id))
+    conn.commit()
+    conn.close()
+
+    token = jwt.encode(
+        {'user_id': usuario_id, 'exp': datetime.utcnow() + timedelta(hours=1)},
+        app.config['SECRET_KEY'], algorithm='HS256'
+    )
+    cuerpo = {
+        'tipo_entrega': 'retiro',
+        'metodo_pago': 'local',
+        'items': [{'producto_id': producto_id, 'nombre': nombre, 'cantidad': args.cantidad}]
+    }
+
+    resultados = {'creados': 0, 'sin_stock': 0, 'errores': 0}
+    latencias = []
+    lock = threading.Lock()
+    largada = threading.Barrier(args.hilos)
+
+    def comprar():
+        cliente = app.test_client()
+        largada.wait()
+        for _ in range(args.pedidos):
+            inicio = time.perf_counter()
+            respuesta = cliente.post('/api/pedidos', json=cuerpo, headers={'Authorization': f'Bearer {token}'})
+            duracion = time.perf_counter() - inicio
+            clave = {201: 'creados', 409: 'sin_stock'}.get(respuesta.status_code, 'errores')
+            with lock:
+                resultados[clave] += 1
+                latencias.append(duracion)
+
+    print("=" * 60)
+    print(f"🛒 {args.hilos} hilos x {args.pedidos} pedidos de {args.cantidad} ud, stock inicial {args.stock:g}")
+    print("=" * 60)
+
+    hilos = [threading.Thread(target=comprar) for _ in range(args.hilos)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    total = time.perf_counter() - inicio
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT stock FROM producto WHERE id = ?', (producto_id,))
+    stock_final = cursor.fetchone()[0]
+    cursor.execute('SELECT COALESCE(SUM(stock_descontado), 0) FROM pedido_items WHERE producto_id = ?', (producto_id,))
+    vendido = cursor.fetchone()[0]
+    conn.close()
+
+    intentos = args.hilos * args.pedidos
+    print(f"Checkouts:      {intentos} en {total:.2f} s ({intentos / total:.1f}/s)")
+    print(f"Creados:        {resultados['creados']}")
+    print(f"Sin stock:      {resultados['sin_stock']}")
+    print(f"Errores:        {resultados['errores']}")
+    print(f"Latencia p50:   {percentil(latencias, 0.5) * 1000:.1f} ms")
+    print(f"Latencia p95:   {percentil(latencias, 0.95) * 1000:.1f} ms")
+    print(f"Latencia máx:   {max(latencias) * 1000:.1f} ms")
+    print(f"Vendido:        {vendido:g} / stock final {stock_final:g}")
+
+    correcto = vendido + stock_final == args.stock and stock_final >= 0 \
+        and vendido == resultados['creados'] * args.cantidad
+    print("✅ Sin sobreventa" if correcto else "❌ El stock no cierra")
+
+    shutil.rmtree(directorio, ignore_errors=True)
+    return 0 if correcto else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
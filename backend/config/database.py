@@ -1,11 +1,15 @@
 import os
 import sqlite3
-from datetime import datetime
-import pytz
+from datetime import datetime, timezone
+from functools import lru_cache
 
 # Configuración de la base de datos
 basedir = os.path.abspath(os.path.dirname(__file__))
-database_path = os.path.join(basedir, "..", "instance", "database.db")
+# DN_DATABASE_PATH permite apuntar a otra BD (producción, pruebas) sin depender del cwd
+database_path = os.environ.get(
+    'DN_DATABASE_PATH',
+    os.path.normpath(os.path.join(basedir, "..", "instance", "database.db"))
+)
 
 def get_db():
     """Función para obtener conexión directa a SQLite"""
@@ -16,11 +20,24 @@ def get_db():
         print(f"❌ Error conectando a BD: {e}")
         raise
 
-def get_argentina_time():
-    """Función para obtener hora argentina"""
+@lru_cache(maxsize=1)
+def _zona_argentina():
+    # pytz se importa al primer uso para no sumarlo al tiempo de arranque
+    import pytz
+    return pytz.timezone('America/Argentina/Buenos_Aires')
+
+def get_argentina_datetime():
+    """Hora argentina como datetime naive, comparable con las fechas guardadas en la BD"""
     try:
-        argentina_tz = pytz.timezone('America/Argentina/Buenos_Aires')
-        return datetime.now(argentina_tz).strftime('%Y-%m-%d %H:%M:%S')
+        return datetime.now(_zona_argentina()).replace(tzinfo=None)
     except Exception as e:
         print(f"❌ Error obteniendo hora argentina: {e}")
-        return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return datetime.now()
+
+def argentina_a_utc(fecha):
+    """Fecha naive en hora argentina (como se guarda en la BD) a UTC, p. ej. para Last-Modified"""
+    return _zona_argentina().localize(fecha).astimezone(timezone.utc)
+
+def get_argentina_time():
+    """Función para obtener hora argentina"""
+    return get_argentina_datetime().strftime('%Y-%m-%d %H:%M:%S')
@@ -0,0 +1,85 @@
+"""
+Registro del esquema de la base de datos
+
+Introspecta las tablas una sola vez (al arrancar y después de aplicar
+migraciones) para que las rutas no ejecuten PRAGMA table_info en cada
+request. También arma y guarda los textos de INSERT/UPDATE: como sqlite3
+cachea las sentencias preparadas por texto SQL, reutilizar el mismo string
+evita volver a compilarlas.
+"""
+
+import threading
+from functools import lru_cache
+from config.database import get_db
+
+_lock = threading.Lock()
+_esquema = None
+
+
+def cargar_esquema(conn=None):
+    """(Re)leer las columnas de todas las tablas de la BD"""
+    global _esquema
+    cerrar = conn is None
+    conn = conn or get_db()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
+        tablas = [row[0] for row in cursor.fetchall()]
+        esquema = {}
+        for tabla in tablas:
+            cursor.execute(f"PRAGMA table_info({tabla})")
+            esquema[tabla] = tuple(col[1] for col in cursor.fetchall())
+    finally:
+        if cerrar:
+            conn.close()
+
+    with _lock:
+        _esquema = esquema
+        sentencia_insert.cache_clear()
+        sentencia_update.cache_clear()
+    return esquema
+
+
+def _obtener_esquema():
+    esquema = _esquema
+    if esquema is None:
+        esquema = cargar_esquema()
+    return esquema
+
+
+def existe_tabla(tabla):
+    return tabla in _obtener_esquema()
+
+
+def columnas(tabla):
+    """Tupla con los nombres de columnas de la tabla, en orden (vacía si no existe)"""
+    return _obtener_esquema().get(tabla, ())
+
+
+def indices_columnas(tabla):
+    """Mapa {columna: posición} para leer filas de `SELECT *`"""
+    return {nombre: i for i, nombre in enumerate(columnas(tabla))}
+
+
+def tiene_columna(tabla, columna):
+    return columna in columnas(tabla)
+
+
+def filtrar_columnas(tabla, datos):
+    """Quedarse solo con las claves de `datos` que son columnas de la tabla (conserva el orden)"""
+    existentes = set(columnas(tabla))
+    return {clave: valor for clave, valor in datos.items() if clave in existentes}
+
+
+@lru_cache(maxsize=128)
+def sentencia_insert(tabla, nombres_columnas):
+    """INSERT parametrizado para las columnas dadas (tupla, para poder cachearse)"""
+    placeholders = ', '.join('?' for _ in nombres_columnas)
+    return f"INSERT INTO {tabla} ({', '.join(nombres_columnas)}) VALUES ({placeholders})"
+
+
+@lru_cache(maxsize=128)
+def sentencia_update(tabla, nombres_columnas, columna_clave='id'):
+    """UPDATE parametrizado: los valores van en el orden de las columnas y la clave al final"""
+    asignaciones = ', '.join(f'{nombre} = ?' for nombre in nombres_columnas)
+    return f"UPDATE {tabla} SET {asignaciones} WHERE {columna_clave} = ?"
@@ -0,0 +1,476 @@
+"""
+Migraciones versionadas del esquema SQLite
+
+Cada migración tiene un número de versión y una lista de pasos idempotentes.
+Las versiones aplicadas quedan registradas en la tabla `schema_migraciones`,
+de modo que el runner puede ejecutarse en cada arranque sin efectos repetidos.
+"""
+
+from config.database import get_db, get_argentina_time
+from config.esquema import cargar_esquema
+
+
+def _tabla_existe(cursor, tabla):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (tabla,))
+    return cursor.fetchone() is not None
+
+
+def _indice_existe(cursor, nombre):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='index' AND name=?", (nombre,))
+    return cursor.fetchone() is not None
+
+
+def _trigger_existe(cursor, nombre):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='trigger' AND name=?", (nombre,))
+    return cursor.fetchone() is not None
+
+
+def _crear_indice(cursor, nombre, tabla, columnas, avisar=True):
+    """
+    Crear un índice solo si la tabla existe. Las tablas de pedidos y wishlist
+    pueden crearse después (actualizar_bd_pedidos.py): `_asegurar_indices()`
+    vuelve a intentarlo en cada arranque. Devuelve True si lo creó.
+    """
+    if _indice_existe(cursor, nombre):
+        return False
+    if not _tabla_existe(cursor, tabla):
+        if avisar:
+            print(f"⚠️  Tabla '{tabla}' no existe, se omite el índice {nombre} (se reintenta en el próximo arranque)")
+        return False
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} ({', '.join(columnas)})")
+    return True
+
+
+# Índices de la migración 1 sobre tablas que pueden no existir al migrar
+INDICES_OPCIONALES = (
+    ('idx_pedidos_usuario_fecha', 'pedidos', ['usuario_id', 'fecha_pedido']),
+    ('idx_pedidos_fecha', 'pedidos', ['fecha_pedido']),
+    ('idx_pedidos_estado_fecha', 'pedidos', ['estado', 'fecha_pedido']),
+    ('idx_pedido_items_pedido', 'pedido_items', ['pedido_id']),
+    # Mismos nombres que usa recrear_wishlist.py
+    ('idx_wishlist_usuario', 'wishlist', ['usuario_id']),
+    ('idx_wishlist_producto', 'wishlist', ['producto_id']),
+)
+
+
+def _indices_claves_foraneas(cursor):
+    """Índices para los joins y filtros que se ejecutan en cada request"""
+    # Catálogo: filtros por categoría/disponibilidad y joins con marca/proveedor
+    _crear_indice(cursor, 'idx_producto_categoria_disponible', 'producto', ['categoria_id', 'disponible'])
+    _crear_indice(cursor, 'idx_producto_disponible', 'producto', ['disponible', 'id'])
+    _crear_indice(cursor, 'idx_producto_marca', 'producto', ['marca_id'])
+    _crear_indice(cursor, 'idx_producto_proveedor', 'producto', ['proveedor_id'])
+    # Imágenes ordenadas por posición para cada producto
+    _crear_indice(cursor, 'idx_imagen_producto_producto_posicion', 'imagen_producto', ['producto_id', 'posicion'])
+    # La PK (producto_id, etiqueta_id) ya cubre la búsqueda por producto; esta cubre la inversa
+    _crear_indice(cursor, 'idx_producto_etiquetas_etiqueta', 'producto_etiquetas', ['etiqueta_id', 'producto_id'])
+    # Pedidos por usuario, por fecha y por estado; wishlist por usuario y producto
+    for nombre, tabla, columnas in INDICES_OPCIONALES:
+        _crear_indice(cursor, nombre, tabla, columnas)
+
+
+def _asegurar_indices(cursor):
+    """Crear los índices opcionales cuyas tablas aparecieron después de migrar; devuelve cuántos creó"""
+    return sum(_crear_indice(cursor, nombre, tabla, columnas, avisar=False) for nombre, tabla, columnas in INDICES_OPCIONALES)
+
+
+def _listas_precios_programadas(cursor):
+    """Listas de precios cargadas por adelantado que se aplican en una fecha y hora"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS lista_precios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT NOT NULL,
+            fecha_activacion TEXT NOT NULL,
+            estado TEXT NOT NULL DEFAULT 'pendiente',
+            paso_redondeo REAL NOT NULL DEFAULT 0.01,
+            modo_redondeo TEXT NOT NULL DEFAULT 'cercano',
+            fecha_creacion TEXT NOT NULL,
+            fecha_aplicada TEXT,
+            productos_actualizados INTEGER
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS lista_precios_items (
+            lista_id INTEGER NOT NULL REFERENCES lista_precios(id) ON DELETE CASCADE,
+            producto_id INTEGER NOT NULL REFERENCES producto(id) ON DELETE CASCADE,
+            precio_costo REAL NOT NULL,
+            porcentaje_ganancia REAL,
+            PRIMARY KEY (lista_id, producto_id)
+        )
+    ''')
+    # El programador busca las pendientes ya vencidas
+    _crear_indice(cursor, 'idx_lista_precios_estado_activacion', 'lista_precios', ['estado', 'fecha_activacion'])
+
+
+def _columna_existe(cursor, tabla, columna):
+    cursor.execute(f"PRAGMA table_info({tabla})")
+    return any(col[1] == columna for col in cursor.fetchall())
+
+
+def _agregar_columna(cursor, tabla, columna, definicion):
+    """ALTER TABLE ADD COLUMN solo si la tabla existe y todavía no tiene la columna"""
+    if not _tabla_existe(cursor, tabla):
+        print(f"⚠️  Tabla '{tabla}' no existe, se omite la columna {columna}")
+        return
+    if not _columna_existe(cursor, tabla, columna):
+        cursor.execute(f"ALTER TABLE {tabla} ADD COLUMN {columna} {definicion}")
+
+
+def _stock_productos(cursor):
+    """Existencia por producto (NULL = sin control de stock) y lo reservado por cada ítem de pedido"""
+    _agregar_columna(cursor, 'producto', 'stock', 'REAL')
+    _agregar_columna(cursor, 'producto', 'stock_minimo', 'REAL')
+    _agregar_columna(cursor, 'pedido_items', 'stock_descontado', 'REAL')
+    # Consulta de stock bajo: solo entran los productos que controlan stock
+    cursor.execute(
+        'CREATE INDEX IF NOT EXISTS idx_producto_stock ON producto (stock) WHERE stock IS NOT NULL'
+    )
+
+
+# Columnas de producto que forman la tarjeta del catálogo (utils/catalogo.py):
+# cambiar solo el stock no cuenta como un cambio del catálogo
+COLUMNAS_TARJETA = (
+    'nombre', 'precio', 'disponible', 'descripcion', 'precio_costo', 'porcentaje_ganancia',
+    'precio_venta_publico', 'fecha_ultima_modificacion', 'proveedor_id', 'categoria_id',
+    'marca_id', 'unidad_id', 'cantidad_unidades', 'cantidad', 'precio_por_unidad',
+    'precio_fraccionado_por_100', 'tipo_calculo'
+)
+
+# Taxonomías cuyo nombre aparece en la tarjeta:
+# (tabla, columnas, tabla de la que salen los ids, SELECT ... AS id de los productos afectados)
+TAXONOMIAS_TARJETA = (
+    ('proveedor', ('nombre',), 'producto', 'SELECT id FROM producto WHERE proveedor_id = NEW.id'),
+    ('categoria', ('nombre',), 'producto', 'SELECT id FROM producto WHERE categoria_id = NEW.id'),
+    ('marca', ('nombre',), 'producto', 'SELECT id FROM producto WHERE marca_id = NEW.id'),
+    ('unidad', ('nombre', 'abreviacion'), 'producto', 'SELECT id FROM producto WHERE unidad_id = NEW.id'),
+    ('tipo_alimento', ('nombre',), 'producto_etiquetas',
+     'SELECT producto_id AS id FROM producto_etiquetas WHERE etiqueta_id = NEW.id'),
+)
+
+
+def _crear_trigger(cursor, nombre, evento, cuerpo, solo_faltante=False):
+    """
+    (Re)crear un trigger de registro de cambios; `cuerpo` recibe la versión
+    ya incrementada. Con `solo_faltante` no toca uno que ya existe.
+    Devuelve True si lo creó.
+    """
+    if solo_faltante:
+        if _trigger_existe(cursor, nombre):
+            return False
+    else:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {nombre} {evento}
+        BEGIN
+            UPDATE catalogo_version SET valor = valor + 1 WHERE id = 1;
+            {cuerpo};
+        END
+    ''')
+    return True
+
+
+def _registrar_cambio(ids_sql, eliminado=0):
+    """Cuerpo de trigger que anota en producto_cambios los productos de `ids_sql`"""
+    return f'''INSERT OR REPLACE INTO producto_cambios (producto_id, version, eliminado)
+        SELECT ids.id, (SELECT valor FROM catalogo_version WHERE id = 1), {eliminado}
+        FROM ({ids_sql}) AS ids'''
+
+
+def _triggers_cambios_opcionales(cursor, solo_faltantes=False):
+    """
+    Triggers de registro de cambios sobre etiquetas, imágenes y taxonomías,
+    solo para las tablas que existen. Con `solo_faltantes` no toca los que
+    ya están (reintento de `_asegurar_triggers()`). Devuelve cuántos creó.
+    """
+    def omitir(tabla):
+        if not solo_faltantes:
+            print(f"⚠️  Tabla '{tabla}' no existe, se omiten sus triggers de cambios (se reintenta en el próximo arranque)")
+
+    creados = 0
+    # Etiquetas e imágenes también forman parte de la tarjeta
+    for tabla in ('producto_etiquetas', 'imagen_producto'):
+        if not _tabla_existe(cursor, tabla):
+            omitir(tabla)
+            continue
+        for evento, fila in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+            creados += _crear_trigger(
+                cursor, f'trg_cambios_{tabla}_{evento.lower()}', f'AFTER {evento} ON {tabla}',
+                _registrar_cambio(f'SELECT {fila}.producto_id AS id WHERE EXISTS (SELECT 1 FROM producto WHERE id = {fila}.producto_id)'),
+                solo_faltante=solo_faltantes
+            )
+
+    for tabla, columnas_tabla, tabla_ids, ids_sql in TAXONOMIAS_TARJETA:
+        faltante = next((t for t in (tabla, tabla_ids) if not _tabla_existe(cursor, t)), None)
+        if faltante:
+            omitir(faltante)
+            continue
+        columnas_tabla = [c for c in columnas_tabla if _columna_existe(cursor, tabla, c)]
+        creados += _crear_trigger(cursor, f'trg_cambios_{tabla}_update',
+                                  f"AFTER UPDATE OF {', '.join(columnas_tabla)} ON {tabla}",
+                                  _registrar_cambio(ids_sql), solo_faltante=solo_faltantes)
+    return creados
+
+
+def _registro_cambios_catalogo(cursor):
+    """
+    Registro de cambios para la sincronización incremental del catálogo.
+
+    `catalogo_version` es un contador global y `producto_cambios` guarda, por
+    producto, la versión de su último cambio y si fue eliminado (lápida).
+    Los triggers cubren todas las vías de escritura (rutas, importador,
+    scripts), y al haber una fila por producto el registro no crece con
+    cada edición.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS catalogo_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            valor INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('INSERT OR IGNORE INTO catalogo_version (id, valor) VALUES (1, 0)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS producto_cambios (
+            producto_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL,
+            eliminado INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    _crear_indice(cursor, 'idx_producto_cambios_version', 'producto_cambios', ['version'])
+
+    columnas = [c for c in COLUMNAS_TARJETA if _columna_existe(cursor, 'producto', c)]
+    _crear_trigger(cursor, 'trg_cambios_producto_insert', 'AFTER INSERT ON producto',
+                   _registrar_cambio('SELECT NEW.id AS id'))
+    _crear_trigger(cursor, 'trg_cambios_producto_update', f"AFTER UPDATE OF {', '.join(columnas)} ON producto",
+                   _registrar_cambio('SELECT NEW.id AS id'))
+    _crear_trigger(cursor, 'trg_cambios_producto_delete', 'AFTER DELETE ON producto',
+                   _registrar_cambio('SELECT OLD.id AS id', eliminado=1))
+    _triggers_cambios_opcionales(cursor)
+
+
+# Caches en memoria que se revalidan entre procesos: (nombre, tablas de las que se arman)
+# El catálogo no figura: usa catalogo_version, que ya mantienen los triggers de cambios
+TABLAS_CACHE = (
+    ('taxonomia', ('categoria', 'marca', 'tipo_alimento', 'unidad', 'proveedor')),
+    ('banners', ('banner',)),
+)
+
+
+def _triggers_cache(cursor, solo_faltantes=False):
+    """
+    Triggers que incrementan cache_version sobre las tablas de TABLAS_CACHE
+    que existen. Con `solo_faltantes` no toca los que ya están (reintento de
+    `_asegurar_triggers()`). Devuelve cuántos creó.
+    """
+    creados = 0
+    for nombre, tablas in TABLAS_CACHE:
+        for tabla in tablas:
+            if not _tabla_existe(cursor, tabla):
+                if not solo_faltantes:
+                    print(f"⚠️  Tabla '{tabla}' no existe, se omiten sus triggers de cache (se reintenta en el próximo arranque)")
+                continue
+            for evento in ('INSERT', 'UPDATE', 'DELETE'):
+                trigger = f'trg_cache_{tabla}_{evento.lower()}'
+                if solo_faltantes and _trigger_existe(cursor, trigger):
+                    continue
+                if not solo_faltantes:
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {trigger} AFTER {evento} ON {tabla}
+                    BEGIN
+                        UPDATE cache_version SET version = version + 1 WHERE nombre = '{nombre}';
+                    END
+                ''')
+                creados += 1
+    return creados
+
+
+def _versiones_cache(cursor):
+    """
+    Versión por cache en memoria, incrementada por triggers en cada escritura
+    de sus tablas. Cada proceso la compara con la que tenía al construir su
+    copia para saber si otro worker la dejó vieja (ver utils/coherencia.py).
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cache_version (
+            nombre TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    ''')
+    for nombre, _ in TABLAS_CACHE:
+        cursor.execute('INSERT OR IGNORE INTO cache_version (nombre, version) VALUES (?, 0)', (nombre,))
+    _triggers_cache(cursor)
+
+
+def _carritos(cursor):
+    """
+    Carrito guardado en el servidor por usuario: una fila por producto y
+    modo de venta (por unidad o fraccionado), así cada cambio es un único
+    INSERT ... ON CONFLICT o DELETE sobre la clave primaria.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS carrito_items (
+            usuario_id INTEGER NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
+            producto_id INTEGER NOT NULL REFERENCES producto(id) ON DELETE CASCADE,
+            es_fraccionado INTEGER NOT NULL DEFAULT 0,
+            cantidad INTEGER NOT NULL,
+            cantidad_personalizada INTEGER,
+            fecha_actualizacion TEXT NOT NULL,
+            PRIMARY KEY (usuario_id, producto_id, es_fraccionado)
+        ) WITHOUT ROWID
+    ''')
+    # Carritos abandonados: los que no se tocan desde hace tiempo
+    _crear_indice(cursor, 'idx_carrito_items_fecha', 'carrito_items', ['fecha_actualizacion'])
+
+
+def _claves_idempotencia(cursor):
+    """
+    Respuesta guardada por Idempotency-Key de cada usuario, para devolverla
+    tal cual si el cliente reintenta el mismo pedido (ver utils/idempotencia.py)
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS claves_idempotencia (
+            usuario_id INTEGER NOT NULL,
+            clave TEXT NOT NULL,
+            huella TEXT NOT NULL,
+            estado_http INTEGER,
+            respuesta TEXT,
+            fecha_creacion TEXT NOT NULL,
+            PRIMARY KEY (usuario_id, clave)
+        ) WITHOUT ROWID
+    ''')
+    # Limpieza de las vencidas
+    _crear_indice(cursor, 'idx_claves_idempotencia_fecha', 'claves_idempotencia', ['fecha_creacion'])
+
+
+
+def _eventos_pedidos(cursor):
+    """
+    Eventos de pedidos para las notificaciones en vivo del admin (ver
+    utils/eventos.py). El id autoincremental es el de cada mensaje SSE.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS eventos_pedidos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo TEXT NOT NULL,
+            datos TEXT NOT NULL,
+            fecha TEXT NOT NULL
+        )
+    ''')
+    # Limpieza de los viejos
+    _crear_indice(cursor, 'idx_eventos_pedidos_fecha', 'eventos_pedidos', ['fecha'])
+
+# Lista ordenada de migraciones: (versión, nombre, función que aplica los pasos)
+MIGRACIONES = [
+    (1, 'indices_claves_foraneas', _indices_claves_foraneas),
+    (2, 'listas_precios_programadas', _listas_precios_programadas),
+    (3, 'stock_productos', _stock_productos),
+    (4, 'registro_cambios_catalogo', _registro_cambios_catalogo),
+    (5, 'versiones_cache', _versiones_cache),
+    (6, 'carritos', _carritos),
+    (7, 'claves_idempotencia', _claves_idempotencia),
+    (8, 'eventos_pedidos', _eventos_pedidos),
+]
+
+
+def _asegurar_triggers(cursor):
+    """
+    Crear los triggers de las migraciones ya aplicadas que se habían omitido
+    porque su tabla no existía (p. ej. tablas creadas después con
+    db.create_all()); devuelve cuántos creó
+    """
+    return (_triggers_cambios_opcionales(cursor, solo_faltantes=True)
+            + _triggers_cache(cursor, solo_faltantes=True))
+
+
+def _asegurar_tabla_versiones(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migraciones (
+            version INTEGER PRIMARY KEY,
+            nombre TEXT NOT NULL,
+            fecha_aplicada TEXT NOT NULL
+        )
+    ''')
+
+
+def obtener_version_actual(conn=None):
+    """Devolver la última versión de esquema aplicada (0 si nunca se migró)"""
+    cerrar = conn is None
+    conn = conn or get_db()
+    try:
+        cursor = conn.cursor()
+        _asegurar_tabla_versiones(cursor)
+        cursor.execute('SELECT COALESCE(MAX(version), 0) FROM schema_migraciones')
+        return cursor.fetchone()[0]
+    finally:
+        if cerrar:
+            conn.close()
+
+
+def aplicar_migraciones(conn=None):
+    """
+    Aplicar en orden las migraciones pendientes
+
+    Cada migración se ejecuta en su propia transacción junto con el registro
+    de su versión. Después se crean los índices opcionales y los triggers
+    que se habían omitido porque su tabla no existía. Si se aplicó alguna
+    migración o se creó algún índice, se corre ANALYZE para que el
+    planificador de SQLite tenga estadísticas de los índices nuevos.
+
+    Returns:
+        Lista de versiones aplicadas en esta ejecución
+    """
+    cerrar = conn is None
+    conn = conn or get_db()
+    aplicadas = []
+    try:
+        cursor = conn.cursor()
+        _asegurar_tabla_versiones(cursor)
+        conn.commit()
+
+        cursor.execute('SELECT version FROM schema_migraciones')
+        existentes = {row[0] for row in cursor.fetchall()}
+
+        for version, nombre, aplicar in MIGRACIONES:
+            if version in existentes:
+                continue
+            try:
+                # BEGIN IMMEDIATE toma el lock de escritura: si otro proceso
+                # migra a la vez, espera y luego ve la versión ya registrada
+                cursor.execute('BEGIN IMMEDIATE')
+                cursor.execute('SELECT 1 FROM schema_migraciones WHERE version = ?', (version,))
+                if cursor.fetchone():
+                    conn.rollback()
+                    continue
+                print(f"🔄 Aplicando migración {version}: {nombre}")
+                aplicar(cursor)
+                cursor.execute(
+                    'INSERT INTO schema_migraciones (version, nombre, fecha_aplicada) VALUES (?, ?, ?)',
+                    (version, nombre, get_argentina_time())
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            aplicadas.append(version)
+
+        # Solo escriben si falta alguno y su tabla ya existe
+        creados = _asegurar_indices(cursor)
+        triggers = _asegurar_triggers(cursor)
+        conn.commit()
+        if creados:
+            print(f"✅ Índices creados sobre tablas nuevas: {creados}")
+        if triggers:
+            print(f"✅ Triggers creados sobre tablas nuevas: {triggers}")
+
+        if aplicadas or creados:
+            cursor.execute('ANALYZE')
+            conn.commit()
+            if aplicadas:
+                print(f"✅ Migraciones aplicadas: {aplicadas}")
+
+        # El registro de columnas se relee siempre: otro proceso pudo haber migrado
+        cargar_esquema(conn)
+        return aplicadas
+    finally:
+        if cerrar:
+            conn.close()
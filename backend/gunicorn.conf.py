@@ -0,0 +1,41 @@
+"""
+Configuración de gunicorn para producción: gunicorn -c gunicorn.conf.py wsgi:app
+
+Todos los valores se pueden sobreescribir con variables de entorno.
+"""
+
+import multiprocessing
+import os
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '5000')}"
+
+# Varios procesos con threads: SQLite admite lectores concurrentes y las
+# rutas abren una conexión por request. Cada pantalla de pedidos del admin
+# abierta ocupa un thread con su stream de eventos (como mucho
+# DN_EVENTOS_MAXIMO por proceso, ver utils/eventos.py)
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 4))
+
+# Importar wsgi.py (crear la app y precalentar caches) una sola vez en el
+# master, antes de forkear: los workers comparten esa memoria copy-on-write
+preload_app = True
+
+timeout = int(os.environ.get('WEB_TIMEOUT', 60))
+keepalive = 5
+accesslog = '-'
+# Como el formato por defecto pero con la ruta sin query string: no dejar
+# tokens ni otros parámetros en los logs
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(m)s %(U)s %(H)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'info').lower()
+
+
+def post_fork(server, worker):
+    # Las conexiones del pool de SQLAlchemy abiertas en el master no se
+    # pueden compartir entre procesos: cada worker abre las suyas
+    from wsgi import app
+    from models import db
+
+    with app.app_context():
+        db.engine.dispose()
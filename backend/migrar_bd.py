@@ -0,0 +1,39 @@
+"""
+Script para aplicar las migraciones pendientes del esquema (índices, tablas nuevas)
+
+Es idempotente: las versiones ya aplicadas quedan registradas en
+`schema_migraciones` y no se vuelven a ejecutar.
+"""
+import os
+import sys
+
+# Agregar el directorio backend al path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from config.database import database_path
+from config.migraciones import aplicar_migraciones, obtener_version_actual
+
+print("="*60)
+print("🔄 APLICANDO MIGRACIONES DE ESQUEMA")
+print("="*60)
+
+if not os.path.exists(database_path):
+    print(f"❌ Base de datos no encontrada en: {database_path}")
+    sys.exit(1)
+
+try:
+    print(f"\n📊 Versión actual: {obtener_version_actual()}")
+    aplicadas = aplicar_migraciones()
+    if not aplicadas:
+        print("✅ El esquema ya estaba actualizado")
+    print(f"📊 Versión final: {obtener_version_actual()}")
+except Exception as e:
+    print(f"\n❌ Error aplicando migraciones: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
+
+print("\n" + "="*60)
+print("✅ MIGRACIONES COMPLETADAS")
+print("="*60)
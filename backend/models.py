@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 import base64
+from utils import precios as reglas_precio
 
 db = SQLAlchemy()
 
@@ -36,6 +37,7 @@ producto_etiquetas = db.Table('producto_etiquetas',
     db.Column('producto_id', db.Integer, db.ForeignKey('producto.id'), primary_key=True),
     db.Column('etiqueta_id', db.Integer, db.ForeignKey('tipo_alimento.id'), primary_key=True)
 )
+db.Index('idx_producto_etiquetas_etiqueta', producto_etiquetas.c.etiqueta_id, producto_etiquetas.c.producto_id)
 
 class Producto(db.Model):
     __tablename__ = 'producto'
@@ -66,6 +68,10 @@ class Producto(db.Model):
     precio_fraccionado_por_100 = db.Column(db.Float)
     tipo_calculo = db.Column(db.String(50))
     
+    # Stock en paquetes (tipo 'unidad') o gramos/ml (peso); NULL = sin control (ver utils/stock.py)
+    stock = db.Column(db.Float)
+    stock_minimo = db.Column(db.Float)
+    
     # Relación muchos-a-muchos con etiquetas
     etiquetas = db.relationship('TipoAlimento', secondary=producto_etiquetas, lazy='subquery',
                                backref=db.backref('productos_etiquetados', lazy=True))
@@ -73,11 +79,24 @@ class Producto(db.Model):
     # Relación con imágenes
     imagenes = db.relationship('ImagenProducto', backref='producto', lazy=True, cascade='all, delete-orphan')
     
+    # Índices de los filtros y joins del catálogo (ver config/migraciones.py)
+    __table_args__ = (
+        db.Index('idx_producto_categoria_disponible', 'categoria_id', 'disponible'),
+        db.Index('idx_producto_disponible', 'disponible', 'id'),
+        db.Index('idx_producto_marca', 'marca_id'),
+        db.Index('idx_producto_proveedor', 'proveedor_id'),
+        db.Index('idx_producto_stock', 'stock', sqlite_where=db.text('stock IS NOT NULL')),
+    )
+    
     def calcular_precios(self):
-        """Calcula automáticamente los precios derivados"""
+        """Calcula automáticamente los precios derivados (fórmula en utils/precios.py)"""
         if self.precio_costo and self.porcentaje_ganancia is not None:
-            self.precio_venta_publico = self.precio_costo + (self.porcentaje_ganancia * self.precio_costo)
-            self.precio = self.precio_venta_publico
+            precios = reglas_precio.calcular_precios(
+                self.precio_costo, self.porcentaje_ganancia, self.tipo_calculo,
+                self.cantidad_unidades, self.cantidad
+            )
+            for campo in ('precio', 'precio_venta_publico', 'precio_por_unidad', 'precio_fraccionado_por_100'):
+                setattr(self, campo, precios[campo])
 
 class ImagenProducto(db.Model):
     __tablename__ = 'imagen_producto'
@@ -89,6 +108,8 @@ class ImagenProducto(db.Model):
     titulo = db.Column(db.String(100))
     producto_id = db.Column(db.Integer, db.ForeignKey('producto.id'), nullable=False)
     
+    __table_args__ = (db.Index('idx_imagen_producto_producto_posicion', 'producto_id', 'posicion'),)
+    
     def obtener_imagen_base64(self):
         if self.es_url:
             return None
@@ -171,7 +192,11 @@ class Wishlist(db.Model):
     producto = db.relationship('Producto', backref='wishlist_items')
     
     # Índice único para evitar duplicados
-    __table_args__ = (db.UniqueConstraint('usuario_id', 'producto_id', name='unique_user_product'),)
+    __table_args__ = (
+        db.UniqueConstraint('usuario_id', 'producto_id', name='unique_user_product'),
+        db.Index('idx_wishlist_usuario', 'usuario_id'),
+        db.Index('idx_wishlist_producto', 'producto_id'),
+    )
     
     def __repr__(self):
         return f'<Wishlist Usuario:{self.usuario_id} Producto:{self.producto_id}>'
@@ -216,6 +241,12 @@ class Pedido(db.Model):
     usuario = db.relationship('Usuario', backref='pedidos')
     items = db.relationship('PedidoItem', backref='pedido', lazy=True, cascade='all, delete-orphan')
     
+    __table_args__ = (
+        db.Index('idx_pedidos_usuario_fecha', 'usuario_id', 'fecha_pedido'),
+        db.Index('idx_pedidos_fecha', 'fecha_pedido'),
+        db.Index('idx_pedidos_estado_fecha', 'estado', 'fecha_pedido'),
+    )
+    
     def __repr__(self):
         return f'<Pedido {self.id} Usuario:{self.usuario_id}>'
     
@@ -264,9 +295,14 @@ class PedidoItem(db.Model):
     
     subtotal = db.Column(db.Float, nullable=False)
     
+    # Stock reservado al crear el pedido, para devolverlo si se cancela
+    stock_descontado = db.Column(db.Float)
+    
     # Relación con producto
     producto = db.relationship('Producto')
     
+    __table_args__ = (db.Index('idx_pedido_items_pedido', 'pedido_id'),)
+    
     def __repr__(self):
         return f'<PedidoItem Pedido:{self.pedido_id} Producto:{self.producto_id}>'
     
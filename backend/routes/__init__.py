@@ -1,35 +1,40 @@
-from flask import Blueprint
+from importlib import import_module
+
+from utils.arranque import medir
+
+# (módulo, blueprint, url_prefix): debug, wishlist y pedidos ya incluyen /api en sus rutas
+BLUEPRINTS = [
+    ('productos', 'productos_bp', '/api'),
+    ('listas_precios', 'listas_precios_bp', '/api'),
+    ('carrito', 'carrito_bp', '/api'),
+    ('proveedores', 'proveedores_bp', '/api'),
+    ('categorias', 'categorias_bp', '/api'),
+    ('marcas', 'marcas_bp', '/api'),
+    ('etiquetas', 'etiquetas_bp', '/api'),
+    ('unidades', 'unidades_bp', '/api'),
+    ('bootstrap', 'bootstrap_bp', '/api'),
+    ('banners', 'banners_bp', '/api'),
+    ('imagenes', 'imagenes_bp', '/api'),
+    ('usuarios', 'usuarios_bp', '/api'),
+    ('export', 'export_bp', '/api'),
+    ('importador', 'importador_bp', '/api'),
+    ('debug', 'debug_bp', None),
+    ('wishlist', 'wishlist_bp', None),
+    ('pedidos', 'pedidos_bp', None),
+]
 
 def register_routes(app):
-    """Registrar todas las rutas en la aplicación Flask"""
-    
-    from .productos import productos_bp
-    from .proveedores import proveedores_bp
-    from .categorias import categorias_bp
-    from .marcas import marcas_bp
-    from .etiquetas import etiquetas_bp
-    from .unidades import unidades_bp
-    from .banners import banners_bp
-    from .imagenes import imagenes_bp
-    from .usuarios import usuarios_bp
-    from .export import export_bp
-    from .importador import importador_bp
-    from .debug import debug_bp
-    from .wishlist import wishlist_bp
-    from .pedidos import pedidos_bp
-    
-    # Registrar blueprints
-    app.register_blueprint(productos_bp, url_prefix='/api')
-    app.register_blueprint(proveedores_bp, url_prefix='/api')
-    app.register_blueprint(categorias_bp, url_prefix='/api')
-    app.register_blueprint(marcas_bp, url_prefix='/api')
-    app.register_blueprint(etiquetas_bp, url_prefix='/api')
-    app.register_blueprint(unidades_bp, url_prefix='/api')
-    app.register_blueprint(banners_bp, url_prefix='/api')
-    app.register_blueprint(imagenes_bp, url_prefix='/api')
-    app.register_blueprint(usuarios_bp, url_prefix='/api')
-    app.register_blueprint(export_bp, url_prefix='/api')
-    app.register_blueprint(importador_bp, url_prefix='/api')
-    app.register_blueprint(debug_bp)
-    app.register_blueprint(wishlist_bp)
-    app.register_blueprint(pedidos_bp)
+    """
+    Registrar todas las rutas en la aplicación Flask
+
+    Los módulos de rutas se importan todos al arrancar: Flask no admite
+    registrar blueprints después del primer request y cada uno cuesta poco
+    (~1 ms, ver reporte_arranque()). Lo pesado (openpyxl, pytz, numpy) lo
+    importan recién las rutas que lo usan.
+    """
+
+    for modulo, nombre_blueprint, url_prefix in BLUEPRINTS:
+        # Medir cuánto suma cada módulo de rutas al arranque
+        with medir(f'rutas {modulo}'):
+            blueprint = getattr(import_module(f'.{modulo}', __name__), nombre_blueprint)
+        app.register_blueprint(blueprint, url_prefix=url_prefix)
@@ -1,32 +1,134 @@
-from flask import Blueprint, request, jsonify
-from config.database import get_db
+from flask import Blueprint, request, jsonify, Response
+from config.database import get_db, get_argentina_datetime
+from utils.cache import CacheVersionada
+from utils.helpers import detectar_mimetype_imagen
+from config.esquema import indices_columnas, tiene_columna
+from datetime import datetime, timedelta
 import sqlite3
+import time
 
 banners_bp = Blueprint('banners', __name__)
 
+def _parsear_fecha(valor, fin_del_dia=False):
+    """
+    Fechas de la BD ('YYYY-MM-DD HH:MM:SS[.ffffff]' o ISO); None si está vacía o es inválida.
+    
+    Con `fin_del_dia`, una fecha sin hora (los inputs type="date" de
+    BannerAdmin) se toma hasta el final de ese día: devuelve las 00:00 del
+    día siguiente, el primer instante en que ya no vale.
+    """
+    if not valor:
+        return None
+    try:
+        fecha = datetime.fromisoformat(str(valor))
+        if fin_del_dia and len(str(valor).strip()) == 10:
+            fecha += timedelta(days=1)
+        return fecha
+    except ValueError:
+        print(f"⚠️ Fecha de banner inválida: {valor}")
+        return None
+
+def _construir_feed_banners():
+    """
+    Banners activos y vigentes según fecha_inicio/fecha_fin, sin leer los BLOBs.
+    
+    Devuelve también el próximo instante en que el feed cambia (un banner
+    programado que empieza o uno vigente que termina), para que la cache
+    se reconstruya exactamente en ese borde.
+    """
+    conn = get_db()
+    conn.row_factory = sqlite3.Row
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, titulo, descripcion, url_imagen, es_url, url_link, orden,
+                   fecha_inicio, fecha_fin, color_borde,
+                   imagen_blob IS NOT NULL AS tiene_blob
+            FROM banner
+            WHERE activo = 1
+            ORDER BY orden
+        ''')
+        rows = cursor.fetchall()
+    finally:
+        conn.close()
+    
+    ahora = get_argentina_datetime()
+    proximo_borde = None
+    banners = []
+    
+    for row in rows:
+        inicio = _parsear_fecha(row['fecha_inicio'])
+        fin = _parsear_fecha(row['fecha_fin'], fin_del_dia=True)
+        
+        for borde in (inicio, fin):
+            if borde is not None and borde > ahora and (proximo_borde is None or borde < proximo_borde):
+                proximo_borde = borde
+        
+        if (inicio is not None and inicio > ahora) or (fin is not None and fin <= ahora):
+            continue
+        
+        if row['tiene_blob']:
+            url_imagen = f'/api/banners/{row["id"]}/imagen'
+        else:
+            url_imagen = row['url_imagen'] or None
+        
+        banners.append({
+            'id': row['id'],
+            'titulo': row['titulo'],
+            'descripcion': row['descripcion'],
+            # Los BLOBs se sirven aparte, así que la referencia siempre es una URL
+            'url_imagen': url_imagen,
+            'imagen_base64': None,
+            'es_url': url_imagen is not None,
+            'url_link': row['url_link'],
+            'activo': True,
+            'orden': row['orden'],
+            'fecha_inicio': row['fecha_inicio'],
+            'fecha_fin': row['fecha_fin'],
+            'color_borde': row['color_borde'] or '#000000'
+        })
+    
+    expira_en = None
+    if proximo_borde is not None:
+        expira_en = time.time() + (proximo_borde - ahora).total_seconds()
+    
+    return {'banners': banners, 'expira_en': expira_en}
+
+_feed_banners = CacheVersionada('banners', _construir_feed_banners,
+                                expiracion=lambda feed: feed['expira_en'], clave_bd='banners')
+
+def invalidar_banners():
+    _feed_banners.invalidar()
+
 @banners_bp.route('/banners')
 def get_banners():
     try:
-        print("=== OBTENIENDO BANNERS ===")
-        conn = get_db()
-        cursor = conn.cursor()
-        
         show_all = request.args.get('all', '').lower() == 'true'
-        print(f"Mostrar todos: {show_all}")
         
-        if show_all:
-            cursor.execute('SELECT * FROM banner ORDER BY orden')
-        else:
-            cursor.execute('SELECT * FROM banner WHERE activo = 1 ORDER BY orden')
+        # La home (BannerCarousel) se sirve desde memoria; el listado
+        # completo con imágenes en base64 queda solo para el admin
+        if not show_all:
+            return jsonify(_feed_banners.obtener()['banners'])
+        
+        print("=== OBTENIENDO BANNERS (ADMIN) ===")
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM banner ORDER BY orden')
         
         rows = cursor.fetchall()
         banners = []
         
-        # Obtener nombres de columnas para mapear correctamente
-        cursor.execute("PRAGMA table_info(banner)")
-        columns_info = cursor.fetchall()
-        column_names = [col[1] for col in columns_info]
-        print(f"Columnas de banner: {column_names}")
+        # Índices de columnas opcionales, tomados del registro de esquema
+        indices = indices_columnas('banner')
+        url_imagen_idx = indices.get('url_imagen')
+        imagen_blob_idx = indices.get('imagen_blob')
+        es_url_idx = indices.get('es_url')
+        url_link_idx = indices.get('url_link')
+        activo_idx = indices.get('activo')
+        orden_idx = indices.get('orden')
+        fecha_inicio_idx = indices.get('fecha_inicio')
+        fecha_fin_idx = indices.get('fecha_fin')
+        color_borde_idx = indices.get('color_borde')
         
         for row in rows:
             print(f"Procesando banner ID: {row[0]}")
@@ -47,15 +149,6 @@ def get_banners():
                 'color_borde': '#000000'
             }
             
-            # Buscar índices de columnas específicas
-            url_imagen_idx = column_names.index('url_imagen') if 'url_imagen' in column_names else None
-            imagen_blob_idx = column_names.index('imagen_blob') if 'imagen_blob' in column_names else None
-            es_url_idx = column_names.index('es_url') if 'es_url' in column_names else None
-            url_link_idx = column_names.index('url_link') if 'url_link' in column_names else None
-            activo_idx = column_names.index('activo') if 'activo' in column_names else None
-            orden_idx = column_names.index('orden') if 'orden' in column_names else None
-            color_borde_idx = column_names.index('color_borde') if 'color_borde' in column_names else None
-            
             # Asignar valores según disponibilidad
             if url_imagen_idx is not None:
                 banner['url_imagen'] = row[url_imagen_idx]
@@ -67,6 +160,10 @@ def get_banners():
                 banner['activo'] = bool(row[activo_idx])
             if orden_idx is not None:
                 banner['orden'] = row[orden_idx]
+            if fecha_inicio_idx is not None:
+                banner['fecha_inicio'] = row[fecha_inicio_idx]
+            if fecha_fin_idx is not None:
+                banner['fecha_fin'] = row[fecha_fin_idx]
             if color_borde_idx is not None:
                 banner['color_borde'] = row[color_borde_idx] or '#000000'
             
@@ -103,6 +200,30 @@ def get_banners():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@banners_bp.route('/banners/<int:id>/imagen')
+def get_imagen_banner(id):
+    """Servir el BLOB de un banner como archivo, referenciado desde el feed"""
+    try:
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute('SELECT imagen_blob FROM banner WHERE id = ?', (id,))
+        row = cursor.fetchone()
+        conn.close()
+        
+        if not row or not row[0]:
+            return jsonify({'error': 'Imagen no encontrada'}), 404
+        
+        # La imagen de un banner puede reemplazarse, así que el ETag depende del contenido
+        respuesta = Response(row[0], mimetype=detectar_mimetype_imagen(row[0]))
+        respuesta.add_etag()
+        respuesta.cache_control.public = True
+        respuesta.cache_control.max_age = 3600
+        return respuesta.make_conditional(request)
+        
+    except Exception as e:
+        print(f"ERROR sirviendo imagen de banner {id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @banners_bp.route('/banners', methods=['POST'])
 def crear_banner():
     try:
@@ -162,11 +283,7 @@ def crear_banner():
         conn = get_db()
         cursor = conn.cursor()
         
-        # Verificar estructura de la tabla banner
-        cursor.execute("PRAGMA table_info(banner)")
-        columns_info = cursor.fetchall()
-        column_names = [col[1] for col in columns_info]
-        print(f"Columnas de la tabla banner: {column_names}")
+        tiene_blob = tiene_columna('banner', 'imagen_blob')
         
         # Obtener el próximo orden disponible
         cursor.execute('SELECT COALESCE(MAX(orden), -1) + 1 FROM banner')
@@ -181,8 +298,8 @@ def crear_banner():
             url_imagen = None
             es_url = False
         
-        # Verificar qué columnas existen para adaptar la inserción
-        if 'imagen_blob' in column_names:
+        # Adaptar la inserción a las columnas existentes
+        if tiene_blob:
             print("Tabla tiene columna imagen_blob, insertando con BLOB")
             datos_banner = (
                 titulo,
@@ -230,6 +347,7 @@ def crear_banner():
         
         conn.commit()
         conn.close()
+        invalidar_banners()
         
         print("=== BANNER CREADO EXITOSAMENTE ===")
         return jsonify({
@@ -309,17 +427,13 @@ def actualizar_banner(id):
             conn.close()
             return jsonify({'error': 'Banner no encontrado'}), 404
         
-        # Verificar estructura de la tabla banner
-        cursor.execute("PRAGMA table_info(banner)")
-        columns_info = cursor.fetchall()
-        column_names = [col[1] for col in columns_info]
-        print(f"Columnas de la tabla banner: {column_names}")
+        tiene_blob = tiene_columna('banner', 'imagen_blob')
         
         # Preparar datos básicos
         url_imagen = str(data.get('url_imagen', '')).strip() if data.get('url_imagen') else None
         
         # Construir la consulta de actualización según las columnas disponibles
-        if 'imagen_blob' in column_names and actualizar_imagen:
+        if tiene_blob and actualizar_imagen:
             print("Actualizando con imagen (blob o URL)")
             cursor.execute('''
                 UPDATE banner SET 
@@ -338,7 +452,7 @@ def actualizar_banner(id):
                 str(data.get('color_borde', '#000000')).strip(),
                 id
             ))
-        elif 'imagen_blob' in column_names:
+        elif tiene_blob:
             print("Actualizando sin cambiar imagen")
             cursor.execute('''
                 UPDATE banner SET 
@@ -373,13 +487,14 @@ def actualizar_banner(id):
             ))
         
         # Verificar que se actualizó correctamente
-        if actualizar_imagen and 'imagen_blob' in column_names:
+        if actualizar_imagen and tiene_blob:
             cursor.execute('SELECT titulo, imagen_blob IS NOT NULL as tiene_blob, es_url FROM banner WHERE id = ?', (id,))
             verificacion = cursor.fetchone()
             print(f"Verificación después de actualizar - Título: {verificacion[0]}, Tiene BLOB: {verificacion[1]}, Es URL: {verificacion[2]}")
         
         conn.commit()
         conn.close()
+        invalidar_banners()
         
         print(f"=== BANNER {id} ACTUALIZADO EXITOSAMENTE ===")
         return jsonify({
@@ -410,6 +525,7 @@ def borrar_banner(id):
         
         conn.commit()
         conn.close()
+        invalidar_banners()
         
         print(f"=== BANNER {id} ELIMINADO EXITOSAMENTE ===")
         return jsonify({
@@ -456,6 +572,7 @@ def reordenar_banners():
         
         conn.commit()
         conn.close()
+        invalidar_banners()
         
         return jsonify({
             'success': True,
@@ -0,0 +1,13 @@
+from flask import Blueprint, jsonify
+from utils.taxonomia import respuesta_taxonomia
+
+bootstrap_bp = Blueprint('bootstrap', __name__)
+
+@bootstrap_bp.route('/bootstrap')
+def get_bootstrap():
+    """Categorías, marcas, etiquetas, unidades y proveedores en una sola respuesta cacheada"""
+    try:
+        return respuesta_taxonomia()
+    except Exception as e:
+        print(f"Error en get_bootstrap: {e}")
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,197 @@
+from flask import Blueprint, request, jsonify, current_app
+import jwt
+from config.database import get_db, get_argentina_time
+from utils.carrito import leer_items, cotizar, guardar_items, leer_carrito
+from utils.catalogo import obtener_catalogo
+
+carrito_bp = Blueprint('carrito', __name__)
+
+def _usuario_del_token():
+    """id del usuario del header Authorization, o None si falta o no es válido"""
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return None
+    try:
+        datos = jwt.decode(auth_header[7:], current_app.config['SECRET_KEY'], algorithms=['HS256'])
+        return datos.get('user_id')
+    except jwt.InvalidTokenError:
+        return None
+
+def _no_autenticado():
+    return jsonify({'error': 'Usuario no autenticado'}), 401
+
+@carrito_bp.route('/carrito/cotizar', methods=['POST'])
+def cotizar_carrito():
+    """
+    Precios actuales de un carrito completo, calculados en el servidor.
+
+    Cuerpo:
+      {"tipo_entrega": "envio" | "retiro" (opcional),
+       "items": [{"producto_id": 1, "cantidad": 2},
+                 {"producto_id": 5, "es_fraccionado": true, "cantidad_personalizada": 250}]}
+
+    Devuelve las líneas con precio y subtotal, "problemas" (productos que
+    ya no existen, no están disponibles o no tienen precio), subtotal,
+    costo_envio (0 si no es envío), costo_envio_domicilio y total.
+    Se resuelve con el catálogo en memoria, sin consultas.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            items = leer_items(data.get('items'))
+        except (ValueError, TypeError, KeyError) as e:
+            return jsonify({'error': f'Pedido inválido: {e}'}), 400
+
+        return jsonify(cotizar(items, obtener_catalogo(), data.get('tipo_entrega')))
+    except Exception as e:
+        print(f"Error en cotizar_carrito: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@carrito_bp.route('/carrito')
+def get_carrito():
+    """Carrito guardado del usuario, cotizado con el catálogo en memoria (mismo formato que /carrito/cotizar)"""
+    try:
+        usuario_id = _usuario_del_token()
+        if not usuario_id:
+            return _no_autenticado()
+
+        conn = get_db()
+        try:
+            items = leer_carrito(conn.cursor(), usuario_id)
+        finally:
+            conn.close()
+
+        catalogo = obtener_catalogo()
+        cotizacion = cotizar(items, catalogo)
+        # Las líneas son diccionarios nuevos: se les puede agregar la imagen
+        for linea in cotizacion['items']:
+            linea['imagen_principal'] = catalogo[linea['producto_id']]['imagen_principal']
+        return jsonify(cotizacion)
+    except Exception as e:
+        print(f"Error en get_carrito: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@carrito_bp.route('/carrito/items', methods=['POST'])
+def agregar_al_carrito():
+    """
+    Agregar al carrito guardado, sumando a lo que ya había del producto.
+
+    Cuerpo: un ítem ({"producto_id": 1, "cantidad": 1} o
+    {"producto_id": 5, "es_fraccionado": true, "cantidad_personalizada": 250})
+    o {"items": [...]} para subir varios de una vez (p. ej. el carrito de
+    invitado al iniciar sesión).
+    """
+    try:
+        usuario_id = _usuario_del_token()
+        if not usuario_id:
+            return _no_autenticado()
+
+        data = request.get_json(silent=True) or {}
+        try:
+            items = leer_items(data['items'] if 'items' in data else [data])
+        except (ValueError, TypeError, KeyError) as e:
+            return jsonify({'error': f'Pedido inválido: {e}'}), 400
+
+        catalogo = obtener_catalogo()
+        inexistentes = sorted({item['producto_id'] for item in items if item['producto_id'] not in catalogo})
+        if inexistentes:
+            return jsonify({'error': 'Productos no encontrados', 'producto_ids': inexistentes}), 404
+
+        conn = get_db()
+        try:
+            guardar_items(conn.cursor(), usuario_id, items, get_argentina_time())
+            conn.commit()
+        finally:
+            conn.close()
+        return jsonify({'success': True, 'cantidad_items': len(items)})
+    except Exception as e:
+        print(f"Error en agregar_al_carrito: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@carrito_bp.route('/carrito/items/<int:producto_id>', methods=['PUT'])
+def actualizar_item_carrito(producto_id):
+    """
+    Fijar la cantidad de un producto del carrito guardado.
+
+    Cuerpo: {"cantidad": 3} o {"es_fraccionado": true, "cantidad_personalizada": 300}.
+    Una cantidad 0 lo quita del carrito.
+    """
+    try:
+        usuario_id = _usuario_del_token()
+        if not usuario_id:
+            return _no_autenticado()
+
+        data = request.get_json(silent=True) or {}
+        es_fraccionado = bool(data.get('es_fraccionado'))
+        cantidad = data.get('cantidad_personalizada') if es_fraccionado else data.get('cantidad')
+        try:
+            quitar = cantidad is not None and float(cantidad) <= 0
+            if not quitar:
+                items = leer_items([dict(data, producto_id=producto_id)])
+        except (ValueError, TypeError, KeyError) as e:
+            return jsonify({'error': f'Pedido inválido: {e}'}), 400
+
+        if not quitar and producto_id not in obtener_catalogo():
+            return jsonify({'error': 'Producto no encontrado'}), 404
+
+        conn = get_db()
+        try:
+            cursor = conn.cursor()
+            if quitar:
+                cursor.execute(
+                    'DELETE FROM carrito_items WHERE usuario_id = ? AND producto_id = ? AND es_fraccionado = ?',
+                    (usuario_id, producto_id, int(es_fraccionado))
+                )
+            else:
+                guardar_items(cursor, usuario_id, items, get_argentina_time(), sumar=False)
+            conn.commit()
+        finally:
+            conn.close()
+        return jsonify({'success': True})
+    except Exception as e:
+        print(f"Error en actualizar_item_carrito: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@carrito_bp.route('/carrito/items/<int:producto_id>', methods=['DELETE'])
+def quitar_del_carrito(producto_id):
+    """Quitar un producto del carrito guardado (?es_fraccionado=true|false para quitar solo ese modo)"""
+    try:
+        usuario_id = _usuario_del_token()
+        if not usuario_id:
+            return _no_autenticado()
+
+        sql = 'DELETE FROM carrito_items WHERE usuario_id = ? AND producto_id = ?'
+        params = [usuario_id, producto_id]
+        modo = request.args.get('es_fraccionado')
+        if modo is not None:
+            sql += ' AND es_fraccionado = ?'
+            params.append(int(modo.lower() == 'true'))
+
+        conn = get_db()
+        try:
+            conn.execute(sql, params)
+            conn.commit()
+        finally:
+            conn.close()
+        return jsonify({'success': True})
+    except Exception as e:
+        print(f"Error en quitar_del_carrito: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@carrito_bp.route('/carrito', methods=['DELETE'])
+def vaciar_carrito():
+    try:
+        usuario_id = _usuario_del_token()
+        if not usuario_id:
+            return _no_autenticado()
+
+        conn = get_db()
+        try:
+            conn.execute('DELETE FROM carrito_items WHERE usuario_id = ?', (usuario_id,))
+            conn.commit()
+        finally:
+            conn.close()
+        return jsonify({'success': True})
+    except Exception as e:
+        print(f"Error en vaciar_carrito: {e}")
+        return jsonify({'error': str(e)}), 500
@@ -1,29 +1,16 @@
 from flask import Blueprint, request, jsonify
 from config.database import get_db
 from utils.helpers import process_request_data
+from utils.catalogo import invalidar_catalogo
+from utils.taxonomia import respuesta_taxonomia, invalidar_taxonomia
 
 categorias_bp = Blueprint('categorias', __name__)
 
 @categorias_bp.route('/categorias')
 def get_categorias():
     try:
-        print("=== OBTENIENDO CATEGORÍAS ===")
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM categoria ORDER BY nombre')
-        rows = cursor.fetchall()
-        
-        categorias = []
-        for row in rows:
-            categorias.append({
-                'id': row[0],
-                'nombre': row[1]
-            })
-        
-        conn.close()
-        print(f"=== RETORNANDO {len(categorias)} CATEGORÍAS ===")
-        return jsonify(categorias)
-        
+        # Servido desde la taxonomía cacheada (ver utils/taxonomia.py)
+        return respuesta_taxonomia('categorias')
     except Exception as e:
         print(f"Error en get_categorias: {e}")
         return jsonify({'error': str(e)}), 500
@@ -45,6 +32,7 @@ def crear_categoria():
         categoria_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        invalidar_taxonomia()
         
         print(f"=== CATEGORÍA CREADA CON ID {categoria_id} ===")
         return jsonify({
@@ -70,6 +58,8 @@ def modificar_categoria(id):
         cursor.execute('UPDATE categoria SET nombre = ? WHERE id = ?', (data.get('nombre'), id))
         conn.commit()
         conn.close()
+        invalidar_catalogo()
+        invalidar_taxonomia()
         
         print(f"=== CATEGORÍA {id} MODIFICADA EXITOSAMENTE ===")
         return jsonify({
@@ -106,6 +96,8 @@ def borrar_categoria(id):
         
         conn.commit()
         conn.close()
+        invalidar_catalogo()
+        invalidar_taxonomia()
         
         print(f"=== CATEGORÍA {id} ELIMINADA EXITOSAMENTE ===")
         return jsonify({
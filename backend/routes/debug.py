@@ -2,6 +2,8 @@ from flask import Blueprint, jsonify, request
 import os
 import sqlite3
 from datetime import datetime
+from config.database import database_path
+from utils.arranque import reporte_arranque
 
 debug_bp = Blueprint('debug', __name__)
 
@@ -19,8 +21,6 @@ def health_check():
     """Endpoint de health check para verificar que el backend está funcionando"""
     try:
         # Verificar conexión a la base de datos
-        basedir = os.path.abspath(os.path.dirname(__file__))
-        database_path = os.path.join(basedir, "../instance/database.db")
         
         db_exists = os.path.exists(database_path)
         db_connection = False
@@ -50,7 +50,7 @@ def health_check():
             'environment': {
                 'python_version': os.sys.version,
                 'current_dir': os.getcwd(),
-                'backend_dir': basedir
+                'backend_dir': os.path.abspath(os.path.dirname(__file__))
             }
         }), 200
         
@@ -62,6 +62,11 @@ def health_check():
             'error': str(e)
         }), 500
 
+@debug_bp.route('/api/debug/arranque', methods=['GET'])
+def debug_arranque():
+    """Tiempos de cada fase del arranque de este worker y dependencias ya importadas"""
+    return jsonify(reporte_arranque()), 200
+
 @debug_bp.route('/api/debug/importador', methods=['GET'])
 def debug_importador():
     """Endpoint para debug específico del importador"""
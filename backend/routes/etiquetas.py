@@ -1,29 +1,16 @@
 from flask import Blueprint, request, jsonify
 from config.database import get_db
 from utils.helpers import process_request_data
+from utils.catalogo import invalidar_catalogo
+from utils.taxonomia import respuesta_taxonomia, invalidar_taxonomia
 
 etiquetas_bp = Blueprint('etiquetas', __name__)
 
 @etiquetas_bp.route('/etiquetas')
 def get_etiquetas():
     try:
-        print("=== OBTENIENDO ETIQUETAS ===")
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM tipo_alimento ORDER BY nombre')
-        rows = cursor.fetchall()
-        
-        etiquetas = []
-        for row in rows:
-            etiquetas.append({
-                'id': row[0],
-                'nombre': row[1]
-            })
-        
-        conn.close()
-        print(f"=== RETORNANDO {len(etiquetas)} ETIQUETAS ===")
-        return jsonify(etiquetas)
-        
+        # Servido desde la taxonomía cacheada (ver utils/taxonomia.py)
+        return respuesta_taxonomia('etiquetas')
     except Exception as e:
         print(f"Error en get_etiquetas: {e}")
         return jsonify({'error': str(e)}), 500
@@ -50,6 +37,7 @@ def crear_etiqueta():
         etiqueta_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        invalidar_taxonomia()
         
         print(f"=== ETIQUETA CREADA CON ID {etiqueta_id} ===")
         return jsonify({
@@ -75,6 +63,8 @@ def modificar_etiqueta(id):
         cursor.execute('UPDATE tipo_alimento SET nombre = ? WHERE id = ?', (data.get('nombre'), id))
         conn.commit()
         conn.close()
+        invalidar_catalogo()
+        invalidar_taxonomia()
         
         print(f"=== ETIQUETA {id} MODIFICADA EXITOSAMENTE ===")
         return jsonify({
@@ -111,6 +101,8 @@ def borrar_etiqueta(id):
         
         conn.commit()
         conn.close()
+        invalidar_catalogo()
+        invalidar_taxonomia()
         
         print(f"=== ETIQUETA {id} ELIMINADA EXITOSAMENTE ===")
         return jsonify({
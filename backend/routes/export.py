@@ -1,5 +1,6 @@
 from flask import Blueprint, send_file, jsonify
 from config.database import get_db
+from config.esquema import existe_tabla, columnas as columnas_tabla
 from datetime import datetime
 import io
 import csv
@@ -42,15 +43,12 @@ def exportar_datos_excel():
                     print(f"Exportando tabla: {tabla}")
                     
                     # Verificar si la tabla existe
-                    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (tabla,))
-                    if not cursor.fetchone():
+                    if not existe_tabla(tabla):
                         print(f"Tabla {tabla} no existe, saltando...")
                         continue
                     
-                    # Obtener estructura de la tabla
-                    cursor.execute(f"PRAGMA table_info({tabla})")
-                    columnas_info = cursor.fetchall()
-                    columnas = [col[1] for col in columnas_info]
+                    # Estructura de la tabla desde el registro de esquema
+                    columnas = columnas_tabla(tabla)
                     
                     # Obtener datos
                     cursor.execute(f"SELECT * FROM {tabla}")
@@ -131,14 +129,11 @@ def exportar_datos_excel():
                 for tabla in tablas_exportar:
                     try:
                         # Verificar si la tabla existe
-                        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (tabla,))
-                        if not cursor.fetchone():
+                        if not existe_tabla(tabla):
                             continue
                         
                         # Obtener estructura y datos
-                        cursor.execute(f"PRAGMA table_info({tabla})")
-                        columnas_info = cursor.fetchall()
-                        columnas = [col[1] for col in columnas_info]
+                        columnas = columnas_tabla(tabla)
                         
                         cursor.execute(f"SELECT * FROM {tabla}")
                         datos = cursor.fetchall()
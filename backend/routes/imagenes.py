@@ -1,8 +1,15 @@
-from flask import Blueprint, request, jsonify
-from config.database import get_db
+from flask import Blueprint, request, jsonify, Response
+from config.database import get_db, get_argentina_time
+from utils.catalogo import invalidar_catalogo
+from utils.helpers import detectar_mimetype_imagen
 
 imagenes_bp = Blueprint('imagenes', __name__)
 
+def _tocar_producto(cursor, producto_id):
+    """Las imágenes son parte del detalle del producto: actualizar su Last-Modified"""
+    cursor.execute('UPDATE producto SET fecha_ultima_modificacion = ? WHERE id = ?',
+                   (get_argentina_time(), producto_id))
+
 @imagenes_bp.route('/productos/<int:producto_id>/imagenes', methods=['POST'])
 def crear_imagen_producto(producto_id):
     try:
@@ -40,6 +47,7 @@ def crear_imagen_producto(producto_id):
             
             imagen_id = cursor.lastrowid
             print(f"Imagen insertada con ID: {imagen_id}")
+            _tocar_producto(cursor, producto_id)
             
             # Verificar que se insertó correctamente
             cursor.execute('SELECT COUNT(*) FROM imagen_producto WHERE producto_id = ?', (producto_id,))
@@ -48,6 +56,7 @@ def crear_imagen_producto(producto_id):
             
             conn.commit()
             conn.close()
+            invalidar_catalogo()
             
             print(f"=== IMAGEN GUARDADA EXITOSAMENTE ===")
             return jsonify({'id': imagen_id}), 201
@@ -101,6 +110,31 @@ def get_imagenes_producto(producto_id):
         print(f"ERROR obteniendo imágenes: {e}")
         return jsonify({'error': str(e)}), 500
 
+@imagenes_bp.route('/imagenes/<int:imagen_id>/archivo')
+def get_archivo_imagen(imagen_id):
+    """Servir el BLOB de una imagen como archivo, para usarlo como src en lugar de base64"""
+    try:
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute('SELECT imagen_blob FROM imagen_producto WHERE id = ?', (imagen_id,))
+        row = cursor.fetchone()
+        conn.close()
+        
+        if not row or not row[0]:
+            return jsonify({'error': 'Imagen no encontrada'}), 404
+        
+        # Los ids de imagen_producto se reutilizan (editar = borrar + crear): el
+        # ETag depende del contenido y el navegador revalida siempre (304 sin cuerpo)
+        respuesta = Response(row[0], mimetype=detectar_mimetype_imagen(row[0]))
+        respuesta.add_etag()
+        respuesta.cache_control.public = True
+        respuesta.cache_control.no_cache = True
+        return respuesta.make_conditional(request)
+        
+    except Exception as e:
+        print(f"ERROR sirviendo imagen {imagen_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @imagenes_bp.route('/productos/<int:producto_id>/imagenes/reordenar', methods=['PUT'])
 def reordenar_imagenes(producto_id):
     try:
@@ -113,9 +147,11 @@ def reordenar_imagenes(producto_id):
         for pos_data in nuevas_posiciones:
             cursor.execute('UPDATE imagen_producto SET posicion = ? WHERE id = ? AND producto_id = ?', 
                           (pos_data['posicion'], pos_data['id'], producto_id))
+        _tocar_producto(cursor, producto_id)
         
         conn.commit()
         conn.close()
+        invalidar_catalogo()
         return jsonify({'msg': 'Imágenes reordenadas'})
         
     except Exception as e:
@@ -126,9 +162,14 @@ def borrar_imagen(imagen_id):
     try:
         conn = get_db()
         cursor = conn.cursor()
+        cursor.execute('SELECT producto_id FROM imagen_producto WHERE id = ?', (imagen_id,))
+        row = cursor.fetchone()
+        if row:
+            _tocar_producto(cursor, row[0])
         cursor.execute('DELETE FROM imagen_producto WHERE id = ?', (imagen_id,))
         conn.commit()
         conn.close()
+        invalidar_catalogo()
         return jsonify({'msg': 'Imagen eliminada'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -8,7 +8,6 @@ con validación de datos, vista previa e importación progresiva.
 """
 
 from flask import Blueprint, request, jsonify
-import openpyxl
 import os
 import tempfile
 from datetime import datetime
@@ -19,6 +18,9 @@ from typing import Dict, List, Tuple, Optional
 # Importaciones del proyecto
 from models import db, Producto, Proveedor, Categoria, Marca
 from config.database import get_db
+from utils.catalogo import invalidar_catalogo
+from utils.taxonomia import invalidar_taxonomia
+from utils.precios import calcular_precios
 
 # Crear el blueprint
 importador_bp = Blueprint('importador', __name__)
@@ -68,6 +70,8 @@ class ImportadorProductos:
             
             # Abrir el archivo Excel
             print("📊 [DEBUG] Abriendo archivo Excel con openpyxl...")
+            # openpyxl se importa recién acá: pesa ~150 ms y solo lo usan las importaciones
+            import openpyxl
             # data_only=True hace que lea valores calculados en lugar de fórmulas
             workbook = openpyxl.load_workbook(temp_file.name, data_only=True)
             hoja = workbook.active
@@ -277,7 +281,7 @@ class ImportadorProductos:
                 'descripcion': descripcion.strip() if descripcion else "",
                 'tipo': tipo_producto,  # Cambiar a 'tipo' para consistencia
                 'unidad': unidad,
-                'precio_calculado': float(precio_costo) * (1 + float(porcentaje_ganancia / 100))
+                'precio_calculado': calcular_precios(precio_costo, porcentaje_ganancia / 100)['precio']
             }
             
             if debug_detallado:
@@ -446,7 +450,7 @@ class ImportadorProductos:
                     self.progreso_actual = int((i + 1) * 100 / len(self.productos_validados))
                     
                     # Obtener o crear proveedor
-                    proveedor = self._obtener_o_crear_proveedor(producto_data['proveedor_nombre'])
+                    proveedor = self._obtener_o_crear_proveedor(producto_data['proveedor'])
                     
                     # Obtener o crear categoría (usar categoría por defecto)
                     categoria = self._obtener_o_crear_categoria("General")
@@ -461,7 +465,10 @@ class ImportadorProductos:
                         precio_costo=producto_data['precio_costo'],
                         porcentaje_ganancia=producto_data['porcentaje_ganancia'],
                         precio_venta_publico=producto_data['precio_ganancia_paquete'],
-                        precio_por_100gr=producto_data['precio_por_unidad_100gr'],
+                        # Tipo 2 (con precio cada 100 gr) se vende por peso, tipo 1 por unidad
+                        tipo_calculo='peso' if producto_data['tipo'] == 2 else 'unidad',
+                        cantidad=100 if producto_data['tipo'] == 2 else None,
+                        cantidad_unidades=None if producto_data['tipo'] == 2 else 1,
                         descripcion=producto_data['descripcion'],
                         disponible=True,
                         proveedor_id=proveedor.id,
@@ -492,6 +499,9 @@ class ImportadorProductos:
             
             # Commit final
             db.session.commit()
+            invalidar_catalogo()
+            # El importador puede crear proveedores, categorías y marcas
+            invalidar_taxonomia()
             
             # Limpiar archivo temporal
             self._limpiar_archivo_temporal()
@@ -737,6 +747,8 @@ def descargar_plantilla_excel():
         Archivo Excel con la plantilla
     """
     try:
+        import openpyxl
+
         # Crear un nuevo workbook
         workbook = openpyxl.Workbook()
         hoja = workbook.active
@@ -0,0 +1,130 @@
+from flask import Blueprint, request, jsonify
+from config.database import get_db
+from utils.precios import condicion_alcance, resumir_diferencias
+from utils.listas_precios import (
+    crear_lista, items_por_ajuste, calcular_lista, aplicar_lista, despertar_programador
+)
+
+listas_precios_bp = Blueprint('listas_precios', __name__)
+
+@listas_precios_bp.route('/listas-precios')
+def get_listas_precios():
+    """Listas de precios programadas, de la activación más reciente a la más vieja"""
+    try:
+        estado = request.args.get('estado')
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT l.id, l.nombre, l.fecha_activacion, l.estado, l.paso_redondeo, l.modo_redondeo,
+                   l.fecha_creacion, l.fecha_aplicada, l.productos_actualizados,
+                   (SELECT COUNT(*) FROM lista_precios_items i WHERE i.lista_id = l.id) AS cantidad_productos
+            FROM lista_precios l
+            {'WHERE l.estado = ?' if estado else ''}
+            ORDER BY l.fecha_activacion DESC, l.id DESC
+        ''', [estado] if estado else [])
+        columnas = [d[0] for d in cursor.description]
+        listas = [dict(zip(columnas, row)) for row in cursor.fetchall()]
+        conn.close()
+        return jsonify(listas)
+    except Exception as e:
+        print(f"Error en get_listas_precios: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@listas_precios_bp.route('/listas-precios', methods=['POST'])
+def crear_lista_precios():
+    """
+    Programar una lista de precios.
+
+    Cuerpo:
+      {"nombre": "Aumento julio", "fecha_activacion": "2025-07-01T00:00",
+       "items": [{"producto_id": 1, "precio_costo": 1200, "porcentaje_ganancia": 0.4}, ...],
+       "redondeo": {"paso": 10, "modo": "arriba"}}
+
+    En lugar de "items" se puede pasar un "alcance" ({"proveedor_id": 3} o
+    {"todos": true}) con "ajuste_costo_porcentaje" y opcionalmente
+    "porcentaje_ganancia": los costos se calculan ahora desde los actuales.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            redondeo = data.get('redondeo') or {}
+            if 'items' in data:
+                items = data['items']
+                if not isinstance(items, list):
+                    raise ValueError('items debe ser una lista')
+            elif 'alcance' in data:
+                condicion, params = condicion_alcance(data['alcance'] or {}, permitir_todos=True)
+                ajuste = float(data.get('ajuste_costo_porcentaje') or 0)
+                if ajuste <= -100:
+                    raise ValueError('ajuste_costo_porcentaje debe ser mayor a -100')
+                ganancia = data.get('porcentaje_ganancia')
+                items = items_por_ajuste(condicion, params, ajuste, float(ganancia) if ganancia is not None else None)
+            else:
+                raise ValueError('Se requiere "items" o "alcance"')
+
+            lista_id = crear_lista(
+                data.get('nombre'),
+                data.get('fecha_activacion'),
+                items,
+                paso_redondeo=float(redondeo.get('paso', 0.01)),
+                modo_redondeo=redondeo.get('modo', 'cercano')
+            )
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            return jsonify({'error': f'Pedido inválido: {e}'}), 400
+
+        return jsonify({'success': True, 'id': lista_id, 'cantidad_productos': len(items)}), 201
+    except Exception as e:
+        print(f"Error en crear_lista_precios: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+@listas_precios_bp.route('/listas-precios/<int:lista_id>')
+def get_lista_precios(lista_id):
+    """Detalle de una lista con la vista previa de cómo cambiarían los precios actuales"""
+    try:
+        conn = get_db()
+        try:
+            lista, columnas, nuevos = calcular_lista(conn.cursor(), lista_id)
+        finally:
+            conn.close()
+        if lista is None:
+            return jsonify({'error': 'Lista de precios no encontrada'}), 404
+
+        diferencias, resumen = resumir_diferencias(columnas, nuevos)
+        return jsonify({**lista, 'resumen': resumen, 'diferencias': diferencias})
+    except Exception as e:
+        print(f"Error en get_lista_precios: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@listas_precios_bp.route('/listas-precios/<int:lista_id>/aplicar', methods=['POST'])
+def aplicar_lista_precios(lista_id):
+    """Aplicar ya una lista pendiente, sin esperar su fecha de activación"""
+    try:
+        actualizados = aplicar_lista(lista_id)
+        if actualizados is None:
+            return jsonify({'error': 'La lista no existe o no está pendiente'}), 409
+        return jsonify({'success': True, 'productos_actualizados': actualizados})
+    except Exception as e:
+        print(f"Error en aplicar_lista_precios: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@listas_precios_bp.route('/listas-precios/<int:lista_id>/cancelar', methods=['POST'])
+def cancelar_lista_precios(lista_id):
+    try:
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE lista_precios SET estado = 'cancelada' WHERE id = ? AND estado = 'pendiente'",
+            (lista_id,)
+        )
+        conn.commit()
+        cancelada = cursor.rowcount == 1
+        conn.close()
+        if not cancelada:
+            return jsonify({'error': 'La lista no existe o no está pendiente'}), 409
+        despertar_programador()
+        return jsonify({'success': True})
+    except Exception as e:
+        print(f"Error en cancelar_lista_precios: {e}")
+        return jsonify({'error': str(e)}), 500
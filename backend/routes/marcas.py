@@ -1,29 +1,16 @@
 from flask import Blueprint, request, jsonify
 from config.database import get_db
 from utils.helpers import process_request_data
+from utils.catalogo import invalidar_catalogo
+from utils.taxonomia import respuesta_taxonomia, invalidar_taxonomia
 
 marcas_bp = Blueprint('marcas', __name__)
 
 @marcas_bp.route('/marcas')
 def get_marcas():
     try:
-        print("=== OBTENIENDO MARCAS ===")
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM marca ORDER BY nombre')
-        rows = cursor.fetchall()
-        
-        marcas = []
-        for row in rows:
-            marcas.append({
-                'id': row[0],
-                'nombre': row[1]
-            })
-        
-        conn.close()
-        print(f"=== RETORNANDO {len(marcas)} MARCAS ===")
-        return jsonify(marcas)
-        
+        # Servido desde la taxonomía cacheada (ver utils/taxonomia.py)
+        return respuesta_taxonomia('marcas')
     except Exception as e:
         print(f"Error en get_marcas: {e}")
         return jsonify({'error': str(e)}), 500
@@ -45,6 +32,7 @@ def crear_marca():
         marca_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        invalidar_taxonomia()
         
         print(f"=== MARCA CREADA CON ID {marca_id} ===")
         return jsonify({
@@ -70,6 +58,8 @@ def modificar_marca(id):
         cursor.execute('UPDATE marca SET nombre = ? WHERE id = ?', (data.get('nombre'), id))
         conn.commit()
         conn.close()
+        invalidar_catalogo()
+        invalidar_taxonomia()
         
         print(f"=== MARCA {id} MODIFICADA EXITOSAMENTE ===")
         return jsonify({
@@ -106,6 +96,8 @@ def borrar_marca(id):
         
         conn.commit()
         conn.close()
+        invalidar_catalogo()
+        invalidar_taxonomia()
         
         print(f"=== MARCA {id} ELIMINADA EXITOSAMENTE ===")
         return jsonify({
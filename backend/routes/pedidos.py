@@ -1,36 +1,117 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, send_file, Response
 from models import db, Pedido, PedidoItem, Usuario, Producto
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, selectinload
 from functools import wraps
+from utils.stock import consumo_item, reservar_stock, faltantes_stock, devolver_stock
+from utils.carrito import leer_items, cotizar, obtener_costo_envio_config, guardar_costo_envio_config
+from utils.catalogo import leer_tarjetas
+from utils.picking import armar_lista_picking, exportar_csv, exportar_xlsx
+from utils.eventos import registrar_evento, conteos_por_estado, avisar, suscribir, desuscribir, transmitir, limpiar_eventos
+from config.database import get_argentina_datetime
+from utils.idempotencia import (
+    LARGO_MAXIMO_CLAVE, huella_pedido, leer_clave, reclamar_clave, guardar_respuesta, limpiar_vencidas
+)
+from datetime import datetime, timedelta
 import jwt
-import json
-import os
 
 pedidos_bp = Blueprint('pedidos', __name__)
 
-# Archivo de configuración para el costo de envío
-CONFIG_FILE = os.path.join(os.path.dirname(__file__), '..', 'config', 'envio_config.json')
+def _ejecutar_sql(sql, params):
+    """SQL directo dentro de la transacción de la sesión (para utils/stock.py)"""
+    return db.session.connection().exec_driver_sql(sql, tuple(params))
 
-def obtener_costo_envio_config():
-    """Obtener el costo de envío desde el archivo de configuración"""
-    try:
-        if os.path.exists(CONFIG_FILE):
-            with open(CONFIG_FILE, 'r') as f:
-                config = json.load(f)
-                return config.get('costo_envio', 500.0)
-        return 500.0  # Valor por defecto
-    except:
-        return 500.0
-
-def guardar_costo_envio_config(costo):
-    """Guardar el costo de envío en el archivo de configuración"""
-    try:
-        os.makedirs(os.path.dirname(CONFIG_FILE), exist_ok=True)
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump({'costo_envio': costo}, f)
-        return True
-    except Exception as e:
-        print(f"Error guardando configuración: {e}")
-        return False
+ESTADOS_PEDIDO = ('pendiente', 'entregado', 'cancelado')
+
+# Cambios de estado permitidos. Entregado -> pendiente deshace una entrega
+# marcada por error; un entregado no se cancela directamente.
+TRANSICIONES = {
+    'pendiente': {'entregado', 'cancelado'},
+    'entregado': {'pendiente'},
+    'cancelado': {'pendiente'},
+}
+
+MAXIMO_PEDIDOS_LOTE = 500
+
+def _stock_del_pedido(pedido):
+    """{producto_id: cantidad} reservada por los ítems del pedido"""
+    consumos = {}
+    for item in pedido.items:
+        if item.stock_descontado:
+            consumos[item.producto_id] = consumos.get(item.producto_id, 0) + item.stock_descontado
+    return consumos
+
+def _respuesta_repetida(usuario_id, clave, huella):
+    """La respuesta ya guardada para una Idempotency-Key, o None si la clave es nueva"""
+    fila = leer_clave(_ejecutar_sql, usuario_id, clave)
+    if fila is None:
+        return None
+    huella_guardada, estado_http, cuerpo = fila
+    if huella_guardada != huella:
+        return jsonify({'error': 'La Idempotency-Key ya se usó con otro pedido'}), 422
+    if cuerpo is None:
+        return jsonify({'error': 'Hay un pedido en proceso con esta Idempotency-Key'}), 409
+    respuesta = current_app.response_class(cuerpo, status=estado_http, mimetype='application/json')
+    respuesta.headers['Idempotent-Replayed'] = 'true'
+    return respuesta
+
+def _sumar_consumos(pedidos):
+    consumos = {}
+    for pedido in pedidos:
+        for producto_id, cantidad in _stock_del_pedido(pedido).items():
+            consumos[producto_id] = consumos.get(producto_id, 0) + cantidad
+    return consumos
+
+def _cambiar_estado(pedidos, nuevo_estado):
+    """
+    Pasar los pedidos a `nuevo_estado` dentro de la transacción actual.
+
+    Valida cada transición, actualiza con un UPDATE por estado de origen
+    (condicionado a que nadie lo haya cambiado mientras tanto) y devuelve o
+    reserva el stock de todos los pedidos juntos. Los que ya están en ese
+    estado se dejan como están. Devuelve (pedidos cambiados, None) o
+    (None, respuesta de error) después de deshacer la transacción.
+    """
+    invalidos = [
+        {'id': p.id, 'estado': p.estado} for p in pedidos
+        if p.estado != nuevo_estado and nuevo_estado not in TRANSICIONES.get(p.estado, ESTADOS_PEDIDO)
+    ]
+    if invalidos:
+        return None, (jsonify({'error': f'No se puede pasar a "{nuevo_estado}"', 'invalidos': invalidos}), 409)
+
+    cambian = [p for p in pedidos if p.estado != nuevo_estado]
+    por_estado = {}
+    for pedido in cambian:
+        por_estado.setdefault(pedido.estado, []).append(pedido.id)
+    for estado_anterior, ids in por_estado.items():
+        placeholders = ', '.join('?' for _ in ids)
+        actualizados = _ejecutar_sql(
+            f'UPDATE pedidos SET estado = ? WHERE estado = ? AND id IN ({placeholders})',
+            [nuevo_estado, estado_anterior, *ids]
+        ).rowcount
+        if actualizados != len(ids):
+            db.session.rollback()
+            return None, (jsonify({'error': 'Otro usuario cambió alguno de los pedidos, recargá la cola'}), 409)
+
+    # Cancelar devuelve el stock reservado; reactivar un cancelado lo vuelve a reservar
+    if nuevo_estado == 'cancelado':
+        devolver_stock(_ejecutar_sql, _sumar_consumos(cambian))
+    else:
+        consumos = _sumar_consumos(p for p in cambian if p.estado == 'cancelado')
+        if not reservar_stock(_ejecutar_sql, consumos):
+            db.session.rollback()
+            faltantes = faltantes_stock(_ejecutar_sql, consumos)
+            db.session.rollback()
+            return None, (jsonify({'error': 'Stock insuficiente para reactivar el pedido', 'faltantes': faltantes}), 409)
+
+    # Aviso para las pantallas de pedidos abiertas (se publica con el commit)
+    if cambian:
+        registrar_evento(_ejecutar_sql, 'pedidos_estado', {
+            'pedido_ids': [p.id for p in cambian],
+            'estado': nuevo_estado,
+            'conteos': conteos_por_estado(_ejecutar_sql)
+        })
+    return cambian, None
 
 # Decorador para verificar token JWT
 def token_required(f):
@@ -80,19 +161,38 @@ def crear_pedido(current_user):
         "items": [
             {
                 "producto_id": int,
-                "nombre": string,
-                "precio": float,
                 "cantidad": int,
                 "es_fraccionado": bool (opcional),
-                "cantidad_personalizada": int (opcional, gramos/ml),
-                "unidad": string (opcional, "gr", "ml", etc)
+                "cantidad_personalizada": int (opcional, gramos/ml)
             }
         ]
     }
+
+    Los precios, nombres y el costo de envío se calculan en el servidor con
+    los valores vigentes (ver utils/carrito.py); los que mande el cliente
+    ("precio", "nombre", "unidad") se ignoran.
+
+    Con el header Idempotency-Key, repetir el mismo pedido devuelve la
+    respuesta original sin crear otro (ver utils/idempotencia.py).
     """
     try:
         data = request.get_json()
         
+        clave = request.headers.get('Idempotency-Key')
+        if clave:
+            if len(clave) > LARGO_MAXIMO_CLAVE:
+                return jsonify({'error': 'Idempotency-Key demasiado larga'}), 400
+            huella = huella_pedido(data)
+            repetida = _respuesta_repetida(current_user.id, clave, huella)
+            if repetida is not None:
+                return repetida
+            # Primera escritura de la transacción: un reintento simultáneo espera acá
+            if not reclamar_clave(_ejecutar_sql, current_user.id, clave, huella):
+                db.session.rollback()
+                return _respuesta_repetida(current_user.id, clave, huella) or (
+                    jsonify({'error': 'Hay un pedido en proceso con esta Idempotency-Key'}), 409
+                )
+        
         # Validar campos requeridos
         if not data.get('tipo_entrega') or not data.get('metodo_pago') or not data.get('items'):
             return jsonify({'error': 'Faltan campos requeridos'}), 400
@@ -119,40 +219,38 @@ def crear_pedido(current_user):
             # Para retiro, establecer método de pago como 'local' (todos los métodos disponibles)
             data['metodo_pago'] = 'local'
         
-        # Calcular subtotal
-        subtotal = 0
+        try:
+            items = leer_items(data['items'])
+        except (ValueError, TypeError, KeyError) as e:
+            return jsonify({'error': f'Pedido inválido: {e}'}), 400
+        
+        # Precios leídos de la BD en este momento (no de la cache): se cobra el vigente
+        ids = {item['producto_id'] for item in items}
+        cotizacion = cotizar(items, leer_tarjetas(ids), tipo_entrega)
+        for problema in cotizacion['problemas']:
+            if problema['motivo'] == 'inexistente':
+                return jsonify({'error': f'Producto {problema["producto_id"]} no encontrado'}), 404
+        if cotizacion['problemas']:
+            return jsonify({'error': 'Hay productos que no se pueden vender', 'problemas': cotizacion['problemas']}), 409
+        
+        # Stock que consume cada línea, sumado por producto para reservarlo de una vez
+        productos = {p.id: p for p in Producto.query.filter(Producto.id.in_(ids)).all()}
+        consumos = {}
         items_procesados = []
-        
-        for item in data['items']:
-            # Validar que el producto existe
-            producto = Producto.query.get(item['producto_id'])
-            if not producto:
-                return jsonify({'error': f'Producto {item["producto_id"]} no encontrado'}), 404
-            
-            # Calcular subtotal del item
-            if item.get('es_fraccionado'):
-                item_subtotal = item['precio']
-            else:
-                item_subtotal = item['precio'] * item['cantidad']
-            
-            subtotal += item_subtotal
-            
-            items_procesados.append({
-                'producto_id': item['producto_id'],
-                'nombre': item['nombre'],
-                'precio': item['precio'],
-                'cantidad': item['cantidad'],
-                'es_fraccionado': item.get('es_fraccionado', False),
-                'cantidad_personalizada': item.get('cantidad_personalizada'),
-                'unidad': item.get('unidad'),
-                'subtotal': item_subtotal
-            })
-        
-        # Calcular costo de envío desde la configuración
-        COSTO_ENVIO = obtener_costo_envio_config() if tipo_entrega == 'envio' else 0.0
-        
-        # Calcular total
-        total = subtotal + COSTO_ENVIO
+        for linea in cotizacion['items']:
+            producto = productos[linea['producto_id']]
+            consumo = consumo_item(producto, linea)
+            if producto.stock is not None:
+                consumos[producto.id] = consumos.get(producto.id, 0) + consumo
+            items_procesados.append(dict(linea, stock_descontado=consumo if producto.stock is not None else None))
+        
+        # Reservar el stock de todo el carrito con un UPDATE condicional, dentro de la
+        # misma transacción que el pedido: si no alcanza para algún producto no se crea nada
+        if not reservar_stock(_ejecutar_sql, consumos):
+            db.session.rollback()
+            faltantes = faltantes_stock(_ejecutar_sql, consumos)
+            db.session.rollback()
+            return jsonify({'error': 'Stock insuficiente', 'faltantes': faltantes}), 409
         
         # Crear el pedido
         nuevo_pedido = Pedido(
@@ -163,9 +261,9 @@ def crear_pedido(current_user):
             numero_calle=data.get('numero_calle'),
             entre_calles=data.get('entre_calles'),
             metodo_pago=data['metodo_pago'],
-            subtotal=subtotal,
-            costo_envio=COSTO_ENVIO,
-            total=total,
+            subtotal=cotizacion['subtotal'],
+            costo_envio=cotizacion['costo_envio'],
+            total=cotizacion['total'],
             estado='pendiente'
         )
         
@@ -183,16 +281,41 @@ def crear_pedido(current_user):
                 es_fraccionado=item['es_fraccionado'],
                 cantidad_personalizada=item['cantidad_personalizada'],
                 unidad=item['unidad'],
-                subtotal=item['subtotal']
+                subtotal=item['subtotal'],
+                stock_descontado=item['stock_descontado']
             )
             db.session.add(pedido_item)
         
-        db.session.commit()
+        # El carrito guardado en el servidor ya se convirtió en este pedido
+        _ejecutar_sql('DELETE FROM carrito_items WHERE usuario_id = ?', [current_user.id])
         
-        return jsonify({
+        cuerpo = {
             'mensaje': 'Pedido creado exitosamente',
             'pedido': nuevo_pedido.to_dict()
-        }), 201
+        }
+        if clave:
+            guardar_respuesta(_ejecutar_sql, current_user.id, clave, 201, cuerpo)
+        
+        pedido = cuerpo['pedido']
+        registrar_evento(_ejecutar_sql, 'pedido_creado', {
+            'id': pedido['id'],
+            'estado': pedido['estado'],
+            'tipo_entrega': pedido['tipo_entrega'],
+            'total': pedido['total'],
+            'fecha_pedido': pedido['fecha_pedido'],
+            'cliente': f"{current_user.nombre} {current_user.apellido}",
+            'cantidad_items': len(items_procesados),
+            'conteos': conteos_por_estado(_ejecutar_sql)
+        })
+        
+        db.session.commit()
+        avisar()
+        
+        if clave:
+            limpiar_vencidas()
+        limpiar_eventos()
+        
+        return jsonify(cuerpo), 201
         
     except Exception as e:
         db.session.rollback()
@@ -250,13 +373,14 @@ def actualizar_estado_pedido(current_user, pedido_id):
         data = request.get_json()
         nuevo_estado = data.get('estado')
         
-        estados_validos = ['pendiente', 'entregado', 'cancelado']
-        
-        if nuevo_estado not in estados_validos:
+        if nuevo_estado not in ESTADOS_PEDIDO:
             return jsonify({'error': 'Estado inválido'}), 400
         
-        pedido.estado = nuevo_estado
+        _, error = _cambiar_estado([pedido], nuevo_estado)
+        if error:
+            return error
         db.session.commit()
+        avisar()
         
         return jsonify({
             'mensaje': 'Estado actualizado exitosamente',
@@ -327,3 +451,235 @@ def obtener_todos_pedidos_admin(current_user):
     except Exception as e:
         print(f"Error al obtener todos los pedidos: {str(e)}")
         return jsonify({'error': 'Error al obtener los pedidos'}), 500
+
+@pedidos_bp.route('/api/pedidos/admin/cola', methods=['GET'])
+@token_required
+def obtener_cola_pedidos(current_user):
+    """
+    Cola de despacho (solo admin): los pedidos de un estado, del más viejo al
+    más nuevo, con sus ítems y cliente cargados en dos consultas.
+
+    Parámetros: estado (pendiente por defecto), tipo_entrega (envio|retiro),
+    limite (200 por defecto). Incluye la cantidad de pedidos por estado para
+    los contadores de la pantalla, sin traer el historial.
+    """
+    try:
+        if current_user.role != 'admin':
+            return jsonify({'error': 'No autorizado'}), 403
+        
+        estado = request.args.get('estado', 'pendiente')
+        if estado not in ESTADOS_PEDIDO:
+            return jsonify({'error': 'Estado inválido'}), 400
+        tipo_entrega = request.args.get('tipo_entrega')
+        limite = min(request.args.get('limite', 200, type=int), MAXIMO_PEDIDOS_LOTE)
+        
+        # Recorre idx_pedidos_estado_fecha en orden
+        consulta = Pedido.query.options(joinedload(Pedido.usuario), selectinload(Pedido.items)) \
+            .filter(Pedido.estado == estado)
+        if tipo_entrega:
+            consulta = consulta.filter(Pedido.tipo_entrega == tipo_entrega)
+        pedidos = consulta.order_by(Pedido.fecha_pedido, Pedido.id).limit(limite).all()
+        
+        conteos = dict.fromkeys(ESTADOS_PEDIDO, 0)
+        conteos.update(db.session.query(Pedido.estado, func.count()).group_by(Pedido.estado).all())
+        
+        return jsonify({
+            'pedidos': [pedido.to_dict() for pedido in pedidos],
+            'conteos': conteos
+        }), 200
+        
+    except Exception as e:
+        print(f"Error al obtener la cola de pedidos: {str(e)}")
+        return jsonify({'error': 'Error al obtener la cola de pedidos'}), 500
+
+@pedidos_bp.route('/api/pedidos/admin/estado', methods=['PATCH'])
+@token_required
+def actualizar_estado_pedidos_lote(current_user):
+    """
+    Cambiar el estado de varios pedidos en una sola transacción (solo admin).
+
+    Body: {"pedido_ids": [1, 2, 3], "estado": "entregado"}
+
+    Es todo o nada: si algún pedido no existe, no admite la transición o
+    no hay stock para reactivarlo, no se cambia ninguno. Devuelve solo los
+    ids y el estado nuevo para actualizar la pantalla sin recargar.
+    """
+    try:
+        if current_user.role != 'admin':
+            return jsonify({'error': 'No autorizado'}), 403
+        
+        data = request.get_json(silent=True) or {}
+        nuevo_estado = data.get('estado')
+        if nuevo_estado not in ESTADOS_PEDIDO:
+            return jsonify({'error': 'Estado inválido'}), 400
+        try:
+            ids = list(dict.fromkeys(int(i) for i in data.get('pedido_ids') or []))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'pedido_ids debe ser una lista de ids'}), 400
+        if not ids or len(ids) > MAXIMO_PEDIDOS_LOTE:
+            return jsonify({'error': f'Se requieren entre 1 y {MAXIMO_PEDIDOS_LOTE} pedidos'}), 400
+        
+        pedidos = Pedido.query.options(selectinload(Pedido.items)).filter(Pedido.id.in_(ids)).all()
+        inexistentes = sorted(set(ids) - {p.id for p in pedidos})
+        if inexistentes:
+            return jsonify({'error': 'Pedidos no encontrados', 'pedido_ids': inexistentes}), 404
+        
+        cambiados, error = _cambiar_estado(pedidos, nuevo_estado)
+        if error:
+            return error
+        db.session.commit()
+        avisar()
+        
+        return jsonify({
+            'mensaje': f'{len(cambiados)} pedidos pasaron a "{nuevo_estado}"',
+            'actualizados': [p.id for p in cambiados],
+            'estado': nuevo_estado
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error al actualizar estados en lote: {str(e)}")
+        return jsonify({'error': 'Error al actualizar los estados'}), 500
+
+# Token del stream de eventos: EventSource no manda headers y la URL queda en
+# logs e historial, así que en lugar del JWT de sesión va uno de un solo uso
+# (con `aud`, que los demás decoradores rechazan) y de vida corta
+AUDIENCIA_EVENTOS = 'eventos_pedidos'
+DURACION_TOKEN_EVENTOS = timedelta(seconds=60)
+
+@pedidos_bp.route('/api/pedidos/admin/eventos/token', methods=['POST'])
+@token_required
+def token_eventos_pedidos_admin(current_user):
+    """Token para abrir el stream de eventos (solo admin); vence a los 60 segundos"""
+    try:
+        if current_user.role != 'admin':
+            return jsonify({'error': 'No autorizado'}), 403
+        
+        token = jwt.encode({
+            'user_id': current_user.id,
+            'aud': AUDIENCIA_EVENTOS,
+            'exp': datetime.utcnow() + DURACION_TOKEN_EVENTOS
+        }, current_app.config['SECRET_KEY'], algorithm='HS256')
+        return jsonify({'token': token, 'expira_en': int(DURACION_TOKEN_EVENTOS.total_seconds())}), 200
+        
+    except Exception as e:
+        print(f"Error al generar el token de eventos: {str(e)}")
+        return jsonify({'error': 'Error al generar el token de eventos'}), 500
+
+@pedidos_bp.route('/api/pedidos/admin/eventos', methods=['GET'])
+def eventos_pedidos_admin():
+    """
+    Stream de server-sent events con los pedidos nuevos y los cambios de
+    estado (solo admin), para no recargar la lista entera.
+
+    EventSource no permite mandar headers: va en ?token= uno obtenido con
+    POST /api/pedidos/admin/eventos/token (el JWT de sesión no sirve). Se
+    valida solo al conectar. Para retomar después de un corte se usa el
+    header Last-Event-ID (el navegador lo manda solo al reconectarse) o
+    ?desde=<id>.
+
+    Eventos:
+      pedido_creado   {"id", "estado", "tipo_entrega", "total", "fecha_pedido",
+                       "cliente", "cantidad_items", "conteos"}
+      pedidos_estado  {"pedido_ids", "estado", "conteos"}
+      recargar        los eventos pendientes ya se borraron: recargar la lista
+    """
+    try:
+        token = request.args.get('token', '')
+        try:
+            secret_key = current_app.config.get('SECRET_KEY', 'tu_clave_secreta_muy_segura_aqui_cambiar_en_produccion')
+            data = jwt.decode(token, secret_key, algorithms=["HS256"], audience=AUDIENCIA_EVENTOS)
+        except jwt.ExpiredSignatureError:
+            return jsonify({'error': 'Token expirado'}), 401
+        except jwt.InvalidTokenError:
+            return jsonify({'error': 'Token inválido'}), 401
+        
+        current_user = Usuario.query.get(data.get('user_id'))
+        if not current_user or current_user.role != 'admin':
+            return jsonify({'error': 'No autorizado'}), 403
+        
+        desde = request.headers.get('Last-Event-ID') or request.args.get('desde')
+        try:
+            desde_id = int(desde) if desde else None
+        except ValueError:
+            return jsonify({'error': 'Last-Event-ID inválido'}), 400
+        
+        # Cada stream ocupa un thread: el navegador reintenta más tarde
+        if not suscribir():
+            return jsonify({'error': 'Demasiadas conexiones de eventos abiertas'}), 503
+        try:
+            # El stream no usa la sesión: liberar su conexión antes de quedar esperando
+            db.session.remove()
+            respuesta = Response(transmitir(desde_id), mimetype='text/event-stream', headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'
+            })
+        except Exception:
+            desuscribir()
+            raise
+        # El servidor cierra la respuesta al terminar o cortarse, aunque el stream no haya empezado
+        respuesta.call_on_close(desuscribir)
+        return respuesta
+        
+    except Exception as e:
+        print(f"Error al abrir los eventos de pedidos: {str(e)}")
+        return jsonify({'error': 'Error al abrir los eventos de pedidos'}), 500
+
+@pedidos_bp.route('/api/pedidos/admin/picking', methods=['GET'])
+@token_required
+def obtener_lista_picking(current_user):
+    """
+    Lista de picking (solo admin): total a preparar de cada producto en los
+    pedidos pendientes, con una sola consulta agregada.
+
+    Parámetros: tipo_entrega (envio|retiro), por_entrega=true para separar
+    envíos y retiros, pedido_ids=1,2,3 para limitarla a una selección y
+    formato=json (por defecto) | csv | xlsx para descargarla como planilla.
+    """
+    try:
+        if current_user.role != 'admin':
+            return jsonify({'error': 'No autorizado'}), 403
+        
+        formato = request.args.get('formato', 'json')
+        if formato not in ('json', 'csv', 'xlsx'):
+            return jsonify({'error': 'Formato inválido'}), 400
+        try:
+            pedido_ids = [int(i) for i in request.args.get('pedido_ids', '').split(',') if i.strip()]
+        except ValueError:
+            return jsonify({'error': 'pedido_ids debe ser una lista de ids'}), 400
+        if len(pedido_ids) > MAXIMO_PEDIDOS_LOTE:
+            return jsonify({'error': f'Se admiten hasta {MAXIMO_PEDIDOS_LOTE} pedidos'}), 400
+        
+        productos = armar_lista_picking(
+            _ejecutar_sql,
+            por_entrega=request.args.get('por_entrega', 'false').lower() == 'true',
+            tipo_entrega=request.args.get('tipo_entrega'),
+            pedido_ids=pedido_ids
+        )
+        fecha = get_argentina_datetime()
+        
+        if formato == 'json':
+            return jsonify({'productos': productos, 'fecha': fecha.isoformat()}), 200
+        
+        nombre = f"picking_{fecha.strftime('%Y-%m-%d_%H-%M')}"
+        if formato == 'xlsx':
+            try:
+                salida = exportar_xlsx(productos, f"Picking - pedidos pendientes al {fecha.strftime('%d/%m/%Y %H:%M')}")
+                return send_file(
+                    salida,
+                    mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                    as_attachment=True,
+                    download_name=f'{nombre}.xlsx'
+                )
+            except ImportError:
+                print("openpyxl no disponible, usando CSV...")
+        
+        return Response(
+            exportar_csv(productos),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename={nombre}.csv'}
+        )
+        
+    except Exception as e:
+        print(f"Error al armar la lista de picking: {str(e)}")
+        return jsonify({'error': 'Error al armar la lista de picking'}), 500
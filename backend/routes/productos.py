@@ -1,191 +1,291 @@
-from flask import Blueprint, request, jsonify
-from config.database import get_db, get_argentina_time
-from utils.helpers import process_request_data, validate_required_fields
+from flask import Blueprint, Response, request, jsonify
+from datetime import datetime
+import hashlib
+import json
+import math
+import sqlite3
+from config.database import get_db, get_argentina_time, argentina_a_utc
+from utils.helpers import process_request_data, validate_required_fields, slug_producto, id_desde_slug
+from utils.catalogo import (
+    invalidar_catalogo, obtener_catalogo, obtener_productos, obtener_listado_json, referencia_imagen,
+    construir_tarjetas
+)
+from utils.facetas import calcular_facetas, TIPOS_VENTA
+from utils.indice_catalogo import obtener_indice, contar_bits
+from utils.precios import (
+    calcular_precios, cargar_columnas_precio, recalcular_precios, resumir_diferencias,
+    condicion_alcance, guardar_precios, normalizar_columnas, COLUMNAS_PRECIO, MODOS_REDONDEO
+)
+from config.esquema import filtrar_columnas, sentencia_insert, sentencia_update
 
 productos_bp = Blueprint('productos', __name__)
 
+# Valores por defecto para columnas opcionales que una BD vieja puede no tener
+DEFAULTS_PRODUCTO = {
+    'unidad_id': None,
+    'cantidad_unidades': 1,
+    'cantidad': 100,
+    'precio_por_unidad': 0,
+    'precio_fraccionado_por_100': 0,
+    'tipo_calculo': 'peso'
+}
+
 @productos_bp.route('/productos')
 def get_productos():
+    """
+    Todos los productos con sus imágenes como referencias (es_url), para el
+    admin. El JSON se arma una vez por versión del catálogo; mientras se
+    reconstruye tras un cambio, los requests concurrentes no lo recalculan.
+    """
+    try:
+        cuerpo, etag = obtener_listado_json()
+        respuesta = Response(cuerpo, mimetype='application/json')
+        respuesta.set_etag(etag)
+        respuesta.headers['Cache-Control'] = 'no-cache'
+        return respuesta.make_conditional(request)
+    except Exception as e:
+        print(f"Error en get_productos: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def _detalle_producto(producto_id):
+    """
+    Tarjeta del catálogo con todas las imágenes (como referencias, sin BLOBs)
+    y el slug canónico. None si el producto no existe.
+    """
+    tarjeta = obtener_catalogo().get(producto_id)
+    if tarjeta is None:
+        return None
+
+    conn = get_db()
+    conn.row_factory = sqlite3.Row
     try:
-        conn = get_db()
         cursor = conn.cursor()
-        
         cursor.execute('''
-            SELECT p.*, pr.nombre as proveedor, c.nombre as categoria, m.nombre as marca,
-                   u.nombre as unidad_nombre, u.abreviacion as unidad_abrev
-            FROM producto p
-            JOIN proveedor pr ON p.proveedor_id = pr.id
-            JOIN categoria c ON p.categoria_id = c.id
-            JOIN marca m ON p.marca_id = m.id
-            LEFT JOIN unidad u ON p.unidad_id = u.id
-            ORDER BY p.id
-        ''')
-        
-        rows = cursor.fetchall()
-        productos = []
-        
-        for row in rows:
-            # Obtener etiquetas del producto
-            cursor.execute('''
-                SELECT ta.id, ta.nombre
-                FROM tipo_alimento ta
-                JOIN producto_etiquetas pe ON ta.id = pe.etiqueta_id
-                WHERE pe.producto_id = ?
-            ''', (row[0],))
-            
-            etiquetas = [{'id': e[0], 'nombre': e[1]} for e in cursor.fetchall()]
-            
-            # Obtener imágenes del producto
-            cursor.execute('''
-                SELECT id, url, imagen_blob, es_url, posicion, titulo
-                FROM imagen_producto 
-                WHERE producto_id = ? 
-                ORDER BY posicion
-            ''', (row[0],))
-            
-            imagenes_rows = cursor.fetchall()
-            imagenes = []
-            for img_row in imagenes_rows:
-                imagen = {
-                    'id': img_row[0],
-                    'url': img_row[1] if img_row[3] else None,
-                    'imagen_base64': None,
-                    'es_url': bool(img_row[3]),
-                    'posicion': img_row[4],
-                    'titulo': img_row[5]
-                }
-                # Si tiene imagen_blob, convertir a base64
-                if img_row[2]:
-                    import base64
-                    imagen['imagen_base64'] = base64.b64encode(img_row[2]).decode('utf-8')
-                    imagen['es_url'] = False
-                    
-                imagenes.append(imagen)
-            
-            # Mapear campos según la nueva estructura
-            producto = {
-                'id': row[0],
-                'nombre': row[1],
-                'precio': row[2],
-                'disponible': bool(row[3]),
-                'descripcion': row[4],
-                'precio_costo': row[5],
-                'porcentaje_ganancia': row[6],
-                'precio_venta_publico': row[7],
-                'fecha_ultima_modificacion': row[8],
-                'proveedor_id': row[9],
-                'categoria_id': row[10],
-                'marca_id': row[11],
-                'unidad_id': row[12] if len(row) > 12 else None,
-                'cantidad_unidades': row[13] if len(row) > 13 else 1,
-                'cantidad': row[14] if len(row) > 14 else 100,
-                'precio_por_unidad': row[15] if len(row) > 15 else 0,
-                'precio_fraccionado_por_100': row[16] if len(row) > 16 else 0,
-                'tipo_calculo': row[17] if len(row) > 17 else 'peso',
-                'proveedor': row[-5],
-                'categoria': row[-4],
-                'marca': row[-3],
-                'unidad_nombre': row[-2] if len(row) > 20 else None,
-                'unidad_abrev': row[-1] if len(row) > 20 else None,
-                'etiquetas': etiquetas,
-                'etiquetas_ids': [e['id'] for e in etiquetas],
-                'imagenes': imagenes
-            }
-            productos.append(producto)
-        
+            SELECT id, url, posicion, titulo, imagen_blob IS NOT NULL AS tiene_blob
+            FROM imagen_producto
+            WHERE producto_id = ?
+            ORDER BY posicion, id
+        ''', (producto_id,))
+        imagenes = [referencia_imagen(row) for row in cursor.fetchall()]
+    finally:
         conn.close()
-        return jsonify(productos)
-        
+
+    # Copia: la tarjeta se comparte entre requests
+    return dict(
+        tarjeta,
+        imagenes=imagenes,
+        imagen_principal=imagenes[0] if imagenes else None,
+        slug=slug_producto(tarjeta)
+    )
+
+def _respuesta_detalle(detalle):
+    """
+    JSON del detalle con ETag y Last-Modified (fecha_ultima_modificacion),
+    `no-cache` para que el navegador revalide y reciba 304 si no cambió
+    """
+    cuerpo = json.dumps(detalle, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    respuesta = Response(cuerpo, mimetype='application/json')
+    respuesta.set_etag(hashlib.sha1(cuerpo).hexdigest()[:16])
+    respuesta.headers['Cache-Control'] = 'public, no-cache'
+    try:
+        fecha = detalle.get('fecha_ultima_modificacion')
+        if fecha:
+            respuesta.last_modified = argentina_a_utc(datetime.fromisoformat(str(fecha)))
+    except ValueError:
+        pass  # Fecha con formato desconocido: queda solo el ETag
+    return respuesta.make_conditional(request)
+
+@productos_bp.route('/productos/<int:id>')
+def get_producto(id):
+    """Un producto con todas sus imágenes, para la página de detalle"""
+    try:
+        detalle = _detalle_producto(id)
+        if detalle is None:
+            return jsonify({'error': 'Producto no encontrado'}), 404
+        return _respuesta_detalle(detalle)
     except Exception as e:
-        print(f"Error en get_productos: {e}")
+        print(f"Error en get_producto: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@productos_bp.route('/productos/slug/<slug>')
+def get_producto_por_slug(slug):
+    """
+    Igual que /productos/<id> pero con el slug nombre-marca-id de la URL
+    del frontend. Solo cuenta el id final: si el nombre cambió, la respuesta
+    trae el slug canónico en "slug" para corregir la URL.
+    """
+    try:
+        producto_id = id_desde_slug(slug)
+        detalle = _detalle_producto(producto_id) if producto_id else None
+        if detalle is None:
+            return jsonify({'error': 'Producto no encontrado'}), 404
+        return _respuesta_detalle(detalle)
+    except Exception as e:
+        print(f"Error en get_producto_por_slug: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@productos_bp.route('/productos/cambios')
+def get_cambios_productos():
+    """
+    Sincronización incremental del catálogo.
+
+    Sin `since` devuelve todas las tarjetas y un token. Con `since=<token>`
+    devuelve solo las tarjetas de los productos que cambiaron desde ese token
+    y los ids eliminados. El cliente guarda el token nuevo y aplica:
+    reemplaza las tarjetas recibidas y borra los eliminados.
+    """
+    try:
+        since = request.args.get('since')
+        try:
+            since = int(since) if since not in (None, '') else None
+            if since is not None and since < 0:
+                raise ValueError
+        except ValueError:
+            return jsonify({'error': 'Token "since" inválido'}), 400
+
+        conn = get_db()
+        conn.row_factory = sqlite3.Row
+        conn.isolation_level = None
+        cursor = conn.cursor()
+        try:
+            # Token, cambios y tarjetas leídos de una misma instantánea de la BD
+            cursor.execute('BEGIN')
+            cursor.execute('SELECT valor FROM catalogo_version WHERE id = 1')
+            token = cursor.fetchone()[0]
+            if since is not None and since > token:
+                since = None  # Token de otra BD (p. ej. restaurada): sincronizar todo
+            if since is None:
+                tarjetas = construir_tarjetas(cursor)
+                eliminados = []
+            else:
+                cursor.execute(
+                    'SELECT producto_id FROM producto_cambios WHERE version > ? AND eliminado = 1', (since,)
+                )
+                eliminados = [row[0] for row in cursor.fetchall()]
+                tarjetas = construir_tarjetas(
+                    cursor, 'SELECT producto_id FROM producto_cambios WHERE version > ? AND eliminado = 0', (since,)
+                )
+            cursor.execute('COMMIT')
+        finally:
+            conn.close()
+
+        return jsonify({
+            'token': str(token),
+            'completo': since is None,
+            'productos': list(tarjetas.values()),
+            'eliminados': eliminados
+        })
+    except Exception as e:
+        print(f"Error en get_cambios_productos: {e}")
         return jsonify({'error': str(e)}), 500
 
 @productos_bp.route('/productos/por-categoria')
 def get_productos_por_categoria():
+    """
+    Vista previa de la tienda: los primeros `limite` productos disponibles de
+    cada categoría (4 por defecto) y el total de cada una.
+
+    La BD devuelve solo los ids de la vista previa (ROW_NUMBER por categoría)
+    y las tarjetas salen del catálogo en memoria, así que el costo no crece
+    con la cantidad de productos por categoría.
+    """
     try:
+        try:
+            limite = min(max(int(request.args.get('limite', 4)), 1), 50)
+        except ValueError:
+            return jsonify({'error': 'limite debe ser un número'}), 400
+
         conn = get_db()
         cursor = conn.cursor()
-        
         cursor.execute('''
-            SELECT c.id, c.nombre, 
-                   p.id, p.nombre, p.precio, p.descripcion, 
-                   m.nombre as marca,
-                   COUNT(*) OVER (PARTITION BY c.id) as total_productos
-            FROM categoria c
-            JOIN producto p ON c.id = p.categoria_id
-            JOIN marca m ON p.marca_id = m.id
-            WHERE p.disponible = 1
-            ORDER BY c.id, p.id
-        ''')
-        
+            SELECT c.id, c.nombre, x.producto_id, x.total_productos
+            FROM (
+                SELECT p.categoria_id, p.id AS producto_id,
+                       ROW_NUMBER() OVER (PARTITION BY p.categoria_id ORDER BY p.id) AS fila,
+                       COUNT(*) OVER (PARTITION BY p.categoria_id) AS total_productos
+                FROM producto p
+                WHERE p.disponible = 1
+            ) x
+            JOIN categoria c ON c.id = x.categoria_id
+            WHERE x.fila <= ?
+            ORDER BY c.id, x.producto_id
+        ''', (limite,))
         rows = cursor.fetchall()
-        
+        conn.close()
+
         categorias_dict = {}
-        for row in rows:
-            cat_id = row[0]
+        for cat_id, nombre, producto_id, total in rows:
             if cat_id not in categorias_dict:
                 categorias_dict[cat_id] = {
                     'id': cat_id,
-                    'nombre': row[1],
-                    'productos': [],
-                    'total_productos': row[7],
-                    'hay_mas': row[7] > 4
-                }
-            
-            # Obtener etiquetas del producto
-            cursor.execute('''
-                SELECT ta.id, ta.nombre
-                FROM tipo_alimento ta
-                JOIN producto_etiquetas pe ON ta.id = pe.etiqueta_id
-                WHERE pe.producto_id = ?
-            ''', (row[2],))
-            
-            etiquetas = [{'id': e[0], 'nombre': e[1]} for e in cursor.fetchall()]
-            
-            # Obtener imágenes del producto
-            cursor.execute('''
-                SELECT id, url, imagen_blob, es_url, posicion, titulo
-                FROM imagen_producto 
-                WHERE producto_id = ? 
-                ORDER BY posicion
-            ''', (row[2],))
-            
-            imagenes_rows = cursor.fetchall()
-            imagenes = []
-            for img_row in imagenes_rows:
-                imagen = {
-                    'id': img_row[0],
-                    'url': img_row[1] if img_row[3] else None,
-                    'imagen_base64': None,
-                    'es_url': bool(img_row[3]),
-                    'posicion': img_row[4],
-                    'titulo': img_row[5]
+                    'nombre': nombre,
+                    'productos_ids': [],
+                    'total_productos': total,
+                    'hay_mas': total > limite
                 }
-                if img_row[2]:
-                    import base64
-                    imagen['imagen_base64'] = base64.b64encode(img_row[2]).decode('utf-8')
-                    imagen['es_url'] = False
-                    
-                imagenes.append(imagen)
-            
-            if len(categorias_dict[cat_id]['productos']) < 4:
-                categorias_dict[cat_id]['productos'].append({
-                    'id': row[2],
-                    'nombre': row[3],
-                    'precio': row[4],
-                    'descripcion': row[5],
-                    'marca': row[6],
-                    'etiquetas': etiquetas,
-                    'imagenes': imagenes
-                })
-        
-        conn.close()
-        return jsonify(list(categorias_dict.values()))
-        
+            categorias_dict[cat_id]['productos_ids'].append(producto_id)
+
+        categorias = []
+        for categoria in categorias_dict.values():
+            ids = categoria.pop('productos_ids')
+            categoria['productos'] = obtener_productos(ids, solo_disponibles=True)
+            categorias.append(categoria)
+
+        return jsonify(categorias)
+
     except Exception as e:
         print(f"Error en get_productos_por_categoria: {e}")
         return jsonify({'error': str(e)}), 500
 
+@productos_bp.route('/productos/por-categoria/<int:categoria_id>')
+def get_productos_de_categoria(categoria_id):
+    """
+    Productos disponibles de una categoría, paginados por cursor (keyset).
+
+    `cursor` es el último id recibido: la consulta sigue desde ahí usando el
+    índice (categoria_id, disponible), sin OFFSET, así que cada página cuesta
+    lo mismo sin importar cuán lejos esté. El total solo se calcula en la
+    primera página.
+    """
+    try:
+        try:
+            limite = min(max(int(request.args.get('limite', 20)), 1), 100)
+            despues_de = int(request.args.get('cursor') or 0)
+        except ValueError:
+            return jsonify({'error': 'cursor y limite deben ser números'}), 400
+
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id FROM producto
+            WHERE categoria_id = ? AND disponible = 1 AND id > ?
+            ORDER BY id
+            LIMIT ?
+        ''', (categoria_id, despues_de, limite + 1))
+        ids = [row[0] for row in cursor.fetchall()]
+
+        respuesta = {'categoria_id': categoria_id}
+        if not despues_de:
+            cursor.execute(
+                'SELECT COUNT(*) FROM producto WHERE categoria_id = ? AND disponible = 1',
+                (categoria_id,)
+            )
+            respuesta['total_productos'] = cursor.fetchone()[0]
+        conn.close()
+
+        hay_mas = len(ids) > limite
+        ids = ids[:limite]
+        respuesta.update({
+            'productos': obtener_productos(ids, solo_disponibles=True),
+            'hay_mas': hay_mas,
+            'siguiente_cursor': ids[-1] if hay_mas else None
+        })
+        return jsonify(respuesta)
+
+    except Exception as e:
+        print(f"Error en get_productos_de_categoria: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @productos_bp.route('/productos', methods=['POST'])
 def crear_producto():
     try:
@@ -199,6 +299,12 @@ def crear_producto():
         if error:
             return jsonify({'error': error}), 400
         
+        try:
+            stock = _leer_stock(data.get('stock'))
+            stock_minimo = _leer_stock(data.get('stock_minimo'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         conn = get_db()
         cursor = conn.cursor()
         
@@ -211,17 +317,12 @@ def crear_producto():
         porcentaje_ganancia = float(data.get('porcentaje_ganancia', 0))
         
         # FÓRMULA CORREGIDA: precio_costo + (precio_costo * porcentaje_ganancia)
-        precio_final = precio_costo + (precio_costo * porcentaje_ganancia)
+        precio_final = calcular_precios(precio_costo, porcentaje_ganancia)['precio']
         
         print(f"Precio costo: {precio_costo}")
         print(f"Porcentaje ganancia (decimal): {porcentaje_ganancia}")
         print(f"Precio final calculado: {precio_final}")
         
-        # Verificar qué columnas existen en la tabla producto
-        cursor.execute("PRAGMA table_info(producto)")
-        columns = [col[1] for col in cursor.fetchall()]
-        print(f"Columnas disponibles: {columns}")
-        
         # Definir variables según el tipo de cálculo
         if tipo_calculo == 'unidad':
             # CASO 1: Por unidades
@@ -249,32 +350,21 @@ def crear_producto():
             'marca_id': int(data.get('marca_id')),
             'unidad_id': int(data.get('unidad_id')),
             'descripcion': data.get('descripcion', ''),
-            'fecha_ultima_modificacion': get_argentina_time()
+            'fecha_ultima_modificacion': get_argentina_time(),
+            'tipo_calculo': tipo_calculo,
+            'cantidad_unidades': cantidad_unidades,
+            'cantidad': cantidad,
+            'precio_por_unidad': precio_por_unidad,
+            'precio_fraccionado_por_100': precio_fraccionado_por_100,
+            'stock': stock,
+            'stock_minimo': stock_minimo
         }
         
-        # Agregar campos específicos según disponibilidad en la tabla
-        if 'tipo_calculo' in columns:
-            datos_base['tipo_calculo'] = tipo_calculo
-        
-        if 'cantidad_unidades' in columns:
-            datos_base['cantidad_unidades'] = cantidad_unidades
-        
-        if 'cantidad' in columns:
-            datos_base['cantidad'] = cantidad
-        
-        if 'precio_por_unidad' in columns:
-            datos_base['precio_por_unidad'] = precio_por_unidad
-        
-        if 'precio_fraccionado_por_100' in columns:
-            datos_base['precio_fraccionado_por_100'] = precio_fraccionado_por_100
+        # Descartar los campos que no existen en esta versión de la tabla
+        datos_base = filtrar_columnas('producto', datos_base)
         
-        # Construir consulta SQL dinámicamente
-        columnas = list(datos_base.keys())
+        sql = sentencia_insert('producto', tuple(datos_base))
         valores = list(datos_base.values())
-        placeholders = ', '.join(['?' for _ in columnas])
-        columnas_str = ', '.join(columnas)
-        
-        sql = f"INSERT INTO producto ({columnas_str}) VALUES ({placeholders})"
         
         print(f"SQL: {sql}")
         print(f"Valores: {valores}")
@@ -290,6 +380,7 @@ def crear_producto():
         
         conn.commit()
         conn.close()
+        invalidar_catalogo()
         
         print(f"=== PRODUCTO CREADO CON ID {producto_id} ===")
         return jsonify({
@@ -311,13 +402,15 @@ def modificar_producto(id):
         print(f"=== ACTUALIZANDO PRODUCTO {id} ===")
         print(f"Datos recibidos: {data}")
         
+        # El stock solo se toca si viene en el formulario (si no, se conserva el actual)
+        try:
+            stock = {campo: _leer_stock(data.get(campo)) for campo in ('stock', 'stock_minimo') if campo in data}
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         conn = get_db()
         cursor = conn.cursor()
         
-        # Verificar qué columnas existen
-        cursor.execute("PRAGMA table_info(producto)")
-        columns = [col[1] for col in cursor.fetchall()]
-        
         # Determinar tipo de cálculo
         tipo_calculo = data.get('tipo_calculo', 'peso')
         print(f"Tipo de cálculo: {tipo_calculo}")
@@ -327,89 +420,50 @@ def modificar_producto(id):
         porcentaje_ganancia = float(data.get('porcentaje_ganancia', 0))
         
         # FÓRMULA CORREGIDA: precio_costo + (precio_costo * porcentaje_ganancia)
-        precio_final = precio_costo + (precio_costo * porcentaje_ganancia)
+        precio_final = calcular_precios(precio_costo, porcentaje_ganancia)['precio']
         
         print(f"Precio costo: {precio_costo}")
         print(f"Porcentaje ganancia (decimal): {porcentaje_ganancia}")
         print(f"Precio final calculado: {precio_final}")
         
         # Preparar campos base
-        campos_update = [
-            'nombre = ?', 'precio_costo = ?', 'porcentaje_ganancia = ?',
-            'precio = ?', 'precio_venta_publico = ?', 'disponible = ?',
-            'proveedor_id = ?', 'categoria_id = ?', 'marca_id = ?', 
-            'descripcion = ?', 'fecha_ultima_modificacion = ?'
-        ]
-        
-        valores_update = [
-            data.get('nombre'),
-            precio_costo,
-            porcentaje_ganancia,
-            precio_final,
-            precio_final,
-            data.get('disponible', True),
-            int(data.get('proveedor_id')),
-            int(data.get('categoria_id')),
-            int(data.get('marca_id')),
-            data.get('descripcion'),
-            get_argentina_time()
-        ]
-        
-        # Agregar campos específicos según el tipo y disponibilidad
-        if 'unidad_id' in columns:
-            campos_update.append('unidad_id = ?')
-            valores_update.append(int(data.get('unidad_id')))
-        
-        if 'tipo_calculo' in columns:
-            campos_update.append('tipo_calculo = ?')
-            valores_update.append(tipo_calculo)
+        datos_update = {
+            'nombre': data.get('nombre'),
+            'precio_costo': precio_costo,
+            'porcentaje_ganancia': porcentaje_ganancia,
+            'precio': precio_final,
+            'precio_venta_publico': precio_final,
+            'disponible': data.get('disponible', True),
+            'proveedor_id': int(data.get('proveedor_id')),
+            'categoria_id': int(data.get('categoria_id')),
+            'marca_id': int(data.get('marca_id')),
+            'descripcion': data.get('descripcion'),
+            'fecha_ultima_modificacion': get_argentina_time(),
+            'unidad_id': int(data.get('unidad_id')),
+            'tipo_calculo': tipo_calculo
+        }
         
         if tipo_calculo == 'unidad':
-            # CASO 1: Por unidades
-            if 'cantidad_unidades' in columns:
-                cantidad_unidades = int(data.get('cantidad_unidades', 1)) if data.get('cantidad_unidades') is not None else 1
-                campos_update.append('cantidad_unidades = ?')
-                valores_update.append(cantidad_unidades)
-            
-            if 'precio_por_unidad' in columns:
-                precio_por_unidad = float(data.get('precio_por_unidad', 0)) if data.get('precio_por_unidad') is not None else 0
-                campos_update.append('precio_por_unidad = ?')
-                valores_update.append(precio_por_unidad)
-            
-            # Establecer como NULL los campos del caso 2
-            if 'cantidad' in columns:
-                campos_update.append('cantidad = ?')
-                valores_update.append(None)
-            
-            if 'precio_fraccionado_por_100' in columns:
-                campos_update.append('precio_fraccionado_por_100 = ?')
-                valores_update.append(None)
+            # CASO 1: Por unidades; los campos del caso 2 quedan en NULL
+            datos_update['cantidad_unidades'] = int(data.get('cantidad_unidades', 1)) if data.get('cantidad_unidades') is not None else 1
+            datos_update['precio_por_unidad'] = float(data.get('precio_por_unidad', 0)) if data.get('precio_por_unidad') is not None else 0
+            datos_update['cantidad'] = None
+            datos_update['precio_fraccionado_por_100'] = None
         else:
-            # CASO 2: Por peso/volumen
-            if 'cantidad' in columns:
-                cantidad = float(data.get('cantidad', 100)) if data.get('cantidad') is not None else 100
-                campos_update.append('cantidad = ?')
-                valores_update.append(cantidad)
-            
-            if 'precio_fraccionado_por_100' in columns:
-                precio_fraccionado = float(data.get('precio_fraccionado_por_100', 0)) if data.get('precio_fraccionado_por_100') is not None else 0
-                campos_update.append('precio_fraccionado_por_100 = ?')
-                valores_update.append(precio_fraccionado)
-            
-            # Establecer como NULL los campos del caso 1
-            if 'cantidad_unidades' in columns:
-                campos_update.append('cantidad_unidades = ?')
-                valores_update.append(None)
-            
-            if 'precio_por_unidad' in columns:
-                campos_update.append('precio_por_unidad = ?')
-                valores_update.append(None)
+            # CASO 2: Por peso/volumen; los campos del caso 1 quedan en NULL
+            datos_update['cantidad'] = float(data.get('cantidad', 100)) if data.get('cantidad') is not None else 100
+            datos_update['precio_fraccionado_por_100'] = float(data.get('precio_fraccionado_por_100', 0)) if data.get('precio_fraccionado_por_100') is not None else 0
+            datos_update['cantidad_unidades'] = None
+            datos_update['precio_por_unidad'] = None
+        
+        datos_update.update(stock)
         
-        # Agregar ID al final
-        valores_update.append(id)
+        # Descartar los campos que no existen en esta versión de la tabla
+        datos_update = filtrar_columnas('producto', datos_update)
         
         # Ejecutar actualización
-        sql = f"UPDATE producto SET {', '.join(campos_update)} WHERE id = ?"
+        sql = sentencia_update('producto', tuple(datos_update))
+        valores_update = [*datos_update.values(), id]
         print(f"SQL Update: {sql}")
         print(f"Valores: {valores_update}")
         
@@ -427,6 +481,7 @@ def modificar_producto(id):
         
         conn.commit()
         conn.close()
+        invalidar_catalogo()
         
         print(f"=== PRODUCTO {id} ACTUALIZADO EXITOSAMENTE ===")
         return jsonify({'msg': 'Producto actualizado', 'id': id})
@@ -452,11 +507,385 @@ def borrar_producto(id):
         
         conn.commit()
         conn.close()
+        invalidar_catalogo()
         return jsonify({'success': True, 'message': 'Producto eliminado exitosamente'})
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _leer_stock(valor):
+    """Stock o stock mínimo del formulario: vacío = sin control (NULL). ValueError si es negativo"""
+    if valor is None or valor == '':
+        return None
+    try:
+        valor = float(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f'El stock debe ser un número: {valor!r}')
+    if valor < 0:
+        raise ValueError('El stock no puede ser negativo')
+    return valor
+
+@productos_bp.route('/productos/stock-bajo')
+def get_productos_stock_bajo():
+    """
+    Productos que controlan stock y están en o por debajo de su mínimo.
+
+    ?umbral=N usa ese valor en lugar del stock_minimo de cada producto.
+    El stock está en paquetes (tipo 'unidad') o gramos/ml (peso/volumen).
+    """
+    try:
+        umbral = request.args.get('umbral', type=float)
+        conn = get_db()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT p.id, p.nombre, p.stock, p.stock_minimo, p.tipo_calculo, p.disponible,
+                   pr.nombre as proveedor, u.abreviacion as unidad_abrev
+            FROM producto p
+            LEFT JOIN proveedor pr ON p.proveedor_id = pr.id
+            LEFT JOIN unidad u ON p.unidad_id = u.id
+            WHERE p.stock IS NOT NULL AND p.stock <= COALESCE(?, p.stock_minimo, 0)
+            ORDER BY p.stock, p.nombre
+        ''', (umbral,))
+        productos = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return jsonify(productos)
+    except Exception as e:
+        print(f"Error en get_productos_stock_bajo: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@productos_bp.route('/productos/<int:id>/stock', methods=['POST'])
+def ajustar_stock_producto(id):
+    """
+    Ajustar el stock de un producto.
+
+    Cuerpo: {"ajuste": 5000} (suma o resta de forma atómica, p. ej. al recibir
+    mercadería) o {"stock": 12000} (inventario contado; null deja de controlar
+    stock). Opcional "stock_minimo".
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            if 'ajuste' in data and 'stock' in data:
+                raise ValueError('Usar ajuste o stock, no ambos')
+            ajuste = float(data['ajuste']) if 'ajuste' in data else None
+            stock = _leer_stock(data.get('stock'))
+            stock_minimo = _leer_stock(data.get('stock_minimo'))
+            if ajuste is None and 'stock' not in data and 'stock_minimo' not in data:
+                raise ValueError('Se requiere "ajuste", "stock" o "stock_minimo"')
+        except (ValueError, TypeError) as e:
+            return jsonify({'error': f'Pedido inválido: {e}'}), 400
+
+        conn = get_db()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('SELECT 1 FROM producto WHERE id = ?', (id,))
+            if cursor.fetchone() is None:
+                return jsonify({'error': 'Producto no encontrado'}), 404
+
+            if ajuste is not None:
+                # Condicionado para que un egreso concurrente no deje el stock negativo
+                cursor.execute(
+                    'UPDATE producto SET stock = COALESCE(stock, 0) + ? WHERE id = ? AND COALESCE(stock, 0) + ? >= 0',
+                    (ajuste, id, ajuste)
+                )
+                if cursor.rowcount == 0:
+                    conn.rollback()
+                    return jsonify({'error': 'El ajuste deja el stock negativo'}), 409
+            elif 'stock' in data:
+                cursor.execute('UPDATE producto SET stock = ? WHERE id = ?', (stock, id))
+            if 'stock_minimo' in data:
+                cursor.execute('UPDATE producto SET stock_minimo = ? WHERE id = ?', (stock_minimo, id))
+
+            cursor.execute('SELECT stock, stock_minimo FROM producto WHERE id = ?', (id,))
+            stock, stock_minimo = cursor.fetchone()
+            conn.commit()
+        finally:
+            conn.close()
+
+        return jsonify({'success': True, 'id': id, 'stock': stock, 'stock_minimo': stock_minimo})
+    except Exception as e:
+        print(f"Error en ajustar_stock_producto: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def _leer_numero(valor, campo):
+    """Número finito del cuerpo JSON. ValueError si no es numérico o no es finito (nan, inf)"""
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f'{campo} debe ser un número: {valor!r}')
+    if not math.isfinite(numero):
+        raise ValueError(f'{campo} debe ser un número finito')
+    return numero
+
+def _leer_booleano(data, campo):
+    """true/false del cuerpo JSON (False si falta); ValueError para "false", 0 y similares"""
+    valor = data.get(campo, False)
+    if not isinstance(valor, bool):
+        raise ValueError(f'{campo} debe ser true o false')
+    return valor
+
+def _leer_cambios_lote(cambios):
+    """
+    Validar un conjunto de cambios parciales de la edición masiva.
+
+    - ajuste_costo_porcentaje: variación del costo en % (10 = +10 %, -5 = -5 %)
+    - precio_costo: costo nuevo
+    - porcentaje_ganancia: ganancia nueva, en decimal como en el resto de la API
+    - disponible: true/false
+    """
+    permitidos = {'ajuste_costo_porcentaje', 'precio_costo', 'porcentaje_ganancia', 'disponible'}
+    desconocidos = set(cambios) - permitidos
+    if desconocidos:
+        raise ValueError(f"Campos no admitidos: {', '.join(sorted(desconocidos))}")
+    if not cambios:
+        raise ValueError('No se indicó ningún cambio')
+    if 'ajuste_costo_porcentaje' in cambios and 'precio_costo' in cambios:
+        raise ValueError('Usar ajuste_costo_porcentaje o precio_costo, no ambos')
+
+    validados = {}
+    for campo in ('ajuste_costo_porcentaje', 'precio_costo', 'porcentaje_ganancia'):
+        if campo in cambios:
+            validados[campo] = _leer_numero(cambios[campo], campo)
+    if validados.get('ajuste_costo_porcentaje', 0) <= -100:
+        raise ValueError('ajuste_costo_porcentaje debe ser mayor a -100')
+    if validados.get('precio_costo', 0) < 0 or validados.get('porcentaje_ganancia', 0) < 0:
+        raise ValueError('Los precios y la ganancia no pueden ser negativos')
+    if 'disponible' in cambios:
+        if not isinstance(cambios['disponible'], bool):
+            raise ValueError('disponible debe ser true o false')
+        validados['disponible'] = cambios['disponible']
+    return validados
+
+# Cambios de la edición masiva que obligan a recalcular los precios derivados
+CAMBIOS_DE_PRECIO = {'ajuste_costo_porcentaje', 'precio_costo', 'porcentaje_ganancia'}
+
+def _aplicar_cambios(productos, cambios, fecha, paso_redondeo, modo_redondeo):
+    """
+    Valores nuevos de productos (filas como dict) que reciben los mismos
+    cambios: {id: columnas a escribir}. Los precios solo se recalculan (con
+    el redondeo de /productos/repreciar) si cambia el costo o la ganancia;
+    si no, se conservan los que ya tienen, aunque se hayan redondeado a mano.
+    """
+    nuevos = {
+        producto['id']: {'fecha_ultima_modificacion': fecha}
+        for producto in productos
+    }
+    if 'disponible' in cambios:
+        for valores in nuevos.values():
+            valores['disponible'] = cambios['disponible']
+    if not cambios.keys() & CAMBIOS_DE_PRECIO:
+        return nuevos
+
+    columnas = normalizar_columnas({c: [p[c] for p in productos] for c in COLUMNAS_PRECIO})
+    if 'precio_costo' in cambios:
+        columnas['precio_costo'] = [cambios['precio_costo']] * len(productos)
+    precios = recalcular_precios(
+        columnas,
+        ajuste_costo_porcentaje=cambios.get('ajuste_costo_porcentaje', 0.0),
+        porcentaje_ganancia=cambios.get('porcentaje_ganancia'),
+        paso_redondeo=paso_redondeo,
+        modo_redondeo=modo_redondeo
+    )
+    for i, producto_id in enumerate(precios['id']):
+        nuevos[producto_id].update({
+            'precio_costo': precios['precio_costo'][i],
+            'porcentaje_ganancia': precios['porcentaje_ganancia'][i],
+            'precio': precios['precio'][i],
+            'precio_venta_publico': precios['precio'][i],
+            'precio_por_unidad': precios['precio_por_unidad'][i],
+            'precio_fraccionado_por_100': precios['precio_fraccionado_por_100'][i]
+        })
+    return nuevos
+
+@productos_bp.route('/productos/lote', methods=['PATCH'])
+def editar_productos_lote():
+    """
+    Edición masiva de precios y disponibilidad en una sola transacción.
+
+    Dos formas de cuerpo:
+      {"filtro": {"proveedor_id": 3}, "cambios": {"ajuste_costo_porcentaje": 12}}
+      {"actualizaciones": [{"id": 5, "disponible": false}, {"id": 8, "precio_costo": 900}]}
+
+    Si cambia el costo o la ganancia, los precios derivados (precio,
+    precio_venta_publico, precio por unidad o cada 100) se recalculan y se
+    redondean como en /productos/repreciar ("redondeo": {"paso": 10,
+    "modo": "arriba"}, opcional). Un cambio solo de disponibilidad no toca
+    los precios. Con "simular": true devuelve el resultado sin guardar nada.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+
+        try:
+            simular = _leer_booleano(data, 'simular')
+            if 'actualizaciones' in data:
+                if not isinstance(data['actualizaciones'], list) or not data['actualizaciones']:
+                    raise ValueError('actualizaciones debe ser una lista no vacía')
+                cambios_por_id = {}
+                for item in data['actualizaciones']:
+                    producto_id = int(item['id'])
+                    cambios_por_id[producto_id] = _leer_cambios_lote({k: v for k, v in item.items() if k != 'id'})
+                condicion = f"id IN ({', '.join('?' for _ in cambios_por_id)})"
+                params = list(cambios_por_id)
+                cambios_comunes = None
+            elif 'filtro' in data and 'cambios' in data:
+                condicion, params = condicion_alcance(data['filtro'])
+                cambios_comunes = _leer_cambios_lote(data['cambios'])
+            else:
+                raise ValueError('Enviar "filtro" y "cambios", o una lista de "actualizaciones"')
+            redondeo = data.get('redondeo') or {}
+            paso_redondeo = _leer_numero(redondeo.get('paso', 0.01), 'paso_redondeo')
+            modo_redondeo = redondeo.get('modo', 'cercano')
+            if modo_redondeo not in MODOS_REDONDEO:
+                raise ValueError(f"modo_redondeo inválido: {modo_redondeo}")
+            if paso_redondeo <= 0:
+                raise ValueError('paso_redondeo debe ser mayor a 0')
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            return jsonify({'error': f'Pedido inválido: {e}'}), 400
+
+        conn = get_db()
+        conn.row_factory = sqlite3.Row
+        # Lectura y escritura dentro de la misma transacción de escritura
+        conn.isolation_level = None
+        cursor = conn.cursor()
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute(f'SELECT * FROM producto WHERE {condicion} ORDER BY id', params)
+            productos = [{**DEFAULTS_PRODUCTO, **dict(row)} for row in cursor.fetchall()]
+
+            # Los productos con los mismos cambios se recalculan juntos
+            grupos = {}
+            for producto in productos:
+                cambios = cambios_comunes if cambios_comunes is not None else cambios_por_id[producto['id']]
+                grupos.setdefault(tuple(sorted(cambios.items())), []).append(producto)
+
+            fecha = get_argentina_time()
+            nuevos = {}
+            for cambios, grupo in grupos.items():
+                nuevos.update(_aplicar_cambios(grupo, dict(cambios), fecha, paso_redondeo, modo_redondeo))
+
+            resultados = []
+            filas_por_columnas = {}
+            for producto in productos:
+                valores = filtrar_columnas('producto', nuevos[producto['id']])
+                filas_por_columnas.setdefault(tuple(valores), []).append([*valores.values(), producto['id']])
+                resultados.append({
+                    'id': producto['id'],
+                    'nombre': producto['nombre'],
+                    'precio_anterior': producto['precio_venta_publico'],
+                    'precio_venta_publico': valores.get('precio_venta_publico', producto['precio_venta_publico']),
+                    'disponible': valores.get('disponible', bool(producto['disponible']))
+                })
+
+            filas = [fila for grupo in filas_por_columnas.values() for fila in grupo]
+            if filas and not simular:
+                # Un executemany por combinación de columnas (solo disponibilidad, precios...)
+                for columnas_update, grupo in filas_por_columnas.items():
+                    cursor.executemany(sentencia_update('producto', columnas_update), grupo)
+                cursor.execute('COMMIT')
+            else:
+                cursor.execute('ROLLBACK')
+        except Exception:
+            if conn.in_transaction:
+                cursor.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+        if filas and not simular:
+            invalidar_catalogo()
+
+        encontrados = {producto['id'] for producto in productos}
+        return jsonify({
+            'success': True,
+            'simulado': simular,
+            'actualizados': 0 if simular else len(filas),
+            'no_encontrados': [i for i in cambios_por_id if i not in encontrados] if cambios_comunes is None else [],
+            'productos': resultados
+        })
+
+    except Exception as e:
+        print(f"Error en editar_productos_lote: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+@productos_bp.route('/productos/repreciar', methods=['POST'])
+def repreciar_productos():
+    """
+    Repreciar un proveedor, categoría, marca, lista de ids o todo el catálogo.
+
+    Cuerpo:
+      {"alcance": {"proveedor_id": 3} | {"todos": true},
+       "ajuste_costo_porcentaje": 8.5,          (opcional, variación del costo en %)
+       "porcentaje_ganancia": 0.35,             (opcional, reemplaza la ganancia)
+       "redondeo": {"paso": 10, "modo": "arriba"},
+       "simular": true}
+
+    Con "simular" devuelve las diferencias sin guardar; si no, las escribe
+    en una sola transacción (solo los productos cuyo precio cambia).
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+
+        try:
+            simular = _leer_booleano(data, 'simular')
+            condicion, params = condicion_alcance(data.get('alcance') or {}, permitir_todos=True)
+            redondeo = data.get('redondeo') or {}
+            opciones = {
+                'ajuste_costo_porcentaje': _leer_numero(data.get('ajuste_costo_porcentaje') or 0, 'ajuste_costo_porcentaje'),
+                'porcentaje_ganancia': _leer_numero(data['porcentaje_ganancia'], 'porcentaje_ganancia') if data.get('porcentaje_ganancia') is not None else None,
+                'paso_redondeo': _leer_numero(redondeo.get('paso', 0.01), 'paso_redondeo'),
+                'modo_redondeo': redondeo.get('modo', 'cercano')
+            }
+            if opciones['ajuste_costo_porcentaje'] <= -100:
+                raise ValueError('ajuste_costo_porcentaje debe ser mayor a -100')
+            if opciones['porcentaje_ganancia'] is not None and opciones['porcentaje_ganancia'] < 0:
+                raise ValueError('porcentaje_ganancia no puede ser negativo')
+        except (ValueError, TypeError, AttributeError) as e:
+            return jsonify({'error': f'Pedido inválido: {e}'}), 400
+
+        conn = get_db()
+        conn.isolation_level = None
+        cursor = conn.cursor()
+        try:
+            if not simular:
+                cursor.execute('BEGIN IMMEDIATE')
+            columnas = cargar_columnas_precio(cursor, condicion, params)
+            try:
+                nuevos = recalcular_precios(columnas, **opciones)
+            except ValueError as e:
+                if conn.in_transaction:
+                    cursor.execute('ROLLBACK')
+                return jsonify({'error': f'Pedido inválido: {e}'}), 400
+            diferencias, resumen = resumir_diferencias(columnas, nuevos)
+
+            if not simular:
+                guardar_precios(cursor, nuevos, {d['id'] for d in diferencias}, get_argentina_time())
+                cursor.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                cursor.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+        if not simular and diferencias:
+            invalidar_catalogo()
+
+        return jsonify({
+            'success': True,
+            'simulado': simular,
+            'resumen': resumen,
+            'diferencias': diferencias
+        })
+
+    except Exception as e:
+        print(f"Error en repreciar_productos: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
 @productos_bp.route('/productos/buscar')
 def buscar_productos():
     try:
@@ -575,3 +1004,95 @@ def buscar_productos():
     except Exception as e:
         print(f"Error en búsqueda de productos: {e}")
         return jsonify({'error': str(e)}), 500
+
+def _leer_lista(nombre, tipo=int):
+    """Valores de un parámetro repetido (?x=1&x=2) o separado por comas (?x=1,2)"""
+    valores = []
+    for valor in request.args.getlist(nombre):
+        valores.extend(v.strip() for v in valor.split(',') if v.strip())
+    return [tipo(v) for v in valores]
+
+def _leer_precio(nombre):
+    valor = request.args.get(nombre, '').strip()
+    return float(valor) if valor else None
+
+def _leer_filtros_catalogo():
+    """Filtros del catálogo desde la query string; ValueError si alguno es inválido"""
+    filtros = {
+        'categorias': _leer_lista('categoria_id'),
+        'marcas': _leer_lista('marca_id'),
+        'etiquetas': _leer_lista('etiqueta_id'),
+        'tipos_venta': _leer_lista('tipo_venta', str),
+        'precio_min': _leer_precio('precio_min'),
+        'precio_max': _leer_precio('precio_max')
+    }
+    tipos_invalidos = set(filtros['tipos_venta']) - set(TIPOS_VENTA)
+    if tipos_invalidos:
+        raise ValueError(f"tipo_venta inválido: {', '.join(sorted(tipos_invalidos))}")
+    return filtros
+
+@productos_bp.route('/productos/facetas')
+def get_facetas_productos():
+    """
+    Conteos por categoría, marca, etiqueta, rango de precio y tipo de venta
+    de los productos disponibles que cumplen los filtros.
+
+    Parámetros: categoria_id, marca_id, etiqueta_id, tipo_venta (repetibles o
+    separados por comas), precio_min y precio_max.
+    """
+    try:
+        try:
+            filtros = _leer_filtros_catalogo()
+        except ValueError as e:
+            return jsonify({'error': f'Filtros inválidos: {e}'}), 400
+
+        return jsonify(calcular_facetas(filtros))
+
+    except Exception as e:
+        print(f"Error en get_facetas_productos: {e}")
+        return jsonify({'error': str(e)}), 500
+
+ORDENES_CATALOGO = {
+    'nombre-asc': ('nombre', False),
+    'nombre-desc': ('nombre', True),
+    'precio-asc': ('precio', False),
+    'precio-desc': ('precio', True),
+}
+
+@productos_bp.route('/productos/filtrar')
+def filtrar_productos():
+    """
+    Página de productos disponibles que cumplen los filtros (los mismos de
+    /productos/facetas), resuelta con el índice en memoria.
+
+    Parámetros extra: orden (nombre-asc, nombre-desc, precio-asc,
+    precio-desc), pagina (desde 1) y por_pagina (máximo 100).
+    """
+    try:
+        try:
+            filtros = _leer_filtros_catalogo()
+            pagina = max(int(request.args.get('pagina', 1)), 1)
+            por_pagina = min(max(int(request.args.get('por_pagina', 24)), 1), 100)
+        except ValueError as e:
+            return jsonify({'error': f'Filtros inválidos: {e}'}), 400
+
+        orden = request.args.get('orden', 'nombre-asc')
+        if orden not in ORDENES_CATALOGO:
+            return jsonify({'error': f"orden inválido: {orden}"}), 400
+
+        indice = obtener_indice()
+        resultado = indice.filtrar(filtros)
+        campo, descendente = ORDENES_CATALOGO[orden]
+        ids = indice.ordenar(resultado, campo, descendente)
+        inicio = (pagina - 1) * por_pagina
+
+        return jsonify({
+            'total': contar_bits(resultado),
+            'pagina': pagina,
+            'por_pagina': por_pagina,
+            'productos': obtener_productos(ids[inicio:inicio + por_pagina])
+        })
+
+    except Exception as e:
+        print(f"Error en filtrar_productos: {e}")
+        return jsonify({'error': str(e)}), 500
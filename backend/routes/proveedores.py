@@ -1,31 +1,16 @@
 from flask import Blueprint, request, jsonify
 from config.database import get_db
 from utils.helpers import process_request_data
+from utils.catalogo import invalidar_catalogo
+from utils.taxonomia import respuesta_taxonomia, invalidar_taxonomia
 
 proveedores_bp = Blueprint('proveedores', __name__)
 
 @proveedores_bp.route('/proveedores')
 def get_proveedores():
     try:
-        print("=== OBTENIENDO PROVEEDORES ===")
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM proveedor ORDER BY nombre')
-        rows = cursor.fetchall()
-        
-        proveedores = []
-        for row in rows:
-            proveedores.append({
-                'id': row[0],
-                'nombre': row[1],
-                'telefono': row[2] if len(row) > 2 else '',
-                'email': row[3] if len(row) > 3 else ''
-            })
-        
-        conn.close()
-        print(f"=== RETORNANDO {len(proveedores)} PROVEEDORES ===")
-        return jsonify(proveedores)
-        
+        # Servido desde la taxonomía cacheada (ver utils/taxonomia.py)
+        return respuesta_taxonomia('proveedores')
     except Exception as e:
         print(f"Error en get_proveedores: {e}")
         return jsonify({'error': str(e)}), 500
@@ -50,6 +35,7 @@ def crear_proveedor():
         proveedor_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        invalidar_taxonomia()
         
         print(f"=== PROVEEDOR CREADO CON ID {proveedor_id} ===")
         return jsonify({
@@ -78,6 +64,8 @@ def modificar_proveedor(id):
         
         conn.commit()
         conn.close()
+        invalidar_catalogo()
+        invalidar_taxonomia()
         
         print(f"=== PROVEEDOR {id} MODIFICADO EXITOSAMENTE ===")
         return jsonify({
@@ -114,6 +102,8 @@ def borrar_proveedor(id):
         
         conn.commit()
         conn.close()
+        invalidar_catalogo()
+        invalidar_taxonomia()
         
         print(f"=== PROVEEDOR {id} ELIMINADO EXITOSAMENTE ===")
         return jsonify({
@@ -1,31 +1,16 @@
 from flask import Blueprint, request, jsonify
 from config.database import get_db
 from utils.helpers import process_request_data
+from utils.catalogo import invalidar_catalogo
+from utils.taxonomia import respuesta_taxonomia, invalidar_taxonomia
 
 unidades_bp = Blueprint('unidades', __name__)
 
 @unidades_bp.route('/unidades')
 def get_unidades():
     try:
-        print("=== OBTENIENDO UNIDADES ===")
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM unidad ORDER BY nombre')
-        rows = cursor.fetchall()
-        
-        unidades = []
-        for row in rows:
-            unidades.append({
-                'id': row[0],
-                'nombre': row[1],
-                'abreviacion': row[2] if len(row) > 2 else '',
-                'tipo': row[3] if len(row) > 3 else ''
-            })
-        
-        conn.close()
-        print(f"=== RETORNANDO {len(unidades)} UNIDADES ===")
-        return jsonify(unidades)
-        
+        # Servido desde la taxonomía cacheada (ver utils/taxonomia.py)
+        return respuesta_taxonomia('unidades')
     except Exception as e:
         print(f"Error en get_unidades: {e}")
         return jsonify({'error': str(e)}), 500
@@ -54,6 +39,7 @@ def crear_unidad():
         unidad_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        invalidar_taxonomia()
         
         return jsonify({
             'success': True,
@@ -80,6 +66,8 @@ def modificar_unidad(id):
         
         conn.commit()
         conn.close()
+        invalidar_catalogo()
+        invalidar_taxonomia()
         
         return jsonify({
             'success': True,
@@ -108,6 +96,8 @@ def borrar_unidad(id):
         cursor.execute('DELETE FROM unidad WHERE id = ?', (id,))
         conn.commit()
         conn.close()
+        invalidar_catalogo()
+        invalidar_taxonomia()
         
         return jsonify({
             'success': True,
@@ -15,7 +15,7 @@ usuarios_bp = Blueprint('usuarios', __name__)
 
 def get_db_connection():
     """Obtener conexión a la base de datos"""
-    conn = sqlite3.connect('instance/database.db')
+    conn = get_db()
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -92,7 +92,7 @@ def registro_usuario():
                 return jsonify({'error': True, 'message': f'El campo {field} es requerido'}), 400
         
         # Conectar a la base de datos
-        conn = sqlite3.connect('instance/database.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Verificar si el email ya existe
@@ -184,7 +184,7 @@ def login_usuario():
         if not email or not password:
             return jsonify({'error': True, 'message': 'Email y contraseña son requeridos'}), 400
         
-        conn = sqlite3.connect('instance/database.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -3,12 +3,15 @@ import sqlite3
 import jwt
 from flask import current_app
 from datetime import datetime
+import hashlib
+from config.database import get_db
+from utils.catalogo import obtener_catalogo
 
 wishlist_bp = Blueprint('wishlist', __name__)
 
 def get_db_connection():
     """Obtener conexión a la base de datos"""
-    conn = sqlite3.connect('instance/database.db')
+    conn = get_db()
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -43,75 +46,68 @@ def get_user_from_token():
         print(f"❌ Error procesando token: {str(e)}")
         return None
 
+def obtener_ids_wishlist(cursor, usuario_id):
+    """Ids de productos en la wishlist del usuario, ordenados"""
+    cursor.execute('SELECT producto_id FROM wishlist WHERE usuario_id = ? ORDER BY producto_id', (usuario_id,))
+    return [row[0] for row in cursor.fetchall()]
+
+def calcular_etag_ids(ids):
+    """ETag de la membresía: cambia solo si cambia el conjunto de ids"""
+    return hashlib.sha1(','.join(str(i) for i in ids).encode()).hexdigest()[:16]
+
+def respuesta_membresia(ids, **extra):
+    respuesta = jsonify({'ids': ids, 'count': len(ids), **extra})
+    respuesta.set_etag(calcular_etag_ids(ids))
+    # Datos por usuario: el navegador puede guardarlos pero debe revalidar
+    respuesta.headers['Cache-Control'] = 'private, no-cache'
+    return respuesta
+
+def leer_ids_productos(data):
+    """Validar y normalizar la lista 'producto_ids' del body (sin duplicados, conservando el orden)"""
+    producto_ids = (data or {}).get('producto_ids')
+    if not isinstance(producto_ids, list) or not producto_ids:
+        return None
+    try:
+        return list(dict.fromkeys(int(pid) for pid in producto_ids))
+    except (TypeError, ValueError):
+        return None
+
 @wishlist_bp.route('/api/wishlist', methods=['GET'])
 def obtener_wishlist():
     """Obtener todos los productos en la wishlist del usuario actual"""
     try:
-        print("🔍 Iniciando obtener_wishlist")
         usuario_id = get_user_from_token()
         if not usuario_id:
             print("❌ Usuario no autenticado")
             return jsonify({'error': 'Usuario no autenticado'}), 401
         
-        print(f"✅ Usuario autenticado: {usuario_id}")
-        
         conn = get_db_connection()
         cursor = conn.cursor()
-        print("✅ Conexión a BD establecida")
-        
-        # Obtener items de wishlist con información básica del producto
-        query = '''
-        SELECT w.id as wishlist_id, w.fecha_agregado, w.producto_id,
-               p.nombre, p.precio, p.disponible, p.descripcion,
-               p.precio_costo, p.porcentaje_ganancia, p.precio_venta_publico,
-               p.precio_fraccionado_por_100
-        FROM wishlist w
-        JOIN producto p ON w.producto_id = p.id
-        WHERE w.usuario_id = ? AND p.disponible = 1
-        ORDER BY w.fecha_agregado DESC
-        '''
-        
-        cursor.execute(query, (usuario_id,))
+        
+        # Una sola consulta: el resto de los datos sale del catálogo en memoria
+        cursor.execute('''
+            SELECT id as wishlist_id, producto_id, fecha_agregado
+            FROM wishlist
+            WHERE usuario_id = ?
+            ORDER BY fecha_agregado DESC
+        ''', (usuario_id,))
         rows = cursor.fetchall()
-        print(f"✅ Consulta ejecutada, {len(rows)} filas encontradas")
+        conn.close()
+        
+        catalogo = obtener_catalogo()
         
-        # Convertir a lista de diccionarios
         items_completos = []
         for row in rows:
-            producto_dict = {
-                'id': row['producto_id'],
-                'nombre': row['nombre'],
-                'precio': row['precio'],
-                'disponible': bool(row['disponible']),
-                'descripcion': row['descripcion'],
-                'precio_costo': row['precio_costo'],
-                'porcentaje_ganancia': row['porcentaje_ganancia'],
-                'precio_venta_publico': row['precio_venta_publico'],
-                'precio_fraccionado_por_100': row['precio_fraccionado_por_100'],
-                'proveedor': '',  # Valores por defecto
-                'categoria': '',
-                'marca': '',
-                'unidad_nombre': '',
-                'unidad_abrev': '',
-                'wishlist_id': row['wishlist_id'],
-                'fecha_agregado': row['fecha_agregado'],
-                'imagenes': []
-            }
-            
-            # Cargar imágenes del producto (opcional, se puede comentar para debug)
-            try:
-                cursor.execute('SELECT id, url, imagen_base64, es_url FROM imagen_producto WHERE producto_id = ?', 
-                              (row['producto_id'],))
-                imagenes = cursor.fetchall()
-                producto_dict['imagenes'] = [dict(img) for img in imagenes]
-            except Exception as img_error:
-                print(f"⚠️ Error cargando imágenes para producto {row['producto_id']}: {str(img_error)}")
-                producto_dict['imagenes'] = []
-            
-            items_completos.append(producto_dict)
+            producto = catalogo.get(row['producto_id'])
+            if producto is None or not producto['disponible']:
+                continue
+            # Copiar la tarjeta compartida del catálogo antes de agregarle campos
+            items_completos.append(dict(
+                producto,
+                wishlist_id=row['wishlist_id'],
+                fecha_agregado=row['fecha_agregado']
+            ))
         
-        conn.close()
-        print(f"✅ Retornando {len(items_completos)} items")
         return jsonify(items_completos), 200
         
     except Exception as e:
@@ -283,3 +279,103 @@ def limpiar_wishlist():
     except Exception as e:
         print(f"Error al limpiar wishlist: {str(e)}")
         return jsonify({'error': 'Error interno del servidor'}), 500
+
+@wishlist_bp.route('/api/wishlist/ids', methods=['GET'])
+def obtener_membresia_wishlist():
+    """
+    Obtener en una sola respuesta los ids de todos los productos de la wishlist.
+    
+    Reemplaza a una llamada a /api/wishlist/check/<id> por cada botón: el
+    frontend consulta este set una vez y revalida con If-None-Match.
+    """
+    try:
+        usuario_id = get_user_from_token()
+        if not usuario_id:
+            return jsonify({'ids': [], 'count': 0}), 200
+        
+        conn = get_db_connection()
+        ids = obtener_ids_wishlist(conn.cursor(), usuario_id)
+        conn.close()
+        
+        # make_conditional responde 304 si coincide con If-None-Match
+        return respuesta_membresia(ids).make_conditional(request)
+        
+    except Exception as e:
+        print(f"Error al obtener ids de wishlist: {str(e)}")
+        return jsonify({'error': 'Error interno del servidor'}), 500
+
+@wishlist_bp.route('/api/wishlist/bulk', methods=['POST'])
+def agregar_varios_a_wishlist():
+    """
+    Agregar varios productos a la wishlist en una transacción
+    
+    Body esperado: {"producto_ids": [int, ...]}
+    Los productos inexistentes o no disponibles se informan en 'rechazados';
+    los que ya estaban en la wishlist se ignoran.
+    """
+    try:
+        usuario_id = get_user_from_token()
+        if not usuario_id:
+            return jsonify({'error': 'Usuario no autenticado'}), 401
+        
+        producto_ids = leer_ids_productos(request.get_json(silent=True))
+        if producto_ids is None:
+            return jsonify({'error': 'Lista de producto_ids requerida'}), 400
+        
+        catalogo = obtener_catalogo()
+        validos = [pid for pid in producto_ids if pid in catalogo and catalogo[pid]['disponible']]
+        rechazados = [pid for pid in producto_ids if pid not in validos]
+        
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        fecha_actual = datetime.now().isoformat()
+        cursor.executemany('''
+            INSERT OR IGNORE INTO wishlist (usuario_id, producto_id, fecha_agregado)
+            VALUES (?, ?, ?)
+        ''', [(usuario_id, pid, fecha_actual) for pid in validos])
+        agregados = cursor.rowcount if validos else 0
+        conn.commit()
+        
+        ids = obtener_ids_wishlist(cursor, usuario_id)
+        conn.close()
+        
+        return respuesta_membresia(ids, agregados=agregados, rechazados=rechazados), 200
+        
+    except Exception as e:
+        print(f"Error al agregar varios a wishlist: {str(e)}")
+        return jsonify({'error': 'Error interno del servidor'}), 500
+
+@wishlist_bp.route('/api/wishlist/bulk', methods=['DELETE'])
+def remover_varios_de_wishlist():
+    """
+    Remover varios productos de la wishlist con un solo DELETE
+    
+    Body esperado: {"producto_ids": [int, ...]}
+    """
+    try:
+        usuario_id = get_user_from_token()
+        if not usuario_id:
+            return jsonify({'error': 'Usuario no autenticado'}), 401
+        
+        producto_ids = leer_ids_productos(request.get_json(silent=True))
+        if producto_ids is None:
+            return jsonify({'error': 'Lista de producto_ids requerida'}), 400
+        
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        placeholders = ', '.join('?' for _ in producto_ids)
+        cursor.execute(f'DELETE FROM wishlist WHERE usuario_id = ? AND producto_id IN ({placeholders})',
+                      [usuario_id, *producto_ids])
+        removidos = cursor.rowcount
+        conn.commit()
+        
+        ids = obtener_ids_wishlist(cursor, usuario_id)
+        conn.close()
+        
+        return respuesta_membresia(ids, removidos=removidos), 200
+        
+    except Exception as e:
+        print(f"Error al remover varios de wishlist: {str(e)}")
+        return jsonify({'error': 'Error interno del servidor'}), 500
@@ -1,5 +1,3 @@
-from flask import Flask
-from flask_cors import CORS
 import os
 import sys
 
@@ -7,59 +5,15 @@ import sys
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, current_dir)
 
-print("🔄 Iniciando importaciones...")
-
-try:
-    # Importar la instancia de db y modelos desde models.py
-    from models import db, Usuario
-    print("✅ Modelos importados correctamente")
-except ImportError as e:
-    print(f"❌ Error importando modelos: {e}")
-    print("⚠️  Continuando sin modelos...")
-    db = None
-    Usuario = None
+from aplicacion import create_app, preparar_arranque
+from config.database import database_path
 
 print("🚀 Creando aplicación Flask...")
-app = Flask(__name__)
-CORS(app)
-
-# Configuración de la base de datos
-basedir = os.path.abspath(os.path.dirname(__file__))
-database_path = os.path.join(basedir, "instance", "database.db")
-
-print(f"📁 Directorio base: {basedir}")
 print(f"🗄️  Ruta de BD: {database_path}")
 print(f"📊 BD existe: {os.path.exists(database_path)}")
 
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{database_path}'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-# Agregar SECRET_KEY para JWT
-app.config['SECRET_KEY'] = 'tu_clave_secreta_muy_segura_aqui_cambiar_en_produccion'
-
-# Inicializar la app con la base de datos solo si db está disponible
-if db is not None:
-    try:
-        db.init_app(app)
-        print("✅ Base de datos SQLAlchemy inicializada")
-    except Exception as e:
-        print(f"❌ Error inicializando SQLAlchemy: {e}")
-else:
-    print("⚠️  SQLAlchemy no disponible, usando SQLite directo")
-
-@app.route('/')
-def index():
-    return "Backend funcionando - Aplicación modularizada"
-
-# Registrar todas las rutas modularizadas
-try:
-    from routes import register_routes
-    register_routes(app)
-    print("✅ Rutas modularizadas registradas exitosamente")
-except ImportError as e:
-    print(f"❌ Error importando rutas modularizadas: {e}")
-    print("⚠️  Las rutas no se pudieron cargar correctamente")
-    import traceback
-    traceback.print_exc()
+app = create_app()
+print("✅ Rutas modularizadas registradas exitosamente")
 
 if __name__ == '__main__':
     print("\n" + "="*50)
@@ -79,7 +33,6 @@ if __name__ == '__main__':
     
     # Verificar conexión a BD y tablas críticas
     try:
-        # Importar después de configurar el path
         from config.database import get_db
         test_conn = get_db()
         cursor = test_conn.cursor()
@@ -98,6 +51,9 @@ if __name__ == '__main__':
         
         test_conn.close()
         print("✅ Conexión a BD exitosa")
+
+        # Aplicar migraciones pendientes y precalentar las caches en memoria
+        preparar_arranque(app)
     except Exception as e:
         print(f"❌ ERROR conectando a BD: {e}")
         import traceback
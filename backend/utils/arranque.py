@@ -0,0 +1,82 @@
+"""
+Medición del tiempo de arranque
+
+Registra cuánto tarda cada fase (importar blueprints, migraciones,
+precalentar caches) para poder ver qué pesa al levantar un worker.
+Las dependencias pesadas que solo usan algunas rutas (openpyxl, pytz y,
+si está instalado, numpy) se importan recién en el primer request que las
+necesita; en modo 'precargado' se importan antes de forkear para que los
+workers las compartan.
+"""
+
+import importlib
+import importlib.util
+import sys
+import time
+from contextlib import contextmanager
+
+# Dependencias que se importan al primer uso
+DEPENDENCIAS_DIFERIDAS = ('openpyxl', 'pytz')
+# Aceleran algo si están instaladas, pero no figuran en requirements.txt
+DEPENDENCIAS_OPCIONALES = ('numpy',)
+
+_inicio = time.perf_counter()
+_fases = []
+_modo = None
+_listo_en = None
+
+
+@contextmanager
+def medir(nombre):
+    """Registrar la duración del bloque como una fase del arranque"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        _fases.append((nombre, time.perf_counter() - inicio))
+
+
+def marcar_listo(modo):
+    """Registrar que la app terminó de arrancar en el modo dado"""
+    global _modo, _listo_en
+    _modo = modo
+    _listo_en = time.perf_counter()
+
+
+def _instalada(nombre):
+    return importlib.util.find_spec(nombre) is not None
+
+
+def precargar_dependencias():
+    """Importar las dependencias diferidas y las opcionales que estén instaladas"""
+    for nombre in DEPENDENCIAS_DIFERIDAS + DEPENDENCIAS_OPCIONALES:
+        if not _instalada(nombre):
+            continue
+        with medir(f'dependencia {nombre}'):
+            try:
+                importlib.import_module(nombre)
+            except ImportError:
+                pass
+
+
+def reporte_arranque():
+    """
+    Fases medidas, tiempo hasta quedar lista la app y dependencias ya
+    cargadas (las opcionales que no están instaladas figuran como None)
+    """
+    return {
+        'modo': _modo,
+        'fases': [
+            {'nombre': nombre, 'ms': round(segundos * 1000, 1)}
+            for nombre, segundos in _fases
+        ],
+        'total_fases_ms': round(sum(segundos for _, segundos in _fases) * 1000, 1),
+        'hasta_listo_ms': round((_listo_en - _inicio) * 1000, 1) if _listo_en else None,
+        'dependencias_cargadas': {
+            nombre: nombre in sys.modules for nombre in DEPENDENCIAS_DIFERIDAS
+        },
+        'dependencias_opcionales': {
+            nombre: (nombre in sys.modules) if _instalada(nombre) else None
+            for nombre in DEPENDENCIAS_OPCIONALES
+        }
+    }
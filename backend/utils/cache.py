@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+
+from utils.arranque import medir
+
+# Todas las caches creadas, para poder precalentarlas al arrancar
+CACHES = []
+
+# Segundos que se puede seguir sirviendo un valor invalidado mientras otro hilo lo reconstruye
+MAX_OBSOLESCENCIA = float(os.environ.get('DN_CACHE_MAX_OBSOLESCENCIA', 30))
+
+# Cuántas caches está construyendo el hilo actual (anidadas: índice -> catálogo)
+_hilo = threading.local()
+
+
+def precalentar_todas():
+    """Construir todas las caches registradas (cada una queda medida como fase del arranque)"""
+    for cache in CACHES:
+        with medir(f'cache {cache.nombre}'):
+            cache.obtener()
+
+
+class CacheVersionada:
+    """
+    Valor calculado en memoria (catálogo, taxonomía, banners) que se
+    reconstruye la próxima vez que se pide después de invalidarse.
+
+    Cada invalidación incrementa `version`, que sirve para armar ETags.
+    Si se pasa `expiracion`, se llama con el valor recién construido y debe
+    devolver el timestamp (time.time()) en el que deja de ser válido, o None.
+    Las caches de `depende_de` invalidan también a esta cuando se invalidan
+    (por ejemplo un índice que se arma a partir del catálogo).
+
+    Con `clave_bd` la cache anota, al construirse, la versión que tenía esa
+    clave en la BD; `revalidar()` la invalida si otro proceso la cambió
+    desde entonces (ver utils/coherencia.py).
+
+    Reconstrucción de a una: el primer request que encuentra la cache
+    inválida la reconstruye (fuera del lock) y los concurrentes no repiten
+    el trabajo. Mientras tanto reciben el valor anterior si quedó invalidado
+    hace menos de `max_obsolescencia` segundos (stale-while-revalidate), o
+    esperan a que termine. Con max_obsolescencia=0 siempre esperan.
+    """
+
+    def __init__(self, nombre, construir, expiracion=None, depende_de=(), clave_bd=None,
+                 max_obsolescencia=None):
+        self.nombre = nombre
+        self._construir = construir
+        self._expiracion = expiracion
+        self._lock = threading.Lock()
+        self._terminada = threading.Condition(self._lock)
+        self._valor = None
+        self._tiene_valor = False
+        self._valido = False
+        self._construyendo = False
+        self._invalida_desde = None
+        self._expira_en = None
+        self._dependientes = []
+        self.clave_bd = clave_bd
+        self._version_bd = None
+        self.max_obsolescencia = MAX_OBSOLESCENCIA if max_obsolescencia is None else max_obsolescencia
+        self.version = 0
+        for cache in depende_de:
+            cache._dependientes.append(self)
+        CACHES.append(self)
+
+    def _marcar_invalida(self):
+        # La antigüedad del valor anterior se cuenta desde la primera invalidación
+        if self._valido or self._invalida_desde is None:
+            self._invalida_desde = time.monotonic()
+        self._valido = False
+        if not self.max_obsolescencia:
+            self._valor = None
+            self._tiene_valor = False
+
+    def _puede_servir_anterior(self):
+        return (
+            self._tiene_valor
+            # Una cache que se arma a partir de otra necesita el valor nuevo
+            and not getattr(_hilo, 'construyendo', 0)
+            and time.monotonic() - self._invalida_desde <= self.max_obsolescencia
+        )
+
+    def _construir_valor(self):
+        _hilo.construyendo = getattr(_hilo, 'construyendo', 0) + 1
+        try:
+            version_bd = None
+            if self.clave_bd:
+                # Antes de construir: si alguien escribe mientras tanto, se revalida de nuevo
+                from utils.coherencia import leer_versiones
+                version_bd = leer_versiones().get(self.clave_bd)
+            return self._construir(), version_bd
+        finally:
+            _hilo.construyendo -= 1
+
+    def obtener(self):
+        with self._lock:
+            while True:
+                if self._valido and self._expira_en is not None and time.time() >= self._expira_en:
+                    self._marcar_invalida()
+                if self._valido:
+                    return self._valor
+                if not self._construyendo:
+                    break
+                # Otro hilo ya la está reconstruyendo
+                if self._puede_servir_anterior():
+                    return self._valor
+                self._terminada.wait()
+            self._construyendo = True
+            version = self.version
+
+        try:
+            valor, version_bd = self._construir_valor()
+        except BaseException:
+            with self._lock:
+                self._construyendo = False
+                self._terminada.notify_all()
+            raise
+
+        with self._lock:
+            self._construyendo = False
+            self._valor = valor
+            self._tiene_valor = True
+            self._version_bd = version_bd
+            self._expira_en = self._expiracion(valor) if self._expiracion else None
+            # Si se invalidó durante la construcción, el próximo obtener() vuelve a construir
+            if self.version == version:
+                self._valido = True
+                self._invalida_desde = None
+            self._terminada.notify_all()
+            return valor
+
+    def invalidar(self):
+        with self._lock:
+            self._marcar_invalida()
+            self.version += 1
+        # Fuera del lock: una dependiente puede estar construyéndose y
+        # esperando el lock de esta cache
+        for cache in self._dependientes:
+            cache.invalidar()
+
+    def revalidar(self, versiones):
+        """Invalidar si la versión en la BD ya no es con la que se construyó"""
+        if self.clave_bd is None or self.clave_bd not in versiones:
+            return
+        with self._lock:
+            desactualizada = self._valido and versiones[self.clave_bd] != self._version_bd
+        if desactualizada:
+            self.invalidar()
@@ -0,0 +1,199 @@
+"""
+Cotización de carritos
+
+Los precios de un carrito se calculan en el servidor con las mismas reglas
+que muestra la tienda:
+
+- Producto por unidad/paquete: precio_venta_publico / cantidad_unidades por
+  cada unidad pedida.
+- Fraccionado (es_fraccionado): precio_fraccionado_por_100 * gramos/ml / 100,
+  con un mínimo de 25 y en múltiplos de 5 (como valida ProductoDetalle).
+
+`cotizar()` recibe las tarjetas a usar: /api/carrito/cotizar le pasa el
+catálogo en memoria (una búsqueda por ítem, sin consultas) y crear_pedido
+las tarjetas recién leídas de la BD, para cobrar siempre el precio vigente.
+
+El carrito de un usuario logueado se guarda en `carrito_items` (una fila
+por producto y modo de venta) y cada cambio es una sola sentencia sobre la
+clave primaria: no se reescribe el carrito entero.
+"""
+
+import json
+import os
+
+# Archivo de configuración para el costo de envío
+CONFIG_FILE = os.path.join(os.path.dirname(__file__), '..', 'config', 'envio_config.json')
+
+CANTIDAD_MINIMA_FRACCIONADO = 25
+PASO_FRACCIONADO = 5
+
+
+def obtener_costo_envio_config():
+    """Obtener el costo de envío desde el archivo de configuración"""
+    try:
+        if os.path.exists(CONFIG_FILE):
+            with open(CONFIG_FILE, 'r') as f:
+                config = json.load(f)
+                return config.get('costo_envio', 500.0)
+        return 500.0  # Valor por defecto
+    except:
+        return 500.0
+
+
+def guardar_costo_envio_config(costo):
+    """Guardar el costo de envío en el archivo de configuración"""
+    try:
+        os.makedirs(os.path.dirname(CONFIG_FILE), exist_ok=True)
+        with open(CONFIG_FILE, 'w') as f:
+            json.dump({'costo_envio': costo}, f)
+        return True
+    except Exception as e:
+        print(f"Error guardando configuración: {e}")
+        return False
+
+
+def leer_items(items):
+    """
+    Normalizar los ítems de un carrito: [{producto_id, cantidad, es_fraccionado,
+    cantidad_personalizada}]. ValueError si alguno no es válido.
+    """
+    if not isinstance(items, list) or not items:
+        raise ValueError('items debe ser una lista no vacía')
+
+    normalizados = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError('cada ítem debe ser un objeto')
+        producto_id = int(item['producto_id'])
+        es_fraccionado = bool(item.get('es_fraccionado'))
+        if es_fraccionado:
+            gramos = int(item.get('cantidad_personalizada') or 0)
+            if gramos < CANTIDAD_MINIMA_FRACCIONADO or gramos % PASO_FRACCIONADO:
+                raise ValueError(
+                    f'Producto {producto_id}: la cantidad fraccionada debe ser de al menos '
+                    f'{CANTIDAD_MINIMA_FRACCIONADO} y múltiplo de {PASO_FRACCIONADO}'
+                )
+            cantidad = 1
+        else:
+            gramos = None
+            cantidad = int(item.get('cantidad') or 0)
+            if cantidad < 1:
+                raise ValueError(f'Producto {producto_id}: la cantidad debe ser mayor a 0')
+        normalizados.append({
+            'producto_id': producto_id,
+            'cantidad': cantidad,
+            'es_fraccionado': es_fraccionado,
+            'cantidad_personalizada': gramos
+        })
+    return normalizados
+
+
+# Agregar al carrito: suma a lo que ya había (un fraccionado siempre es una sola línea)
+SUMAR_ITEM = '''
+    INSERT INTO carrito_items (usuario_id, producto_id, es_fraccionado, cantidad, cantidad_personalizada, fecha_actualizacion)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (usuario_id, producto_id, es_fraccionado) DO UPDATE SET
+        cantidad = CASE WHEN carrito_items.es_fraccionado THEN 1 ELSE carrito_items.cantidad + excluded.cantidad END,
+        cantidad_personalizada = carrito_items.cantidad_personalizada + excluded.cantidad_personalizada,
+        fecha_actualizacion = excluded.fecha_actualizacion
+'''
+
+# Cambiar la cantidad: reemplaza lo que había
+FIJAR_ITEM = '''
+    INSERT INTO carrito_items (usuario_id, producto_id, es_fraccionado, cantidad, cantidad_personalizada, fecha_actualizacion)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (usuario_id, producto_id, es_fraccionado) DO UPDATE SET
+        cantidad = excluded.cantidad,
+        cantidad_personalizada = excluded.cantidad_personalizada,
+        fecha_actualizacion = excluded.fecha_actualizacion
+'''
+
+
+def guardar_items(cursor, usuario_id, items, fecha, sumar=True):
+    """Upsert de ítems normalizados con `leer_items()` en el carrito del usuario"""
+    cursor.executemany(SUMAR_ITEM if sumar else FIJAR_ITEM, [
+        (usuario_id, item['producto_id'], int(item['es_fraccionado']), item['cantidad'],
+         item['cantidad_personalizada'], fecha)
+        for item in items
+    ])
+
+
+def leer_carrito(cursor, usuario_id):
+    """Ítems guardados del usuario, en el mismo formato que devuelve `leer_items()`"""
+    cursor.execute('''
+        SELECT producto_id, es_fraccionado, cantidad, cantidad_personalizada
+        FROM carrito_items
+        WHERE usuario_id = ?
+        ORDER BY producto_id, es_fraccionado
+    ''', (usuario_id,))
+    return [
+        {'producto_id': producto_id, 'cantidad': cantidad,
+         'es_fraccionado': bool(es_fraccionado), 'cantidad_personalizada': gramos}
+        for producto_id, es_fraccionado, cantidad, gramos in cursor.fetchall()
+    ]
+
+
+def cotizar(items, tarjetas, tipo_entrega=None):
+    """
+    Precio de cada línea, subtotal, envío y total de ítems ya normalizados
+    con `leer_items()`. `tarjetas` es {producto_id: tarjeta del catálogo}.
+
+    Las líneas que no se pueden vender no suman y se informan en
+    "problemas" con su motivo: 'inexistente', 'no_disponible' o 'sin_precio'.
+    """
+    lineas = []
+    problemas = []
+    subtotal = 0
+
+    for item in items:
+        producto = tarjetas.get(item['producto_id'])
+        if producto is None:
+            problemas.append({'producto_id': item['producto_id'], 'motivo': 'inexistente'})
+            continue
+        if not producto['disponible']:
+            problemas.append({'producto_id': item['producto_id'], 'nombre': producto['nombre'], 'motivo': 'no_disponible'})
+            continue
+
+        unidad = producto['unidad_abrev'] or 'gr'
+        if item['es_fraccionado']:
+            por_100 = producto['precio_fraccionado_por_100'] or 0
+            # Como en el carrito: el precio de la línea ya es el de toda la cantidad
+            precio = round(por_100 * item['cantidad_personalizada'] / 100, 2)
+            linea_subtotal = precio
+            nombre = f"{producto['nombre']} ({item['cantidad_personalizada']}{unidad})"
+        else:
+            precio = round((producto['precio_venta_publico'] or 0) / (producto['cantidad_unidades'] or 1), 2)
+            linea_subtotal = round(precio * item['cantidad'], 2)
+            nombre = producto['nombre']
+
+        if precio <= 0:
+            problemas.append({'producto_id': item['producto_id'], 'nombre': producto['nombre'], 'motivo': 'sin_precio'})
+            continue
+
+        subtotal += linea_subtotal
+        lineas.append({
+            'producto_id': item['producto_id'],
+            'nombre': nombre,
+            'marca': producto['marca'],
+            'precio': precio,
+            'cantidad': item['cantidad'],
+            'es_fraccionado': item['es_fraccionado'],
+            'cantidad_personalizada': item['cantidad_personalizada'],
+            'unidad': unidad if item['es_fraccionado'] else producto['unidad_abrev'],
+            # Para que el carrito recalcule el precio al cambiar los gramos
+            'precio_fraccionado_por_100': producto['precio_fraccionado_por_100'],
+            'subtotal': linea_subtotal
+        })
+
+    costo_envio_domicilio = float(obtener_costo_envio_config())
+    costo_envio = costo_envio_domicilio if tipo_entrega == 'envio' else 0.0
+    subtotal = round(subtotal, 2)
+    return {
+        'items': lineas,
+        'problemas': problemas,
+        'subtotal': subtotal,
+        # El del envío a domicilio siempre, para poder mostrar las dos opciones
+        'costo_envio_domicilio': costo_envio_domicilio,
+        'costo_envio': costo_envio,
+        'total': round(subtotal + costo_envio, 2)
+    }
@@ -0,0 +1,202 @@
+"""
+Snapshot en memoria del catálogo de productos
+
+Arma una "tarjeta" por producto (marca, categoría, proveedor, unidad,
+etiquetas y una referencia a la imagen principal) con una cantidad fija de
+consultas, sin importar el tamaño del catálogo. Las rutas que escriben
+productos, imágenes o taxonomías deben llamar a `invalidar_catalogo()`
+después del commit.
+
+Las tarjetas se comparten entre requests: quien necesite agregar campos
+debe copiarlas (`dict(tarjeta, ...)`) en lugar de modificarlas.
+"""
+
+import hashlib
+import json
+import sqlite3
+from config.database import get_db
+from utils.cache import CacheVersionada
+
+
+def url_archivo_imagen(imagen_id):
+    """URL que sirve el BLOB de una imagen de producto (ver routes/imagenes.py)"""
+    return f'/api/imagenes/{imagen_id}/archivo'
+
+
+def referencia_imagen(row):
+    """
+    Convertir una fila de imagen_producto (sin el BLOB) en una referencia liviana.
+
+    Las imágenes guardadas como BLOB se exponen como URL al endpoint que las
+    sirve, por eso la referencia siempre tiene `es_url = True` y el frontend
+    puede usar `url` directamente como `src`.
+    """
+    return {
+        'id': row['id'],
+        'url': url_archivo_imagen(row['id']) if row['tiene_blob'] else row['url'],
+        'imagen_base64': None,
+        'es_url': True,
+        'posicion': row['posicion'],
+        'titulo': row['titulo']
+    }
+
+
+def construir_tarjetas(cursor, ids_sql=None, params=()):
+    """
+    Tarjetas {producto_id: tarjeta} de todos los productos o solo de los ids
+    que devuelve la subconsulta `ids_sql` (p. ej. los que cambiaron desde un
+    token de sincronización). El cursor debe usar sqlite3.Row.
+    """
+    filtro = f'WHERE p.id IN ({ids_sql})' if ids_sql else ''
+    filtro_etiquetas = f'WHERE pe.producto_id IN ({ids_sql})' if ids_sql else ''
+    filtro_imagenes = f'WHERE producto_id IN ({ids_sql})' if ids_sql else ''
+    params = list(params)
+
+    cursor.execute(f'''
+        SELECT p.id, p.nombre, p.precio, p.disponible, p.descripcion,
+               p.precio_costo, p.porcentaje_ganancia, p.precio_venta_publico,
+               p.fecha_ultima_modificacion, p.proveedor_id, p.categoria_id,
+               p.marca_id, p.unidad_id, p.cantidad_unidades, p.cantidad,
+               p.precio_por_unidad, p.precio_fraccionado_por_100, p.tipo_calculo,
+               pr.nombre as proveedor, c.nombre as categoria, m.nombre as marca,
+               u.nombre as unidad_nombre, u.abreviacion as unidad_abrev
+        FROM producto p
+        LEFT JOIN proveedor pr ON p.proveedor_id = pr.id
+        LEFT JOIN categoria c ON p.categoria_id = c.id
+        LEFT JOIN marca m ON p.marca_id = m.id
+        LEFT JOIN unidad u ON p.unidad_id = u.id
+        {filtro}
+        ORDER BY p.id
+    ''', params)
+
+    productos = {}
+    for row in cursor.fetchall():
+        producto = dict(row)
+        producto['disponible'] = bool(producto['disponible'])
+        producto['etiquetas'] = []
+        producto['etiquetas_ids'] = []
+        producto['imagen_principal'] = None
+        producto['imagenes'] = []
+        productos[producto['id']] = producto
+
+    # Todas las etiquetas en una sola consulta
+    cursor.execute(f'''
+        SELECT pe.producto_id, ta.id, ta.nombre
+        FROM producto_etiquetas pe
+        JOIN tipo_alimento ta ON ta.id = pe.etiqueta_id
+        {filtro_etiquetas}
+        ORDER BY pe.producto_id, ta.nombre
+    ''', params)
+    for producto_id, etiqueta_id, nombre in cursor.fetchall():
+        producto = productos.get(producto_id)
+        if producto is not None:
+            producto['etiquetas'].append({'id': etiqueta_id, 'nombre': nombre})
+            producto['etiquetas_ids'].append(etiqueta_id)
+
+    # Primera imagen de cada producto, sin leer el contenido de los BLOBs
+    cursor.execute(f'''
+        SELECT id, producto_id, url, posicion, titulo, tiene_blob
+        FROM (
+            SELECT id, producto_id, url, posicion, titulo,
+                   imagen_blob IS NOT NULL AS tiene_blob,
+                   ROW_NUMBER() OVER (PARTITION BY producto_id ORDER BY posicion, id) AS rn
+            FROM imagen_producto
+            {filtro_imagenes}
+        )
+        WHERE rn = 1
+    ''', params)
+    for row in cursor.fetchall():
+        producto = productos.get(row['producto_id'])
+        if producto is not None:
+            imagen = referencia_imagen(row)
+            producto['imagen_principal'] = imagen
+            producto['imagenes'] = [imagen]
+
+    return productos
+
+
+def _construir_catalogo():
+    conn = get_db()
+    conn.row_factory = sqlite3.Row
+    try:
+        return construir_tarjetas(conn.cursor())
+    finally:
+        conn.close()
+
+
+# Pública para que otras caches derivadas del catálogo puedan depender de ella
+cache_catalogo = CacheVersionada('catalogo', _construir_catalogo, clave_bd='catalogo')
+
+
+def obtener_catalogo():
+    """Diccionario {producto_id: tarjeta} con todos los productos (disponibles o no)"""
+    return cache_catalogo.obtener()
+
+
+def obtener_productos(ids, solo_disponibles=False):
+    """Tarjetas de los productos pedidos, en el mismo orden y omitiendo los inexistentes"""
+    catalogo = obtener_catalogo()
+    productos = []
+    for producto_id in ids:
+        producto = catalogo.get(producto_id)
+        if producto is None or (solo_disponibles and not producto['disponible']):
+            continue
+        productos.append(producto)
+    return productos
+
+
+def leer_tarjetas(ids):
+    """Tarjetas {producto_id: tarjeta} leídas ahora de la BD, sin pasar por la cache"""
+    ids = list(ids)
+    if not ids:
+        return {}
+    placeholders = ', '.join('?' for _ in ids)
+    conn = get_db()
+    conn.row_factory = sqlite3.Row
+    try:
+        return construir_tarjetas(conn.cursor(), f'SELECT id FROM producto WHERE id IN ({placeholders})', ids)
+    finally:
+        conn.close()
+
+
+def _construir_listado():
+    """
+    Todas las tarjetas con todas sus imágenes (referencias, sin BLOBs), ya
+    serializadas: /api/productos devuelve siempre el mismo cuerpo hasta que
+    el catálogo cambie, así que se arma el JSON y su ETag una sola vez.
+    """
+    catalogo = obtener_catalogo()
+    conn = get_db()
+    conn.row_factory = sqlite3.Row
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, producto_id, url, posicion, titulo, imagen_blob IS NOT NULL AS tiene_blob
+            FROM imagen_producto
+            ORDER BY producto_id, posicion, id
+        ''')
+        imagenes = {}
+        for row in cursor.fetchall():
+            imagenes.setdefault(row['producto_id'], []).append(referencia_imagen(row))
+    finally:
+        conn.close()
+
+    productos = [dict(tarjeta, imagenes=imagenes.get(producto_id, [])) for producto_id, tarjeta in catalogo.items()]
+    cuerpo = json.dumps(productos, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return cuerpo, hashlib.sha1(cuerpo).hexdigest()[:16]
+
+
+_listado = CacheVersionada('listado_productos', _construir_listado, depende_de=[cache_catalogo])
+
+
+def obtener_listado_json():
+    """(cuerpo JSON en bytes, etag) del listado completo de productos"""
+    return _listado.obtener()
+
+
+def version_catalogo():
+    return cache_catalogo.version
+
+
+def invalidar_catalogo():
+    cache_catalogo.invalidar()
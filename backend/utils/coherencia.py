@@ -0,0 +1,83 @@
+"""
+Coherencia de las caches en memoria entre procesos
+
+Con varios workers (gunicorn) cada proceso tiene su copia del catálogo, la
+taxonomía y los banners, y `invalidar_*()` solo limpia la del proceso que
+escribió. Para que el resto se entere sin un servicio de cache externo:
+
+- Triggers de la BD incrementan una versión por cache en cada escritura
+  (`catalogo_version` y `cache_version`, ver config/migraciones.py).
+- En cada request, `revalidar_caches()` consulta `PRAGMA data_version` en
+  una conexión propia del proceso. Ese número solo cambia cuando otra
+  conexión hizo commit, así que mientras nadie escriba no se lee nada más.
+- Si cambió, lee las versiones y cada cache se invalida solo si su versión
+  difiere de la que anotó al construirse. La reconstrucción queda para el
+  próximo `obtener()`, como con una invalidación local.
+
+DN_COHERENCIA_INTERVALO (segundos, 0 por defecto) limita cada cuánto se
+hace el chequeo si se prefiere tolerar un poco de desfase.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from config.database import database_path, get_db
+from utils.cache import CACHES
+
+VERSIONES_SQL = '''
+    SELECT 'catalogo', valor FROM catalogo_version WHERE id = 1
+    UNION ALL
+    SELECT nombre, version FROM cache_version
+'''
+
+_estado = {'pid': None, 'conexion': None, 'data_version': None, 'ultimo_chequeo': 0.0}
+_lock = threading.Lock()
+
+
+def leer_versiones(conn=None):
+    """{clave: versión} de las caches en la BD ({} si las tablas todavía no existen)"""
+    cerrar = conn is None
+    conn = conn or get_db()
+    try:
+        return dict(conn.execute(VERSIONES_SQL).fetchall())
+    except sqlite3.OperationalError:
+        return {}
+    finally:
+        if cerrar:
+            conn.close()
+
+
+def _conexion_del_proceso():
+    # Una conexión por proceso: la heredada de un fork no sirve (y data_version es por conexión)
+    if _estado['pid'] != os.getpid():
+        _estado.update(
+            pid=os.getpid(),
+            conexion=sqlite3.connect(database_path, check_same_thread=False),
+            data_version=None
+        )
+    return _estado['conexion']
+
+
+def revalidar_caches():
+    """Invalidar las caches de este proceso que otro proceso dejó desactualizadas"""
+    intervalo = float(os.environ.get('DN_COHERENCIA_INTERVALO', 0))
+    if intervalo and time.monotonic() - _estado['ultimo_chequeo'] < intervalo:
+        return
+    # Si otro hilo ya está chequeando, su resultado alcanza para este request
+    if not _lock.acquire(blocking=False):
+        return
+    try:
+        _estado['ultimo_chequeo'] = time.monotonic()
+        conn = _conexion_del_proceso()
+        data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+        if data_version == _estado['data_version']:
+            return
+        _estado['data_version'] = data_version
+        versiones = leer_versiones(conn)
+    finally:
+        _lock.release()
+
+    for cache in CACHES:
+        cache.revalidar(versiones)
@@ -0,0 +1,213 @@
+"""
+Notificaciones de pedidos en vivo para el admin (server-sent events)
+
+crear_pedido y los cambios de estado anotan un evento chico (id del pedido
+y un resumen) en `eventos_pedidos` dentro de la misma transacción: si el
+pedido no se guarda, el evento tampoco. SQLite serializa las escrituras,
+así que el id autoincremental sigue el orden de los commits y sirve de
+`id:` de cada mensaje SSE: un admin que se reconecta con Last-Event-ID
+recibe exactamente lo que se perdió.
+
+Para no consultar la tabla por cada pantalla abierta:
+
+- En el proceso que escribió, `avisar()` despierta después del commit a
+  los streams que esperan en una Condition (pub/sub en memoria).
+- Para los demás workers, un hilo vigía por proceso (solo mientras haya
+  streams abiertos) lee `MAX(id)` cada DN_EVENTOS_INTERVALO segundos (1 por
+  defecto) y avisa si creció: una consulta por proceso, no por cliente.
+
+Cada stream ocupa un thread del servidor, así que se admiten como mucho
+DN_EVENTOS_MAXIMO por proceso (2 por defecto) y cada uno se cierra a los
+DN_EVENTOS_DURACION segundos (300): el navegador se reconecta solo, con
+Last-Event-ID. Los eventos se borran a las DN_EVENTOS_HORAS (24).
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import timedelta
+
+from config.database import get_db, get_argentina_datetime
+
+LIMITE_LECTURA = 200
+LATIDO = 15  # segundos sin eventos entre comentarios para mantener viva la conexión
+RECONEXION_MS = 3000
+INTERVALO_LIMPIEZA = 600
+
+_cambio = threading.Condition()
+_estado = {'pid': None, 'generacion': 0, 'ultimo_id': 0, 'suscriptores': 0, 'vigia': None}
+_ultima_limpieza = {'momento': 0.0}
+_lock_limpieza = threading.Lock()
+
+
+def _fecha(fecha):
+    return fecha.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def registrar_evento(ejecutar, tipo, datos):
+    """Anotar un evento dentro de la transacción actual (se publica con el commit)"""
+    ejecutar(
+        'INSERT INTO eventos_pedidos (tipo, datos, fecha) VALUES (?, ?, ?)',
+        (tipo, json.dumps(datos, ensure_ascii=False, default=str), _fecha(get_argentina_datetime()))
+    )
+
+
+def conteos_por_estado(ejecutar):
+    """{estado: cantidad} de todos los pedidos, para que cada evento lleve los contadores al día"""
+    return dict(ejecutar('SELECT estado, COUNT(*) FROM pedidos GROUP BY estado', ()).fetchall())
+
+
+def avisar():
+    """Despertar a los streams de este proceso; llamar después del commit"""
+    with _cambio:
+        _estado['generacion'] += 1
+        _cambio.notify_all()
+
+
+def ultimo_id():
+    conn = get_db()
+    try:
+        return conn.execute('SELECT COALESCE(MAX(id), 0) FROM eventos_pedidos').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def leer_eventos(desde_id, limite=LIMITE_LECTURA):
+    """[(id, tipo, datos JSON)] posteriores a `desde_id`, en orden"""
+    conn = get_db()
+    try:
+        return conn.execute(
+            'SELECT id, tipo, datos FROM eventos_pedidos WHERE id > ? ORDER BY id LIMIT ?',
+            (desde_id, limite)
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def _se_perdieron_eventos(desde_id):
+    """True si ya se borraron eventos posteriores a `desde_id` (hay que recargar)"""
+    conn = get_db()
+    try:
+        primero = conn.execute('SELECT MIN(id) FROM eventos_pedidos').fetchone()[0]
+    finally:
+        conn.close()
+    return primero is not None and primero > desde_id + 1
+
+
+def _vigilar(intervalo):
+    conn = get_db()
+    try:
+        while True:
+            with _cambio:
+                if _estado['suscriptores'] == 0:
+                    _estado['vigia'] = None
+                    return
+            ultimo = conn.execute('SELECT COALESCE(MAX(id), 0) FROM eventos_pedidos').fetchone()[0]
+            with _cambio:
+                if ultimo > _estado['ultimo_id']:
+                    _estado['ultimo_id'] = ultimo
+                    _estado['generacion'] += 1
+                    _cambio.notify_all()
+            time.sleep(intervalo)
+    except Exception as e:
+        print(f"⚠️ Error vigilando eventos de pedidos: {e}")
+        with _cambio:
+            _estado['vigia'] = None
+    finally:
+        conn.close()
+
+
+def suscribir():
+    """
+    Reservar el lugar de un stream nuevo. False si este proceso ya tiene
+    DN_EVENTOS_MAXIMO abiertos (el chequeo y la reserva van bajo el mismo
+    lock). Cada reserva se libera con `desuscribir()`.
+    """
+    maximo = int(os.environ.get('DN_EVENTOS_MAXIMO', 2))
+    with _cambio:
+        # Después de un fork no quedan ni el hilo vigía ni los streams del padre
+        if _estado['pid'] != os.getpid():
+            _estado.update(pid=os.getpid(), suscriptores=0, vigia=None)
+        if _estado['suscriptores'] >= maximo:
+            return False
+        _estado['suscriptores'] += 1
+        if _estado['vigia'] is None:
+            intervalo = float(os.environ.get('DN_EVENTOS_INTERVALO', 1))
+            _estado['vigia'] = threading.Thread(target=_vigilar, args=(intervalo,), daemon=True)
+            _estado['vigia'].start()
+        return True
+
+
+def desuscribir():
+    with _cambio:
+        _estado['suscriptores'] -= 1
+
+
+def _mensaje(evento_id, tipo, datos):
+    return f'id: {evento_id}\nevent: {tipo}\ndata: {datos}\n\n'
+
+
+def transmitir(desde_id=None):
+    """
+    Generador del stream SSE: los eventos posteriores a `desde_id` (o solo
+    los nuevos si es None) y después cada uno a medida que llega. Si los
+    que faltan ya se borraron manda un evento "recargar". Se usa después de
+    `suscribir()`; la reserva la libera quien cierra la respuesta.
+    """
+    fin = time.monotonic() + float(os.environ.get('DN_EVENTOS_DURACION', 300))
+    with _cambio:
+        generacion = _estado['generacion']
+    yield f'retry: {RECONEXION_MS}\n\n'
+    if desde_id is None or _se_perdieron_eventos(desde_id):
+        recargar = desde_id is not None
+        desde_id = ultimo_id()
+        if recargar:
+            yield _mensaje(desde_id, 'recargar', '{}')
+
+    while True:
+        eventos = leer_eventos(desde_id)
+        for evento_id, tipo, datos in eventos:
+            yield _mensaje(evento_id, tipo, datos)
+            desde_id = evento_id
+        if len(eventos) == LIMITE_LECTURA:
+            continue
+
+        restante = fin - time.monotonic()
+        if restante <= 0:
+            return
+        # La generación se anotó antes de leer: un aviso posterior no se pierde
+        with _cambio:
+            _cambio.wait_for(lambda: _estado['generacion'] != generacion, min(LATIDO, restante))
+            despertado = _estado['generacion'] != generacion
+            generacion = _estado['generacion']
+        if not despertado:
+            yield ': latido\n\n'
+
+
+def limpiar_eventos(forzar=False):
+    """Borrar los eventos viejos, como mucho cada INTERVALO_LIMPIEZA segundos por proceso"""
+    if not forzar and time.monotonic() - _ultima_limpieza['momento'] < INTERVALO_LIMPIEZA:
+        return 0
+    if not _lock_limpieza.acquire(blocking=False):
+        return 0
+    try:
+        _ultima_limpieza['momento'] = time.monotonic()
+        horas = float(os.environ.get('DN_EVENTOS_HORAS', 24))
+        conn = get_db()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                'DELETE FROM eventos_pedidos WHERE fecha < ?',
+                (_fecha(get_argentina_datetime() - timedelta(hours=horas)),)
+            )
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+    except Exception as e:
+        # Se llama después de guardar el pedido: un error acá no debe afectarlo
+        print(f"⚠️ Error limpiando eventos de pedidos: {e}")
+        return 0
+    finally:
+        _lock_limpieza.release()
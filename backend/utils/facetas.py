@@ -0,0 +1,68 @@
+"""
+Conteos de facetas del catálogo (categoría, marca, etiqueta, rango de
+precio y tipo de venta) para un estado de filtros.
+
+Los conteos son disyuntivos: los de cada faceta aplican todos los filtros
+menos el de esa misma faceta, para que el usuario vea cuántos productos
+sumaría marcando otra opción. Se calculan intersectando los bitsets del
+índice en memoria (utils/indice_catalogo.py), sin consultar la BD.
+"""
+
+from utils.indice_catalogo import obtener_indice, contar_bits
+from utils.taxonomia import obtener_taxonomia
+
+# Límites por defecto de los rangos de precio (el último rango queda abierto)
+RANGOS_PRECIO = (0, 1000, 2500, 5000, 10000, 20000)
+TIPOS_VENTA = ('unidad', 'peso')
+
+
+def calcular_facetas(filtros, rangos=RANGOS_PRECIO):
+    """
+    Conteos de todas las facetas para los filtros dados.
+
+    `filtros` puede tener: categorias, marcas, etiquetas (listas de ids),
+    tipos_venta (lista de 'unidad'/'peso'), precio_min y precio_max.
+    """
+    indice = obtener_indice()
+    taxonomia = obtener_taxonomia()
+
+    def opciones(clave, bitsets, faceta):
+        base = indice.filtrar(filtros, excepto=faceta)
+        seleccionados = set(filtros.get(clave) or ())
+        return [
+            {
+                'id': item['id'],
+                'nombre': item['nombre'],
+                'cantidad': contar_bits(base & bitsets.get(item['id'], 0)),
+                'seleccionada': item['id'] in seleccionados
+            }
+            for item in taxonomia[clave]
+        ]
+
+    base_precio = indice.filtrar(filtros, excepto='precio')
+    precios = []
+    for i, bitset in enumerate(indice.rangos_precio(rangos)):
+        precios.append({
+            'desde': rangos[i],
+            'hasta': rangos[i + 1] if i + 1 < len(rangos) else None,
+            'cantidad': contar_bits(base_precio & bitset)
+        })
+
+    base_tipo = indice.filtrar(filtros, excepto='tipo')
+    tipos_seleccionados = set(filtros.get('tipos_venta') or ())
+
+    return {
+        'total': contar_bits(indice.filtrar(filtros)),
+        'categorias': opciones('categorias', indice.por_categoria, 'categoria'),
+        'marcas': opciones('marcas', indice.por_marca, 'marca'),
+        'etiquetas': opciones('etiquetas', indice.por_etiqueta, 'etiqueta'),
+        'precios': precios,
+        'tipos_venta': [
+            {
+                'tipo': tipo,
+                'cantidad': contar_bits(base_tipo & indice.por_tipo.get(tipo, 0)),
+                'seleccionada': tipo in tipos_seleccionados
+            }
+            for tipo in TIPOS_VENTA
+        ]
+    }
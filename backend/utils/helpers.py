@@ -1,3 +1,6 @@
+import re
+import unicodedata
+
 def process_request_data(request):
     """Función helper para procesar datos de request automáticamente"""
     data = {}
@@ -18,3 +21,38 @@ def validate_required_fields(data, required_fields):
         if not data.get(field):
             return f'El campo {field} es requerido'
     return None
+
+def detectar_mimetype_imagen(datos):
+    """Detectar el tipo de imagen de un BLOB a partir de sus primeros bytes"""
+    if datos.startswith(b'\x89PNG'):
+        return 'image/png'
+    if datos.startswith(b'GIF8'):
+        return 'image/gif'
+    if datos[:4] == b'RIFF' and datos[8:12] == b'WEBP':
+        return 'image/webp'
+    if datos.lstrip()[:5] in (b'<?xml', b'<svg '):
+        return 'image/svg+xml'
+    return 'image/jpeg'
+
+def _limpiar_texto_slug(texto):
+    """Misma limpieza que limpiarTextoParaSlug en frontend/src/utils/slugUtils.js"""
+    if not texto:
+        return 'sin-nombre'
+    texto = unicodedata.normalize('NFD', texto.lower())
+    texto = re.sub('[\u0300-\u036f]', '', texto)  # Remover acentos
+    texto = re.sub(r'[^a-z0-9\s]', '', texto)
+    texto = re.sub(r'\s+', '-', texto)
+    texto = re.sub(r'-+', '-', texto)
+    return re.sub(r'^-|-$', '', texto).strip()
+
+def slug_producto(producto):
+    """Slug nombre-marca-id, igual al que genera generarSlugProducto en el frontend"""
+    nombre = _limpiar_texto_slug(producto.get('nombre') or 'producto')
+    marca = _limpiar_texto_slug(producto.get('marca') or 'sin-marca')
+    return f"{nombre}-{marca}-{producto['id']}"
+
+def id_desde_slug(slug):
+    """Id de producto al final del slug (None si no tiene), como extraerIdDeSlug"""
+    ultima_parte = (slug or '').split('-')[-1]
+    # Solo dígitos ASCII: isdigit() acepta '²' y otros que int() no convierte
+    return int(ultima_parte) if re.fullmatch(r'\d+', ultima_parte, re.ASCII) else None
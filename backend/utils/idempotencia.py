@@ -0,0 +1,116 @@
+"""
+Idempotency-Key para crear pedidos
+
+Un doble click o un reintento del cliente tras un timeout puede mandar dos
+veces el mismo POST /api/pedidos. Si el request trae el header
+`Idempotency-Key`, la clave se reclama con un INSERT ... ON CONFLICT en la
+misma transacción que crea el pedido, y antes del commit se guarda ahí la
+respuesta. Así:
+
+- Un reintento posterior encuentra la respuesta con una consulta por clave
+  primaria y la devuelve sin validar ni escribir nada.
+- Dos reintentos simultáneos (aunque sea en workers distintos) se
+  serializan en el lock de escritura de SQLite: el segundo espera, no puede
+  reclamar la clave y devuelve la respuesta que dejó el primero.
+- Si el pedido falla (validación, stock) la transacción se deshace junto
+  con la clave, y un reintento vuelve a evaluarse desde cero.
+
+La clave es por usuario y se guarda con una huella del cuerpo: reusarla con
+otro pedido es un error. Las claves vencen a las DN_IDEMPOTENCIA_HORAS
+(24 por defecto) y se borran cada tanto desde el mismo proceso.
+
+Las funciones reciben `ejecutar(sql, params)` como las de utils/stock.py.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import timedelta
+
+from config.database import get_db, get_argentina_datetime
+
+LARGO_MAXIMO_CLAVE = 255
+INTERVALO_LIMPIEZA = 600  # segundos entre limpiezas en un mismo proceso
+
+_ultima_limpieza = {'momento': 0.0}
+_lock_limpieza = threading.Lock()
+
+
+def _horas_vigencia():
+    return float(os.environ.get('DN_IDEMPOTENCIA_HORAS', 24))
+
+
+def _fecha(fecha):
+    return fecha.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _vencimiento():
+    """Las claves creadas antes de esta fecha ya no cuentan"""
+    return _fecha(get_argentina_datetime() - timedelta(hours=_horas_vigencia()))
+
+
+def huella_pedido(data):
+    """Huella del cuerpo del request (independiente del orden de las claves del JSON)"""
+    canonico = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha1(canonico.encode('utf-8')).hexdigest()
+
+
+def leer_clave(ejecutar, usuario_id, clave):
+    """(huella, estado_http, respuesta) de una clave vigente, o None"""
+    return ejecutar('''
+        SELECT huella, estado_http, respuesta FROM claves_idempotencia
+        WHERE usuario_id = ? AND clave = ? AND fecha_creacion >= ?
+    ''', (usuario_id, clave, _vencimiento())).fetchone()
+
+
+def reclamar_clave(ejecutar, usuario_id, clave, huella):
+    """
+    Tomar la clave dentro de la transacción actual. Devuelve False si ya
+    existe una vigente (una vencida se reemplaza). Por ser un INSERT abre
+    la transacción y toma el lock de escritura: un reintento concurrente
+    espera acá hasta que el primero termine.
+    """
+    return ejecutar('''
+        INSERT INTO claves_idempotencia (usuario_id, clave, huella, fecha_creacion)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (usuario_id, clave) DO UPDATE SET
+            huella = excluded.huella,
+            estado_http = NULL,
+            respuesta = NULL,
+            fecha_creacion = excluded.fecha_creacion
+        WHERE claves_idempotencia.fecha_creacion < ?
+    ''', (usuario_id, clave, huella, _fecha(get_argentina_datetime()), _vencimiento())).rowcount == 1
+
+
+def guardar_respuesta(ejecutar, usuario_id, clave, estado_http, cuerpo):
+    """Guardar la respuesta de la clave, antes del commit del pedido"""
+    ejecutar(
+        'UPDATE claves_idempotencia SET estado_http = ?, respuesta = ? WHERE usuario_id = ? AND clave = ?',
+        (estado_http, json.dumps(cuerpo, ensure_ascii=False, default=str), usuario_id, clave)
+    )
+
+
+def limpiar_vencidas(forzar=False):
+    """Borrar las claves vencidas, como mucho cada INTERVALO_LIMPIEZA segundos por proceso"""
+    if not forzar and time.monotonic() - _ultima_limpieza['momento'] < INTERVALO_LIMPIEZA:
+        return 0
+    if not _lock_limpieza.acquire(blocking=False):
+        return 0
+    try:
+        _ultima_limpieza['momento'] = time.monotonic()
+        conn = get_db()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM claves_idempotencia WHERE fecha_creacion < ?', (_vencimiento(),))
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+    except Exception as e:
+        # Se llama después de crear el pedido: un error acá no debe afectarlo
+        print(f"⚠️ Error limpiando claves de idempotencia: {e}")
+        return 0
+    finally:
+        _lock_limpieza.release()
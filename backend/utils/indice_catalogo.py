@@ -0,0 +1,155 @@
+"""
+Índice invertido en memoria sobre el snapshot del catálogo
+
+Para cada valor de categoría, marca, etiqueta, tipo de venta y
+disponibilidad guarda un bitset (un int de Python) con un bit encendido por
+cada id de producto que lo tiene. Cualquier combinación de filtros se
+resuelve con AND/OR entre enteros y los conteos con bit_count, sin tocar la
+BD. Se reconstruye cuando se invalida el catálogo.
+"""
+
+from bisect import bisect_left, bisect_right
+from utils.cache import CacheVersionada
+from utils.catalogo import cache_catalogo, obtener_catalogo
+
+try:
+    contar_bits = int.bit_count
+except AttributeError:  # Python < 3.10
+    def contar_bits(bitset):
+        return bin(bitset).count('1')
+
+
+def precio_efectivo(producto):
+    """Precio con el que se filtra y ordena: el de venta al público o, si falta, `precio`"""
+    precio = producto.get('precio_venta_publico')
+    return precio if precio is not None else producto.get('precio')
+
+
+def ids_de(bitset):
+    """Ids de producto encendidos en el bitset, en orden ascendente"""
+    ids = []
+    while bitset:
+        bit_bajo = bitset & -bitset
+        ids.append(bit_bajo.bit_length() - 1)
+        bitset ^= bit_bajo
+    return ids
+
+
+class IndiceCatalogo:
+    """Bitsets por valor de atributo; no modificar (se comparte entre requests)"""
+
+    def __init__(self, catalogo):
+        self.todos = 0
+        self.disponibles = 0
+        self.por_categoria = {}
+        self.por_marca = {}
+        self.por_etiqueta = {}
+        self.por_tipo = {}
+        precios = []
+
+        for producto_id, producto in catalogo.items():
+            bit = 1 << producto_id
+            self.todos |= bit
+            if producto['disponible']:
+                self.disponibles |= bit
+            self._agregar(self.por_categoria, producto['categoria_id'], bit)
+            self._agregar(self.por_marca, producto['marca_id'], bit)
+            self._agregar(self.por_tipo, producto['tipo_calculo'], bit)
+            for etiqueta_id in producto['etiquetas_ids']:
+                self._agregar(self.por_etiqueta, etiqueta_id, bit)
+            precio = precio_efectivo(producto)
+            if precio is not None:
+                precios.append((precio, producto_id))
+
+        # Productos ordenados por precio, para resolver rangos con bisect
+        precios.sort()
+        self._precios = [precio for precio, _ in precios]
+        self._ids_por_precio = [producto_id for _, producto_id in precios]
+
+        # Posición de cada producto en cada orden, para ordenar resultados sin comparar tarjetas
+        por_nombre = sorted(catalogo, key=lambda producto_id: ((catalogo[producto_id]['nombre'] or '').lower(), producto_id))
+        self.posicion = {
+            'nombre': {producto_id: i for i, producto_id in enumerate(por_nombre)},
+            # Los productos sin precio quedan al final
+            'precio': {producto_id: i for i, producto_id in enumerate(self._ids_por_precio)},
+        }
+
+    @staticmethod
+    def _agregar(indice, valor, bit):
+        if valor is not None:
+            indice[valor] = indice.get(valor, 0) | bit
+
+    @staticmethod
+    def _union(indice, valores):
+        """OR de los bitsets de los valores elegidos (None = sin filtro)"""
+        if not valores:
+            return None
+        bitset = 0
+        for valor in valores:
+            bitset |= indice.get(valor, 0)
+        return bitset
+
+    def rango_precio(self, minimo=None, maximo=None):
+        """Bitset de los productos con precio en [minimo, maximo] (None = sin filtro)"""
+        if minimo is None and maximo is None:
+            return None
+        desde = bisect_left(self._precios, minimo) if minimo is not None else 0
+        hasta = bisect_right(self._precios, maximo) if maximo is not None else len(self._precios)
+        bitset = 0
+        for producto_id in self._ids_por_precio[desde:hasta]:
+            bitset |= 1 << producto_id
+        return bitset
+
+    def rangos_precio(self, limites):
+        """
+        Bitsets de los rangos [limites[i], limites[i + 1]); el primero no tiene
+        piso y el último queda abierto hacia arriba
+        """
+        cortes = [0] + [bisect_left(self._precios, limite) for limite in limites[1:]] + [len(self._precios)]
+        bitsets = []
+        for desde, hasta in zip(cortes, cortes[1:]):
+            bitset = 0
+            for producto_id in self._ids_por_precio[desde:hasta]:
+                bitset |= 1 << producto_id
+            bitsets.append(bitset)
+        return bitsets
+
+    def bitsets_filtros(self, filtros):
+        """
+        {faceta: bitset} con el conjunto que deja pasar cada filtro activo.
+
+        Dentro de una faceta las opciones se combinan con OR (alcanza con
+        tener alguna de las etiquetas elegidas) y entre facetas con AND.
+        """
+        bitsets = {
+            'categoria': self._union(self.por_categoria, filtros.get('categorias')),
+            'marca': self._union(self.por_marca, filtros.get('marcas')),
+            'etiqueta': self._union(self.por_etiqueta, filtros.get('etiquetas')),
+            'tipo': self._union(self.por_tipo, filtros.get('tipos_venta')),
+            'precio': self.rango_precio(filtros.get('precio_min'), filtros.get('precio_max')),
+        }
+        return {faceta: bitset for faceta, bitset in bitsets.items() if bitset is not None}
+
+    def filtrar(self, filtros, solo_disponibles=True, excepto=None):
+        """Bitset de los productos que cumplen todos los filtros (salvo la faceta `excepto`)"""
+        resultado = self.disponibles if solo_disponibles else self.todos
+        for faceta, bitset in self.bitsets_filtros(filtros).items():
+            if faceta != excepto:
+                resultado &= bitset
+        return resultado
+
+
+    def ordenar(self, bitset, campo='nombre', descendente=False):
+        """Ids del bitset ordenados por 'nombre' o 'precio'"""
+        posiciones = self.posicion[campo]
+        sin_posicion = len(posiciones)
+        ids = ids_de(bitset)
+        ids.sort(key=lambda producto_id: posiciones.get(producto_id, sin_posicion), reverse=descendente)
+        return ids
+
+
+_indice = CacheVersionada('indice_catalogo', lambda: IndiceCatalogo(obtener_catalogo()), depende_de=[cache_catalogo])
+
+
+def obtener_indice():
+    return _indice.obtener()
@@ -0,0 +1,279 @@
+"""
+Listas de precios programadas
+
+Una lista guarda por adelantado el costo (y opcionalmente la ganancia)
+nuevo de un conjunto de productos junto con una fecha y hora de activación
+(hora argentina). Al llegar esa hora el programador la aplica en una sola
+transacción: marca la lista como aplicada, recalcula los precios con las
+reglas de utils/precios.py y los escribe con un executemany. Después de
+aplicar todas las listas vencidas invalida la cache del catálogo una sola vez.
+
+El programador es un hilo daemon por proceso que se inicia en el primer
+request (así sobrevive al fork de gunicorn --preload). Como la lista se
+"reclama" con un UPDATE condicionado al estado 'pendiente' dentro de la
+misma transacción, aunque varios workers la encuentren vencida a la vez
+solo uno la aplica.
+
+Variables de entorno:
+- DN_PROGRAMADOR=0 desactiva el hilo (las listas se pueden aplicar a mano)
+- DN_PROGRAMADOR_INTERVALO: segundos máximos entre revisiones (30 por defecto)
+"""
+
+import os
+import threading
+from datetime import datetime
+
+from config.database import get_db, get_argentina_time, get_argentina_datetime
+from utils.catalogo import invalidar_catalogo
+from utils.precios import cargar_columnas_precio, recalcular_precios, guardar_precios, MODOS_REDONDEO
+
+ESTADOS = ('pendiente', 'aplicada', 'cancelada')
+FORMATO_FECHA = '%Y-%m-%d %H:%M:%S'
+
+INTERVALO_DEFAULT = 30
+
+
+def normalizar_activacion(valor):
+    """Fecha ISO ('2025-07-01T00:00' o con segundos) al formato de la BD. ValueError si no es válida"""
+    if not isinstance(valor, str) or not valor.strip():
+        raise ValueError('fecha_activacion es obligatoria')
+    fecha = datetime.fromisoformat(valor.strip())
+    if fecha.tzinfo is not None:
+        raise ValueError('fecha_activacion debe estar en hora argentina, sin zona horaria')
+    return fecha.strftime(FORMATO_FECHA)
+
+
+def crear_lista(nombre, fecha_activacion, items, paso_redondeo=0.01, modo_redondeo='cercano'):
+    """
+    Guardar una lista pendiente. `items` es una lista de
+    {"producto_id", "precio_costo", "porcentaje_ganancia" (opcional)}.
+    Devuelve el id de la lista. ValueError si los datos no son válidos.
+    """
+    if not nombre or not str(nombre).strip():
+        raise ValueError('nombre es obligatorio')
+    fecha_activacion = normalizar_activacion(fecha_activacion)
+    if modo_redondeo not in MODOS_REDONDEO:
+        raise ValueError(f"modo_redondeo inválido: {modo_redondeo}")
+    if paso_redondeo <= 0:
+        raise ValueError('paso_redondeo debe ser mayor a 0')
+
+    # Si un producto se repite vale el último
+    por_producto = {}
+    for item in items:
+        producto_id = int(item['producto_id'])
+        precio_costo = float(item['precio_costo'])
+        ganancia = item.get('porcentaje_ganancia')
+        ganancia = float(ganancia) if ganancia is not None else None
+        if precio_costo < 0 or (ganancia is not None and ganancia < 0):
+            raise ValueError(f'Precios negativos en el producto {producto_id}')
+        por_producto[producto_id] = (precio_costo, ganancia)
+    if not por_producto:
+        raise ValueError('La lista no tiene productos')
+
+    conn = get_db()
+    try:
+        cursor = conn.cursor()
+        placeholders = ', '.join('?' for _ in por_producto)
+        cursor.execute(f'SELECT id FROM producto WHERE id IN ({placeholders})', list(por_producto))
+        inexistentes = set(por_producto) - {row[0] for row in cursor.fetchall()}
+        if inexistentes:
+            raise ValueError(f"Productos inexistentes: {', '.join(str(i) for i in sorted(inexistentes))}")
+
+        cursor.execute('''
+            INSERT INTO lista_precios (nombre, fecha_activacion, paso_redondeo, modo_redondeo, fecha_creacion)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (str(nombre).strip(), fecha_activacion, paso_redondeo, modo_redondeo, get_argentina_time()))
+        lista_id = cursor.lastrowid
+        cursor.executemany('''
+            INSERT INTO lista_precios_items (lista_id, producto_id, precio_costo, porcentaje_ganancia)
+            VALUES (?, ?, ?, ?)
+        ''', [(lista_id, producto_id, costo, ganancia) for producto_id, (costo, ganancia) in por_producto.items()])
+        conn.commit()
+    finally:
+        conn.close()
+
+    despertar_programador()
+    return lista_id
+
+
+def items_por_ajuste(condicion, params, ajuste_costo_porcentaje, porcentaje_ganancia=None):
+    """Items de lista a partir de los costos actuales de un alcance, con una variación en %"""
+    conn = get_db()
+    try:
+        columnas = cargar_columnas_precio(conn.cursor(), condicion, params)
+    finally:
+        conn.close()
+    factor = 1 + ajuste_costo_porcentaje / 100
+    return [
+        {'producto_id': producto_id, 'precio_costo': round(costo * factor, 2), 'porcentaje_ganancia': porcentaje_ganancia}
+        for producto_id, costo in zip(columnas['id'], columnas['precio_costo'])
+    ]
+
+
+def calcular_lista(cursor, lista_id):
+    """
+    (lista, columnas actuales, precios nuevos) de los productos de la lista.
+    Los precios nuevos salen de los costos/ganancias cargados con el redondeo de la lista.
+    """
+    cursor.execute('''
+        SELECT id, nombre, fecha_activacion, estado, paso_redondeo, modo_redondeo,
+               fecha_creacion, fecha_aplicada, productos_actualizados
+        FROM lista_precios WHERE id = ?
+    ''', (lista_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None, None, None
+    lista = dict(zip(
+        ('id', 'nombre', 'fecha_activacion', 'estado', 'paso_redondeo', 'modo_redondeo',
+         'fecha_creacion', 'fecha_aplicada', 'productos_actualizados'),
+        row
+    ))
+
+    cursor.execute(
+        'SELECT producto_id, precio_costo, porcentaje_ganancia FROM lista_precios_items WHERE lista_id = ?',
+        (lista_id,)
+    )
+    items = {producto_id: (costo, ganancia) for producto_id, costo, ganancia in cursor.fetchall()}
+
+    columnas = cargar_columnas_precio(
+        cursor, 'id IN (SELECT producto_id FROM lista_precios_items WHERE lista_id = ?)', (lista_id,)
+    )
+    # Los valores de la lista reemplazan a los actuales; la ganancia solo si se cargó
+    cargadas = dict(columnas)
+    cargadas['precio_costo'] = [items[i][0] for i in columnas['id']]
+    cargadas['porcentaje_ganancia'] = [
+        items[i][1] if items[i][1] is not None else actual
+        for i, actual in zip(columnas['id'], columnas['porcentaje_ganancia'])
+    ]
+    nuevos = recalcular_precios(
+        cargadas, paso_redondeo=lista['paso_redondeo'], modo_redondeo=lista['modo_redondeo']
+    )
+    return lista, columnas, nuevos
+
+
+def aplicar_lista(lista_id, invalidar=True):
+    """
+    Aplicar una lista pendiente en una sola transacción.
+
+    Devuelve la cantidad de productos actualizados, o None si la lista no
+    existe o ya no estaba pendiente (la aplicó otro proceso o se canceló).
+    """
+    conn = get_db()
+    conn.isolation_level = None
+    cursor = conn.cursor()
+    try:
+        cursor.execute('BEGIN IMMEDIATE')
+        fecha = get_argentina_time()
+        # Reclamar la lista: si otro worker ya la tomó, no hay nada que hacer
+        cursor.execute(
+            "UPDATE lista_precios SET estado = 'aplicada', fecha_aplicada = ? WHERE id = ? AND estado = 'pendiente'",
+            (fecha, lista_id)
+        )
+        if cursor.rowcount != 1:
+            cursor.execute('ROLLBACK')
+            return None
+
+        _, _, nuevos = calcular_lista(cursor, lista_id)
+        actualizados = guardar_precios(cursor, nuevos, set(nuevos['id']), fecha)
+        cursor.execute('UPDATE lista_precios SET productos_actualizados = ? WHERE id = ?', (actualizados, lista_id))
+        cursor.execute('COMMIT')
+    except Exception:
+        if conn.in_transaction:
+            cursor.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
+    if invalidar:
+        invalidar_catalogo()
+    return actualizados
+
+
+def aplicar_listas_vencidas(ahora=None):
+    """Aplicar en orden las listas pendientes cuya activación ya pasó. Devuelve [(lista_id, actualizados)]"""
+    ahora = ahora or get_argentina_time()
+    conn = get_db()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id FROM lista_precios
+            WHERE estado = 'pendiente' AND fecha_activacion <= ?
+            ORDER BY fecha_activacion, id
+        ''', (ahora,))
+        vencidas = [row[0] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+    aplicadas = []
+    for lista_id in vencidas:
+        actualizados = aplicar_lista(lista_id, invalidar=False)
+        if actualizados is not None:
+            aplicadas.append((lista_id, actualizados))
+
+    # Una sola invalidación aunque se hayan aplicado varias listas juntas
+    if aplicadas:
+        invalidar_catalogo()
+    return aplicadas
+
+
+def proxima_activacion():
+    """Fecha de activación de la próxima lista pendiente, o None"""
+    conn = get_db()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT MIN(fecha_activacion) FROM lista_precios WHERE estado = 'pendiente'")
+        return cursor.fetchone()[0]
+    finally:
+        conn.close()
+
+
+# --- Programador ---------------------------------------------------------
+
+_programador = {'pid': None, 'hilo': None}
+_programador_lock = threading.Lock()
+_despertar = threading.Event()
+
+
+def _segundos_hasta(fecha_activacion, intervalo):
+    """Cuánto dormir: hasta la próxima activación, sin pasar del intervalo"""
+    if fecha_activacion is None:
+        return intervalo
+    objetivo = datetime.strptime(fecha_activacion, FORMATO_FECHA)
+    faltan = (objetivo - get_argentina_datetime()).total_seconds()
+    return min(intervalo, max(faltan, 0))
+
+
+def _bucle_programador(intervalo):
+    while True:
+        espera = intervalo
+        try:
+            aplicadas = aplicar_listas_vencidas()
+            for lista_id, actualizados in aplicadas:
+                print(f"💲 Lista de precios {lista_id} aplicada: {actualizados} productos")
+            espera = _segundos_hasta(proxima_activacion(), intervalo)
+        except Exception as e:
+            print(f"❌ Error en el programador de listas de precios: {e}")
+        _despertar.wait(espera)
+        _despertar.clear()
+
+
+def iniciar_programador():
+    """Iniciar el hilo del programador en este proceso, una sola vez (barato si ya corre)"""
+    if _programador['pid'] == os.getpid():
+        return
+    if os.environ.get('DN_PROGRAMADOR', '1') == '0':
+        return
+    with _programador_lock:
+        if _programador['pid'] == os.getpid():
+            return
+        intervalo = float(os.environ.get('DN_PROGRAMADOR_INTERVALO', INTERVALO_DEFAULT))
+        hilo = threading.Thread(
+            target=_bucle_programador, args=(intervalo,), name='programador-listas-precios', daemon=True
+        )
+        hilo.start()
+        _programador.update(pid=os.getpid(), hilo=hilo)
+
+
+def despertar_programador():
+    """Pedir al programador que recalcule su espera (p. ej. tras crear una lista)"""
+    _despertar.set()
@@ -0,0 +1,113 @@
+"""
+Lista de picking: cuánto preparar de cada producto para los pedidos pendientes
+
+Una sola consulta agregada sobre pedido_items de los pedidos pendientes
+(filtrando por el índice idx_pedidos_estado_fecha) suma por producto las
+unidades y, para los ítems fraccionados, los gramos/ml y las porciones a
+pesar. Opcionalmente se separa por tipo de entrega (envío / retiro).
+
+Recibe `ejecutar(sql, params)` como utils/stock.py.
+"""
+
+import csv
+import io
+
+COLUMNAS = (
+    ('tipo_entrega', 'Entrega'),
+    ('producto', 'Producto'),
+    ('marca', 'Marca'),
+    ('unidades', 'Unidades'),
+    ('cantidad_fraccionada', 'Fraccionado'),
+    ('unidad_fraccionada', 'Unidad'),
+    ('porciones', 'Porciones'),
+    ('pedidos', 'Pedidos'),
+)
+
+
+def armar_lista_picking(ejecutar, por_entrega=False, tipo_entrega=None, pedido_ids=None):
+    """
+    Filas {producto_id, producto, marca, unidades, cantidad_fraccionada,
+    unidad_fraccionada, porciones, pedidos[, tipo_entrega]} ordenadas por
+    producto. `porciones` lista las cantidades fraccionadas a pesar
+    (p. ej. "250, 100"). `pedido_ids` limita la lista a esos pedidos.
+    """
+    condiciones = ["pe.estado = 'pendiente'"]
+    params = []
+    if tipo_entrega:
+        condiciones.append('pe.tipo_entrega = ?')
+        params.append(tipo_entrega)
+    if pedido_ids:
+        condiciones.append(f"pe.id IN ({', '.join('?' for _ in pedido_ids)})")
+        params.extend(pedido_ids)
+    grupo = 'pe.tipo_entrega, ' if por_entrega else ''
+
+    filas = ejecutar(f'''
+        SELECT {grupo}pi.producto_id,
+               COALESCE(p.nombre, MIN(pi.nombre_producto)) AS producto,
+               m.nombre AS marca,
+               SUM(CASE WHEN pi.es_fraccionado THEN 0 ELSE pi.cantidad END) AS unidades,
+               SUM(CASE WHEN pi.es_fraccionado THEN pi.cantidad_personalizada ELSE 0 END) AS cantidad_fraccionada,
+               MAX(CASE WHEN pi.es_fraccionado THEN pi.unidad END) AS unidad_fraccionada,
+               GROUP_CONCAT(CASE WHEN pi.es_fraccionado THEN pi.cantidad_personalizada END, ', ') AS porciones,
+               COUNT(DISTINCT pi.pedido_id) AS pedidos
+        FROM pedidos pe
+        JOIN pedido_items pi ON pi.pedido_id = pe.id
+        LEFT JOIN producto p ON p.id = pi.producto_id
+        LEFT JOIN marca m ON m.id = p.marca_id
+        WHERE {' AND '.join(condiciones)}
+        GROUP BY {grupo}pi.producto_id
+        ORDER BY {grupo}producto
+    ''', params).fetchall()
+
+    nombres = (['tipo_entrega'] if por_entrega else []) + [
+        'producto_id', 'producto', 'marca', 'unidades', 'cantidad_fraccionada',
+        'unidad_fraccionada', 'porciones', 'pedidos'
+    ]
+    return [dict(zip(nombres, fila)) for fila in filas]
+
+
+def _columnas(filas):
+    return [(clave, titulo) for clave, titulo in COLUMNAS if clave != 'tipo_entrega' or (filas and 'tipo_entrega' in filas[0])]
+
+
+def exportar_csv(filas):
+    """La lista como CSV (texto)"""
+    columnas = _columnas(filas)
+    salida = io.StringIO()
+    writer = csv.writer(salida)
+    writer.writerow([titulo for _, titulo in columnas])
+    for fila in filas:
+        writer.writerow(['' if fila[clave] is None else fila[clave] for clave, _ in columnas])
+    return salida.getvalue()
+
+
+def exportar_xlsx(filas, titulo):
+    """
+    La lista como planilla de una hoja, con una columna "Listo" para ir
+    tildando. ImportError si openpyxl no está instalado.
+    """
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill
+
+    columnas = _columnas(filas)
+    workbook = Workbook()
+    ws = workbook.active
+    ws.title = 'Picking'
+    ws.append([titulo])
+    ws['A1'].font = Font(bold=True, size=12)
+    ws.append([titulo_columna for _, titulo_columna in columnas] + ['Listo'])
+    for cell in ws[2]:
+        cell.font = Font(bold=True, color="FFFFFF")
+        cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    for fila in filas:
+        ws.append([fila[clave] for clave, _ in columnas] + [''])
+
+    for column in ws.iter_cols(min_row=2):
+        largo = max(len(str(cell.value)) if cell.value is not None else 0 for cell in column)
+        ws.column_dimensions[column[0].column_letter].width = min(largo + 2, 50)
+    ws.freeze_panes = 'A3'
+
+    salida = io.BytesIO()
+    workbook.save(salida)
+    salida.seek(0)
+    return salida
@@ -0,0 +1,253 @@
+"""
+Cálculo de precios de productos
+
+Misma fórmula que el formulario de administración (ProductosABMC.jsx):
+    precio = precio_costo + precio_costo * porcentaje_ganancia
+con porcentaje_ganancia en decimal (0.3 = 30 %). Para productos por unidad
+se deriva el precio de cada unidad y para los de peso/volumen el precio
+cada 100 (gramos, ml...).
+
+`calcular_precios()` resuelve un producto. Para repreciar muchos a la vez
+(un proveedor, una categoría o todo el catálogo) `cargar_columnas_precio()`
+lee solo las columnas de precio en listas y `recalcular_precios()` las
+procesa en una pasada vectorizada con numpy si está instalado, o con un
+bucle de Python si no.
+"""
+
+import math
+from config.esquema import filtrar_columnas, sentencia_update
+
+MODOS_REDONDEO = ('cercano', 'arriba', 'abajo')
+
+COLUMNAS_PRECIO = (
+    'id', 'nombre', 'precio_costo', 'porcentaje_ganancia', 'tipo_calculo',
+    'cantidad_unidades', 'cantidad', 'precio_venta_publico'
+)
+
+
+# Selectores de productos admitidos en un "alcance" / "filtro"
+FILTROS_ALCANCE = {
+    'ids': 'id',
+    'proveedor_id': 'proveedor_id',
+    'categoria_id': 'categoria_id',
+    'marca_id': 'marca_id',
+}
+
+
+def condicion_alcance(alcance, permitir_todos=False):
+    """
+    WHERE y parámetros para un selector de productos ({"proveedor_id": 3},
+    {"ids": [1, 2]}, ...). Exige al menos un criterio salvo {"todos": true}
+    cuando `permitir_todos`. ValueError si el selector es inválido.
+    """
+    if permitir_todos and alcance == {'todos': True}:
+        return '1', []
+
+    desconocidos = set(alcance) - set(FILTROS_ALCANCE)
+    if desconocidos:
+        raise ValueError(f"Filtros no admitidos: {', '.join(sorted(desconocidos))}")
+
+    condiciones, params = [], []
+    for clave, columna in FILTROS_ALCANCE.items():
+        if clave not in alcance:
+            continue
+        valores = alcance[clave] if isinstance(alcance[clave], list) else [alcance[clave]]
+        valores = [int(valor) for valor in valores]
+        if not valores:
+            raise ValueError(f'{clave} está vacío')
+        condiciones.append(f"{columna} IN ({', '.join('?' for _ in valores)})")
+        params.extend(valores)
+
+    if not condiciones:
+        raise ValueError('El filtro necesita al menos uno de: ' + ', '.join(FILTROS_ALCANCE))
+    return ' AND '.join(condiciones), params
+
+
+def calcular_precios(precio_costo, porcentaje_ganancia, tipo_calculo='peso',
+                     cantidad_unidades=None, cantidad=None):
+    """Columnas de precio derivadas de costo y ganancia para un producto"""
+    precio_costo = float(precio_costo or 0)
+    porcentaje_ganancia = float(porcentaje_ganancia or 0)
+    precio = precio_costo + precio_costo * porcentaje_ganancia
+
+    precios = {
+        'precio_costo': precio_costo,
+        'porcentaje_ganancia': porcentaje_ganancia,
+        'precio': precio,
+        'precio_venta_publico': precio,
+        'precio_por_unidad': None,
+        'precio_fraccionado_por_100': None
+    }
+    if tipo_calculo == 'unidad':
+        precios['precio_por_unidad'] = precio / (cantidad_unidades or 1)
+    else:
+        precios['precio_fraccionado_por_100'] = precio / ((cantidad or 100) / 100)
+    return precios
+
+
+def _numpy():
+    # numpy es opcional y pesado: se importa recién al repreciar
+    try:
+        import numpy
+        return numpy
+    except ImportError:
+        return None
+
+
+def cargar_columnas_precio(cursor, condicion='1', params=()):
+    """
+    Columnas de precio de los productos que cumplen `condicion`, como
+    {columna: lista}, con los vacíos ya reemplazados por sus valores por defecto
+    """
+    cursor.execute(
+        f"SELECT {', '.join(COLUMNAS_PRECIO)} FROM producto WHERE {condicion} ORDER BY id",
+        list(params)
+    )
+    filas = cursor.fetchall()
+    columnas = dict(zip(COLUMNAS_PRECIO, (list(valores) for valores in zip(*filas)))) if filas else \
+        {columna: [] for columna in COLUMNAS_PRECIO}
+    return normalizar_columnas(columnas)
+
+
+def normalizar_columnas(columnas):
+    """Reemplazar los vacíos de las columnas de precio ({columna: lista}) por sus valores por defecto"""
+    columnas['precio_costo'] = [float(v or 0) for v in columnas['precio_costo']]
+    columnas['porcentaje_ganancia'] = [float(v or 0) for v in columnas['porcentaje_ganancia']]
+    columnas['tipo_calculo'] = [v or 'peso' for v in columnas['tipo_calculo']]
+    columnas['cantidad_unidades'] = [v or 1 for v in columnas['cantidad_unidades']]
+    columnas['cantidad'] = [v or 100 for v in columnas['cantidad']]
+    return columnas
+
+
+def _redondear_python(valor, paso, modo):
+    cociente = valor / paso
+    if modo == 'arriba':
+        # Tolerancia para que 1.1 / 0.01 = 110.00000000000001 no suba un centavo
+        cociente = math.ceil(cociente - 1e-9)
+    elif modo == 'abajo':
+        cociente = math.floor(cociente + 1e-9)
+    else:
+        cociente = math.floor(cociente + 0.5)
+    return round(cociente * paso, 2)
+
+
+def _recalcular_python(costo, ganancia, es_unidad, divisor, paso, modo):
+    precios = [_redondear_python(c + c * g, paso, modo) for c, g in zip(costo, ganancia)]
+    derivados = [round(p / d, 2) for p, d in zip(precios, divisor)]
+    return {
+        'precio': precios,
+        'precio_por_unidad': [d if u else None for d, u in zip(derivados, es_unidad)],
+        'precio_fraccionado_por_100': [None if u else d for d, u in zip(derivados, es_unidad)],
+    }
+
+
+def _recalcular_numpy(np, costo, ganancia, es_unidad, divisor, paso, modo):
+    costo = np.asarray(costo, dtype=float)
+    es_unidad = np.asarray(es_unidad, dtype=bool)
+    cociente = (costo + costo * np.asarray(ganancia, dtype=float)) / paso
+    if modo == 'arriba':
+        cociente = np.ceil(cociente - 1e-9)
+    elif modo == 'abajo':
+        cociente = np.floor(cociente + 1e-9)
+    else:
+        cociente = np.floor(cociente + 0.5)
+    precios = np.round(cociente * paso, 2)
+    derivados = np.round(precios / np.asarray(divisor, dtype=float), 2).tolist()
+    unidad = es_unidad.tolist()
+    return {
+        'precio': precios.tolist(),
+        'precio_por_unidad': [d if u else None for d, u in zip(derivados, unidad)],
+        'precio_fraccionado_por_100': [None if u else d for d, u in zip(derivados, unidad)],
+    }
+
+
+def recalcular_precios(columnas, ajuste_costo_porcentaje=0.0, porcentaje_ganancia=None,
+                       paso_redondeo=0.01, modo_redondeo='cercano'):
+    """
+    Precios nuevos para las columnas cargadas con `cargar_columnas_precio()`.
+
+    Aplica la variación de costo (en %), reemplaza la ganancia si se indica
+    y redondea el precio de venta al múltiplo de `paso_redondeo` (0.01,
+    10, 50...) según el modo. Los precios por unidad o cada 100 se derivan
+    del precio ya redondeado. Devuelve {columna: lista} en el mismo orden.
+    """
+    if modo_redondeo not in MODOS_REDONDEO:
+        raise ValueError(f"modo_redondeo inválido: {modo_redondeo}")
+    if paso_redondeo <= 0:
+        raise ValueError('paso_redondeo debe ser mayor a 0')
+
+    factor = 1 + ajuste_costo_porcentaje / 100
+    costo = [round(c * factor, 2) for c in columnas['precio_costo']]
+    if porcentaje_ganancia is None:
+        ganancia = columnas['porcentaje_ganancia']
+    else:
+        ganancia = [porcentaje_ganancia] * len(costo)
+    es_unidad = [tipo == 'unidad' for tipo in columnas['tipo_calculo']]
+    divisor = [
+        unidades if unidad else cantidad / 100
+        for unidad, unidades, cantidad in zip(es_unidad, columnas['cantidad_unidades'], columnas['cantidad'])
+    ]
+
+    np = _numpy()
+    if np is not None:
+        nuevos = _recalcular_numpy(np, costo, ganancia, es_unidad, divisor, paso_redondeo, modo_redondeo)
+    else:
+        nuevos = _recalcular_python(costo, ganancia, es_unidad, divisor, paso_redondeo, modo_redondeo)
+
+    nuevos['id'] = columnas['id']
+    nuevos['precio_costo'] = costo
+    nuevos['porcentaje_ganancia'] = list(ganancia)
+    return nuevos
+
+
+def resumir_diferencias(columnas, nuevos):
+    """Diferencias por producto (solo los que cambian) y un resumen de la variación"""
+    diferencias = []
+    for i, producto_id in enumerate(columnas['id']):
+        anterior = columnas['precio_venta_publico'][i]
+        nuevo = nuevos['precio'][i]
+        if anterior is not None and round(anterior, 2) == nuevo and \
+                columnas['precio_costo'][i] == nuevos['precio_costo'][i]:
+            continue
+        diferencias.append({
+            'id': producto_id,
+            'nombre': columnas['nombre'][i],
+            'precio_anterior': anterior,
+            'precio_nuevo': nuevo,
+            'variacion_porcentaje': round((nuevo / anterior - 1) * 100, 2) if anterior else None
+        })
+
+    variaciones = [d['variacion_porcentaje'] for d in diferencias if d['variacion_porcentaje'] is not None]
+    resumen = {
+        'productos_evaluados': len(columnas['id']),
+        'productos_con_cambios': len(diferencias),
+        'suben': sum(1 for v in variaciones if v > 0),
+        'bajan': sum(1 for v in variaciones if v < 0),
+        'variacion_promedio_porcentaje': round(sum(variaciones) / len(variaciones), 2) if variaciones else 0
+    }
+    return diferencias, resumen
+
+
+def guardar_precios(cursor, nuevos, ids, fecha):
+    """
+    Escribir con un solo executemany los precios recalculados de los
+    productos `ids` (subconjunto de nuevos['id']). Devuelve cuántos se escribieron.
+    """
+    valores = {
+        'precio_costo': nuevos['precio_costo'],
+        'porcentaje_ganancia': nuevos['porcentaje_ganancia'],
+        'precio': nuevos['precio'],
+        'precio_venta_publico': nuevos['precio'],
+        'precio_por_unidad': nuevos['precio_por_unidad'],
+        'precio_fraccionado_por_100': nuevos['precio_fraccionado_por_100'],
+    }
+    columnas_update = tuple(filtrar_columnas('producto', {**valores, 'fecha_ultima_modificacion': None}))
+    filas = [
+        [fecha if columna == 'fecha_ultima_modificacion' else valores[columna][i] for columna in columnas_update]
+        + [producto_id]
+        for i, producto_id in enumerate(nuevos['id'])
+        if producto_id in ids
+    ]
+    if filas:
+        cursor.executemany(sentencia_update('producto', columnas_update), filas)
+    return len(filas)
@@ -0,0 +1,113 @@
+"""
+Stock de productos
+
+`producto.stock` guarda la existencia en la unidad de venta del producto:
+paquetes para los de tipo 'unidad' y gramos/ml para los de peso o volumen
+(así un producto fraccionado descuenta exactamente lo que se pesó). Un
+stock NULL significa que el producto no lleva control de stock y nunca
+bloquea una compra.
+
+La reserva de un pedido es un único UPDATE ... FROM con todos los ítems
+del carrito, condicionado a que alcance la existencia de cada producto. Se
+ejecuta dentro de la transacción del pedido, así que dos checkouts
+concurrentes se serializan en el lock de escritura de SQLite y el segundo
+ve el stock ya descontado: no se puede vender de más.
+
+Las funciones reciben `ejecutar(sql, params)`, que puede ser
+cursor.execute de sqlite3 o exec_driver_sql de una conexión SQLAlchemy,
+para usarse desde las rutas con SQL directo y desde las de pedidos.
+"""
+
+
+def consumo_item(producto, item):
+    """
+    Cuánto stock consume un ítem de pedido, en la unidad del producto.
+
+    - Fraccionado: los gramos/ml pedidos (cantidad_personalizada)
+    - Producto por peso entero: cantidad de paquetes * contenido del paquete
+    - Producto por unidad: cantidad de paquetes
+    """
+    if item.get('es_fraccionado'):
+        return float(item.get('cantidad_personalizada') or 0)
+    cantidad = float(item.get('cantidad') or 0)
+    if (producto.tipo_calculo or 'peso') == 'unidad':
+        return cantidad
+    return cantidad * float(producto.cantidad or 100)
+
+
+def _valores(consumos):
+    """
+    Subconsulta (producto_id, cantidad) con los consumos y sus parámetros.
+
+    Va en el FROM y no en un WITH: sqlite3 solo abre la transacción implícita
+    (y cuenta rowcount) si la sentencia empieza con UPDATE/INSERT/DELETE.
+    """
+    filas = ', '.join('(?, ?)' for _ in consumos)
+    subconsulta = f'(SELECT column1 AS producto_id, column2 AS cantidad FROM (VALUES {filas}))'
+    return subconsulta, [v for par in consumos.items() for v in par]
+
+
+def _positivos(consumos):
+    return {producto_id: cantidad for producto_id, cantidad in consumos.items() if cantidad > 0}
+
+
+def reservar_stock(ejecutar, consumos):
+    """
+    Descontar en un solo UPDATE el stock de todos los productos del pedido.
+
+    `consumos` es {producto_id: cantidad} (ya sumado si un producto se repite).
+    Devuelve True si alcanzó para todos. Si devuelve False el llamador debe
+    deshacer la transacción (los productos que sí alcanzaban quedaron
+    descontados) y puede informar el detalle con `faltantes_stock()`.
+    """
+    consumos = _positivos(consumos)
+    if not consumos:
+        return True
+
+    valores, params = _valores(consumos)
+    descontados = ejecutar(f'''
+        UPDATE producto SET stock = producto.stock - consumo.cantidad
+        FROM {valores} AS consumo
+        WHERE producto.id = consumo.producto_id
+          AND producto.stock IS NOT NULL
+          AND producto.stock >= consumo.cantidad
+    ''', params).rowcount
+
+    # Ya con el lock de escritura tomado: cuántos de estos productos controlan stock
+    placeholders = ', '.join('?' for _ in consumos)
+    controlados = ejecutar(
+        f'SELECT COUNT(*) FROM producto WHERE id IN ({placeholders}) AND stock IS NOT NULL',
+        list(consumos)
+    ).fetchone()[0]
+    return descontados == controlados
+
+
+def faltantes_stock(ejecutar, consumos):
+    """Productos cuyo stock actual no alcanza para los consumos pedidos"""
+    consumos = _positivos(consumos)
+    if not consumos:
+        return []
+    valores, params = _valores(consumos)
+    filas = ejecutar(f'''
+        SELECT p.id, p.nombre, p.stock, c.cantidad
+        FROM producto p JOIN {valores} AS c ON c.producto_id = p.id
+        WHERE p.stock IS NOT NULL AND p.stock < c.cantidad
+        ORDER BY p.id
+    ''', params).fetchall()
+    return [
+        {'producto_id': producto_id, 'nombre': nombre, 'stock_disponible': stock, 'solicitado': cantidad}
+        for producto_id, nombre, stock, cantidad in filas
+    ]
+
+
+def devolver_stock(ejecutar, consumos):
+    """Reponer el stock reservado (p. ej. al cancelar un pedido). No toca productos sin control"""
+    consumos = _positivos(consumos)
+    if not consumos:
+        return
+    valores, params = _valores(consumos)
+    ejecutar(f'''
+        UPDATE producto SET stock = producto.stock + consumo.cantidad
+        FROM {valores} AS consumo
+        WHERE producto.id = consumo.producto_id AND producto.stock IS NOT NULL
+    ''', params)
@@ -0,0 +1,88 @@
+"""
+Taxonomía del catálogo en memoria
+
+Categorías, marcas, etiquetas, unidades y proveedores cambian muy poco y
+se piden en cada carga de página, así que se leen juntas con una sola
+conexión y se guardan ya serializadas junto con un ETag calculado sobre
+el contenido (igual en todos los workers). Las rutas que escriben alguna
+de estas tablas deben llamar a `invalidar_taxonomia()` después del commit.
+"""
+
+import hashlib
+import json
+import sqlite3
+from flask import Response, request
+from config.database import get_db
+from config.esquema import columnas
+from utils.cache import CacheVersionada
+
+# clave del payload -> (tabla, columnas, ordenadas por nombre)
+ENTIDADES = {
+    'categorias': ('categoria', ('id', 'nombre')),
+    'marcas': ('marca', ('id', 'nombre')),
+    'etiquetas': ('tipo_alimento', ('id', 'nombre')),
+    'unidades': ('unidad', ('id', 'nombre', 'abreviacion', 'tipo')),
+    'proveedores': ('proveedor', ('id', 'nombre', 'telefono', 'email')),
+}
+
+
+def _leer_entidad(cursor, tabla, nombres_columnas):
+    existentes = set(columnas(tabla))
+    # Las columnas opcionales que falten en BDs viejas se devuelven como ''
+    select = ', '.join(c if c in existentes else f"'' AS {c}" for c in nombres_columnas)
+    cursor.execute(f'SELECT {select} FROM {tabla} ORDER BY nombre')
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def _serializar(datos):
+    cuerpo = json.dumps(datos, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return {
+        'cuerpo': cuerpo,
+        'etag': hashlib.sha1(cuerpo).hexdigest()[:16]
+    }
+
+
+def _construir_taxonomia():
+    conn = get_db()
+    conn.row_factory = sqlite3.Row
+    try:
+        cursor = conn.cursor()
+        datos = {
+            clave: _leer_entidad(cursor, tabla, nombres_columnas)
+            for clave, (tabla, nombres_columnas) in ENTIDADES.items()
+        }
+    finally:
+        conn.close()
+
+    taxonomia = _serializar(datos)
+    taxonomia['datos'] = datos
+    # Cada listado se serializa una vez; todos comparten el ETag del conjunto
+    taxonomia['listados'] = {clave: _serializar(lista)['cuerpo'] for clave, lista in datos.items()}
+    return taxonomia
+
+
+_taxonomia = CacheVersionada('taxonomia', _construir_taxonomia, clave_bd='taxonomia')
+
+
+def obtener_taxonomia():
+    """Diccionario {categorias, marcas, etiquetas, unidades, proveedores} (no modificar)"""
+    return _taxonomia.obtener()['datos']
+
+
+def respuesta_taxonomia(clave=None):
+    """
+    Respuesta JSON con toda la taxonomía o solo un listado (`clave`).
+
+    Lleva el ETag del conjunto y `no-cache`, así el navegador revalida en
+    cada carga y recibe un 304 sin cuerpo mientras nada haya cambiado.
+    """
+    taxonomia = _taxonomia.obtener()
+    cuerpo = taxonomia['cuerpo'] if clave is None else taxonomia['listados'][clave]
+    respuesta = Response(cuerpo, mimetype='application/json')
+    respuesta.set_etag(taxonomia['etag'])
+    respuesta.headers['Cache-Control'] = 'public, no-cache'
+    return respuesta.make_conditional(request)
+
+
+def invalidar_taxonomia():
+    _taxonomia.invalidar()
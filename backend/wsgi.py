@@ -0,0 +1,40 @@
+"""
+Punto de entrada WSGI para producción
+
+Linux/macOS (varios procesos con threads, ver gunicorn.conf.py):
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Windows (un proceso, varios threads):
+    python wsgi.py
+
+DN_ARRANQUE=diferido omite el precalentado (ver aplicacion.py).
+"""
+
+import logging
+import os
+import sys
+
+# Agregar el directorio actual al path para imports relativos
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from aplicacion import create_app, preparar_arranque
+
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO'))
+
+app = create_app()
+preparar_arranque(app)
+
+if __name__ == '__main__':
+    try:
+        from waitress import serve
+    except ImportError:
+        print("❌ waitress no está instalado: pip install waitress (o usar gunicorn en Linux)")
+        sys.exit(1)
+
+    serve(
+        app,
+        host=os.environ.get('HOST', '0.0.0.0'),
+        port=int(os.environ.get('PORT', 5000)),
+        threads=int(os.environ.get('WEB_THREADS', 8))
+    )
@@ -1,15 +1,29 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { formatearPrecio } from '../../utils/formatoArgentino.jsx';
 
 function PedidosAdmin() {
   const [pedidos, setPedidos] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
-  const [filtroEstado, setFiltroEstado] = useState('todos');
+  // Por defecto la cola de despacho: solo los pendientes, del más viejo al más nuevo
+  const [filtroEstado, setFiltroEstado] = useState('pendiente');
+  const [conteos, setConteos] = useState({ pendiente: 0, entregado: 0, cancelado: 0 });
+  const [seleccionados, setSeleccionados] = useState([]);
   const [pedidoSeleccionado, setPedidoSeleccionado] = useState(null);
   const [costoEnvio, setCostoEnvio] = useState(0);
   const [mostrarModalCosto, setMostrarModalCosto] = useState(false);
   const [nuevoCosto, setNuevoCosto] = useState('');
+  // Se incrementa para volver a descargar la lista (evento "recargar" del servidor)
+  const [recargas, setRecargas] = useState(0);
+  const filtroRef = useRef(filtroEstado);
+  const ultimoEventoRef = useRef(null);
+
+  // Cambios de estado que acepta el servidor (TRANSICIONES en routes/pedidos.py)
+  const transiciones = {
+    'pendiente': ['entregado', 'cancelado'],
+    'entregado': ['pendiente'],
+    'cancelado': ['pendiente']
+  };
 
   const estadosColores = {
     'pendiente': { bg: 'warning', text: 'dark', icon: 'clock' },
@@ -18,10 +32,75 @@ function PedidosAdmin() {
   };
 
   useEffect(() => {
-    cargarPedidos();
     cargarCostoEnvio();
   }, []);
 
+  useEffect(() => {
+    filtroRef.current = filtroEstado;
+    cargarPedidos();
+    setSeleccionados([]);
+  }, [filtroEstado, recargas]);
+
+  // Pedidos nuevos y cambios de estado en vivo (server-sent events): mensajes
+  // chicos en lugar de volver a descargar la lista
+  useEffect(() => {
+    let fuente = null;
+    let reintento = null;
+    let fallos = 0;
+    let activo = true;
+
+    const reintentar = () => {
+      // El primero enseguida (p. ej. el token de la reconexión ya venció); si sigue fallando, más tarde
+      reintento = setTimeout(conectar, fallos++ === 0 ? 3000 : 30000);
+    };
+
+    const conectar = async () => {
+      // EventSource no manda headers: en la URL va un token corto solo para este stream
+      let token;
+      try {
+        const response = await fetch('http://localhost:5000/api/pedidos/admin/eventos/token', {
+          method: 'POST',
+          headers: { 'Authorization': `Bearer ${localStorage.getItem('token')}` }
+        });
+        if (!response.ok) throw new Error('No se pudo obtener el token de eventos');
+        token = (await response.json()).token;
+      } catch (err) {
+        console.error('Error al conectar los eventos de pedidos:', err);
+        if (activo) reintentar();
+        return;
+      }
+      if (!activo) return;
+
+      const params = new URLSearchParams({ token });
+      if (ultimoEventoRef.current) {
+        params.set('desde', ultimoEventoRef.current);
+      }
+      fuente = new EventSource(`http://localhost:5000/api/pedidos/admin/eventos?${params}`);
+
+      const recibir = (manejar) => (event) => {
+        ultimoEventoRef.current = event.lastEventId;
+        manejar(JSON.parse(event.data));
+      };
+      fuente.onopen = () => { fallos = 0; };
+      fuente.addEventListener('pedido_creado', recibir(agregarPedidoNuevo));
+      fuente.addEventListener('pedidos_estado', recibir(aplicarCambioRemoto));
+      fuente.addEventListener('recargar', recibir(() => setRecargas(n => n + 1)));
+      fuente.onerror = () => {
+        // Los cortes los reintenta el navegador solo; si el servidor rechazó la conexión, pedir otro token
+        if (fuente.readyState === EventSource.CLOSED) {
+          reintentar();
+        }
+      };
+    };
+
+    conectar();
+    return () => {
+      activo = false;
+      clearTimeout(reintento);
+      if (fuente) fuente.close();
+    };
+  }, []);
+
   const cargarCostoEnvio = async () => {
     try {
       const response = await fetch('http://localhost:5000/api/pedidos/config/costo-envio');
@@ -37,7 +116,11 @@ function PedidosAdmin() {
       setLoading(true);
       const token = localStorage.getItem('token');
       
-      const response = await fetch('http://localhost:5000/api/pedidos/admin/todos', {
+      // El historial completo solo para "Todos"; el resto usa la cola por estado
+      const url = filtroEstado === 'todos'
+        ? 'http://localhost:5000/api/pedidos/admin/todos'
+        : `http://localhost:5000/api/pedidos/admin/cola?estado=${filtroEstado}`;
+      const response = await fetch(url, {
         headers: {
           'Authorization': `Bearer ${token}`
         }
@@ -49,6 +132,11 @@ function PedidosAdmin() {
 
       const data = await response.json();
       setPedidos(data.pedidos);
+      setConteos(data.conteos || {
+        pendiente: data.pedidos.filter(p => p.estado === 'pendiente').length,
+        entregado: data.pedidos.filter(p => p.estado === 'entregado').length,
+        cancelado: data.pedidos.filter(p => p.estado === 'cancelado').length
+      });
       setError('');
     } catch (err) {
       console.error('Error:', err);
@@ -58,6 +146,66 @@ function PedidosAdmin() {
     }
   };
 
+  // Reflejar un cambio de estado sin volver a descargar los pedidos
+  const aplicarCambioLocal = (ids, nuevoEstado) => {
+    const cambiados = pedidos.filter(p => ids.includes(p.id));
+    setConteos(prev => {
+      const nuevos = { ...prev };
+      cambiados.forEach(p => {
+        nuevos[p.estado] = (nuevos[p.estado] || 0) - 1;
+        nuevos[nuevoEstado] = (nuevos[nuevoEstado] || 0) + 1;
+      });
+      return nuevos;
+    });
+    setPedidos(prev => filtroEstado === 'todos'
+      ? prev.map(p => ids.includes(p.id) ? { ...p, estado: nuevoEstado } : p)
+      : prev.filter(p => !ids.includes(p.id)));
+    setSeleccionados(prev => prev.filter(id => !ids.includes(id)));
+  };
+
+  // Los eventos traen los contadores actuales; los estados sin pedidos no vienen
+  const actualizarConteos = (nuevos) => {
+    setConteos({ pendiente: 0, entregado: 0, cancelado: 0, ...nuevos });
+  };
+
+  const agregarPedidoNuevo = async (datos) => {
+    actualizarConteos(datos.conteos);
+    const filtro = filtroRef.current;
+    if (filtro !== 'todos' && filtro !== datos.estado) return;
+    try {
+      const token = localStorage.getItem('token');
+      const response = await fetch(`http://localhost:5000/api/pedidos/${datos.id}`, {
+        headers: {
+          'Authorization': `Bearer ${token}`
+        }
+      });
+      if (!response.ok) return;
+
+      const pedido = await response.json();
+      // "Todos" va del más nuevo al más viejo; la cola, al revés
+      setPedidos(prev => prev.some(p => p.id === pedido.id)
+        ? prev
+        : (filtro === 'todos' ? [pedido, ...prev] : [...prev, pedido]));
+    } catch (err) {
+      console.error('Error al cargar el pedido nuevo:', err);
+    }
+  };
+
+  // Puede ser un cambio hecho desde esta misma pantalla: aplicarlo de nuevo no cambia nada
+  const aplicarCambioRemoto = ({ pedido_ids: ids, estado, conteos: nuevosConteos }) => {
+    actualizarConteos(nuevosConteos);
+    const filtro = filtroRef.current;
+    if (filtro === 'todos') {
+      setPedidos(prev => prev.map(p => ids.includes(p.id) ? { ...p, estado } : p));
+    } else if (filtro === estado) {
+      // Pedidos que entran a la vista actual desde otra pantalla: traer la lista
+      setRecargas(n => n + 1);
+    } else {
+      setPedidos(prev => prev.filter(p => !ids.includes(p.id)));
+    }
+    setSeleccionados(prev => prev.filter(id => !ids.includes(id)));
+  };
+
   const cambiarEstadoPedido = async (pedidoId, nuevoEstado) => {
     try {
       const token = localStorage.getItem('token');
@@ -71,19 +219,88 @@ function PedidosAdmin() {
         body: JSON.stringify({ estado: nuevoEstado })
       });
 
+      const data = await response.json();
+      if (!response.ok) {
+        throw new Error(data.error || 'Error al actualizar el estado');
+      }
+
+      aplicarCambioLocal([pedidoId], nuevoEstado);
+    } catch (err) {
+      console.error('Error:', err);
+      alert(`Error al actualizar el estado del pedido: ${err.message}`);
+    }
+  };
+
+  // Cambiar varios pedidos en una sola transacción (p. ej. marcar la tanda de entregas)
+  const cambiarEstadoSeleccionados = async (nuevoEstado) => {
+    if (seleccionados.length === 0) return;
+    try {
+      const token = localStorage.getItem('token');
+
+      const response = await fetch('http://localhost:5000/api/pedidos/admin/estado', {
+        method: 'PATCH',
+        headers: {
+          'Content-Type': 'application/json',
+          'Authorization': `Bearer ${token}`
+        },
+        body: JSON.stringify({ pedido_ids: seleccionados, estado: nuevoEstado })
+      });
+
+      const data = await response.json();
       if (!response.ok) {
-        throw new Error('Error al actualizar el estado');
+        throw new Error(data.error || 'Error al actualizar los estados');
       }
 
-      // Recargar pedidos
-      await cargarPedidos();
-      alert('Estado actualizado correctamente');
+      aplicarCambioLocal(seleccionados, nuevoEstado);
     } catch (err) {
       console.error('Error:', err);
-      alert('Error al actualizar el estado del pedido');
+      alert(`Error al actualizar los pedidos: ${err.message}`);
     }
   };
 
+  // Planilla con el total a preparar por producto (de los seleccionados, o de todos los pendientes)
+  const descargarPicking = async () => {
+    try {
+      const token = localStorage.getItem('token');
+      const params = new URLSearchParams({ formato: 'xlsx', por_entrega: 'true' });
+      if (seleccionados.length > 0) {
+        params.set('pedido_ids', seleccionados.join(','));
+      }
+
+      const response = await fetch(`http://localhost:5000/api/pedidos/admin/picking?${params}`, {
+        headers: {
+          'Authorization': `Bearer ${token}`
+        }
+      });
+
+      if (!response.ok) {
+        const data = await response.json();
+        throw new Error(data.error || 'Error al generar la lista de picking');
+      }
+
+      // Sin openpyxl en el servidor llega un CSV
+      const extension = (response.headers.get('Content-Type') || '').includes('csv') ? 'csv' : 'xlsx';
+      const fecha = new Date().toISOString().split('T')[0];
+      const url = window.URL.createObjectURL(await response.blob());
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = `picking_${fecha}.${extension}`;
+      document.body.appendChild(link);
+      link.click();
+      document.body.removeChild(link);
+      window.URL.revokeObjectURL(url);
+    } catch (err) {
+      console.error('Error:', err);
+      alert(`Error al descargar la lista de picking: ${err.message}`);
+    }
+  };
+
+  const alternarSeleccion = (pedidoId) => {
+    setSeleccionados(prev => prev.includes(pedidoId)
+      ? prev.filter(id => id !== pedidoId)
+      : [...prev, pedidoId]);
+  };
+
   const actualizarCostoEnvio = async () => {
     try {
       const token = localStorage.getItem('token');
@@ -202,30 +419,68 @@ function PedidosAdmin() {
                 className={`btn ${filtroEstado === 'todos' ? 'btn-primary' : 'btn-outline-primary'}`}
                 onClick={() => setFiltroEstado('todos')}
               >
-                Todos ({pedidos.length})
+                Todos
               </button>
               <button
                 className={`btn ${filtroEstado === 'pendiente' ? 'btn-warning' : 'btn-outline-warning'}`}
                 onClick={() => setFiltroEstado('pendiente')}
               >
-                Pendientes ({pedidos.filter(p => p.estado === 'pendiente').length})
+                Pendientes ({conteos.pendiente || 0})
               </button>
               <button
                 className={`btn ${filtroEstado === 'entregado' ? 'btn-success' : 'btn-outline-success'}`}
                 onClick={() => setFiltroEstado('entregado')}
               >
-                Entregados ({pedidos.filter(p => p.estado === 'entregado').length})
+                Entregados ({conteos.entregado || 0})
               </button>
               <button
                 className={`btn ${filtroEstado === 'cancelado' ? 'btn-danger' : 'btn-outline-danger'}`}
                 onClick={() => setFiltroEstado('cancelado')}
               >
-                Cancelados ({pedidos.filter(p => p.estado === 'cancelado').length})
+                Cancelados ({conteos.cancelado || 0})
               </button>
             </div>
           </div>
         </div>
 
+        {/* Acciones en lote sobre la cola de pendientes */}
+        {filtroEstado === 'pendiente' && pedidosFiltrados.length > 0 && (
+          <div className="d-flex flex-wrap align-items-center gap-2 mb-3">
+            <button
+              className="btn btn-sm btn-outline-secondary"
+              onClick={() => setSeleccionados(
+                seleccionados.length === pedidosFiltrados.length ? [] : pedidosFiltrados.map(p => p.id)
+              )}
+            >
+              {seleccionados.length === pedidosFiltrados.length ? 'Quitar selección' : 'Seleccionar todos'}
+            </button>
+            <span className="text-muted">{seleccionados.length} seleccionados</span>
+            <button
+              className="btn btn-sm btn-success"
+              disabled={seleccionados.length === 0}
+              onClick={() => cambiarEstadoSeleccionados('entregado')}
+            >
+              <i className="bi bi-check-all me-1"></i>
+              Marcar entregados
+            </button>
+            <button
+              className="btn btn-sm btn-outline-danger"
+              disabled={seleccionados.length === 0}
+              onClick={() => cambiarEstadoSeleccionados('cancelado')}
+            >
+              <i className="bi bi-x-circle me-1"></i>
+              Cancelar
+            </button>
+            <button
+              className="btn btn-sm btn-outline-primary ms-auto"
+              onClick={descargarPicking}
+            >
+              <i className="bi bi-file-earmark-spreadsheet me-1"></i>
+              Lista de picking{seleccionados.length > 0 ? ` (${seleccionados.length})` : ''}
+            </button>
+          </div>
+        )}
+
         {/* Lista de Pedidos */}
         {pedidosFiltrados.length === 0 ? (
           <div className="text-center py-5">
@@ -242,6 +497,14 @@ function PedidosAdmin() {
                       {/* Info del Pedido */}
                       <div className="col-lg-3">
                         <h5 className="mb-2">
+                          {filtroEstado === 'pendiente' && (
+                            <input
+                              type="checkbox"
+                              className="form-check-input me-2"
+                              checked={seleccionados.includes(pedido.id)}
+                              onChange={() => alternarSeleccion(pedido.id)}
+                            />
+                          )}
                           <span className="badge bg-secondary me-2">#{pedido.id}</span>
                         </h5>
                         <p className="text-muted mb-1">
@@ -310,9 +573,15 @@ function PedidosAdmin() {
                           onChange={(e) => cambiarEstadoPedido(pedido.id, e.target.value)}
                           style={{ fontWeight: '600' }}
                         >
-                          <option value="pendiente">Pendiente</option>
-                          <option value="entregado">Entregado</option>
-                          <option value="cancelado">Cancelado</option>
+                          {['pendiente', 'entregado', 'cancelado'].map(estado => (
+                            <option
+                              key={estado}
+                              value={estado}
+                              disabled={estado !== pedido.estado && !(transiciones[pedido.estado] || []).includes(estado)}
+                            >
+                              {estado.charAt(0).toUpperCase() + estado.slice(1)}
+                            </option>
+                          ))}
                         </select>
                       </div>
 
@@ -64,20 +64,18 @@ function ProductosABMC() {
   const cargarDatos = async () => {
     setLoading(true);
     try {
-      const [prodRes, provRes, catRes, etiquetasRes, marcRes, unidRes] = await Promise.all([
+      // Toda la taxonomía llega en una sola respuesta cacheada
+      const [prodRes, bootstrapRes] = await Promise.all([
         axios.get('/api/productos'),
-        axios.get('/api/proveedores'),
-        axios.get('/api/categorias'),
-        axios.get('/api/etiquetas'),
-        axios.get('/api/marcas'),
-        axios.get('/api/unidades')
+        axios.get('/api/bootstrap')
       ]);
+      const taxonomia = bootstrapRes.data;
       setProductos(prodRes.data);
-      setProveedores(provRes.data);
-      setCategorias(catRes.data);
-      setEtiquetas(etiquetasRes.data);
-      setMarcas(marcRes.data);
-      setUnidades(unidRes.data);
+      setProveedores(taxonomia.proveedores);
+      setCategorias(taxonomia.categorias);
+      setEtiquetas(taxonomia.etiquetas);
+      setMarcas(taxonomia.marcas);
+      setUnidades(taxonomia.unidades);
     } catch (error) {
       console.error('Error cargando datos:', error);
     } finally {
@@ -1043,10 +1041,11 @@ function ProductosABMC() {
                       <div key={imagen.id} className="col-md-4 mb-3">
                         <div className="card">
                           <div className="position-relative">
-                            {(imagen.preview || (!imagen.es_url && imagen.imagen_base64)) ? (
+                            {(imagen.preview || (imagen.es_url && imagen.url) || imagen.imagen_base64) ? (
                               <img 
                                 src={
                                   imagen.preview || 
+                                  (imagen.es_url && imagen.url) ||
                                   `data:image/jpeg;base64,${imagen.imagen_base64}`
                                 } 
                                 className="card-img-top" 
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useState, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useCarrito } from '../../context/CarritoContext';
 import { useAuth } from '../../context/AuthContext';
@@ -8,8 +8,10 @@ import ModalFinalizarCompra from './ModalFinalizarCompra';
 function Carrito() {
   const navigate = useNavigate();
   const { user } = useAuth();
-  const { items, eliminarDelCarrito, actualizarCantidad, vaciarCarrito, finalizarPedido, obtenerTotal, setItems } = useCarrito();
+  const { items, eliminarDelCarrito, actualizarCantidad, actualizarGramos, vaciarCarrito, finalizarPedido, obtenerTotal } = useCarrito();
   const [showModal, setShowModal] = useState(false);
+  // Una clave por intento de compra: los reintentos y dobles clicks no duplican el pedido
+  const claveIdempotencia = useRef(null);
 
   const handleCantidadChange = (itemId, nuevaCantidad) => {
     const cantidad = parseInt(nuevaCantidad);
@@ -18,35 +20,8 @@ function Carrito() {
     }
   };
 
-    const handleCantidadGramosChange = (itemId, nuevaCantidadGramos) => {
-    const cantidadGramos = parseInt(nuevaCantidadGramos);
-    
-    // Validar cantidad mínima y múltiplos de 5
-    if (cantidadGramos < 25) return;
-    if (cantidadGramos % 5 !== 0) return;
-    
-    // Encontrar el item actual
-    const itemActual = items.find(i => i.id === itemId);
-    if (!itemActual || !itemActual.es_caso_2) return;
-    
-    const producto = itemActual.producto_original;
-    const nuevoPrecio = (producto?.precio_fraccionado_por_100 || 0) * cantidadGramos / 100;
-    const nuevoNombre = `${producto.nombre.split(' (')[0]} (${cantidadGramos}${itemActual.unidad_abrev || 'gr'})`;
-    
-    // Actualizar el item directamente
-    setItems(prevItems => 
-      prevItems.map(item => {
-        if (item.id === itemId) {
-          return {
-            ...item,
-            cantidad_personalizada: cantidadGramos,
-            precio: nuevoPrecio,
-            nombre: nuevoNombre
-          };
-        }
-        return item;
-      })
-    );
+  const handleCantidadGramosChange = (itemId, nuevaCantidadGramos) => {
+    actualizarGramos(itemId, parseInt(nuevaCantidadGramos));
   };
 
   const incrementarCantidad = (itemId, cantidadActual) => {
@@ -102,11 +77,18 @@ function Carrito() {
         return;
       }
 
+      if (!claveIdempotencia.current) {
+        claveIdempotencia.current = window.crypto?.randomUUID
+          ? window.crypto.randomUUID()
+          : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+      }
+
       const response = await fetch('http://localhost:5000/api/pedidos', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
-          'Authorization': `Bearer ${token}`
+          'Authorization': `Bearer ${token}`,
+          'Idempotency-Key': claveIdempotencia.current
         },
         body: JSON.stringify(pedidoData)
       });
@@ -117,7 +99,8 @@ function Carrito() {
         throw new Error(data.error || 'Error al crear el pedido');
       }
 
-      // Pedido creado exitosamente
+      // Pedido creado exitosamente: la próxima compra usa otra clave
+      claveIdempotencia.current = null;
       setShowModal(false);
       vaciarCarrito();
 
@@ -4,7 +4,8 @@ import { formatearPrecio } from '../../utils/formatoArgentino.jsx';
 function ModalFinalizarCompra({ show, onClose, onConfirm, total, items }) {
   const [tipoEntrega, setTipoEntrega] = useState('retiro');
   const [metodoPago, setMetodoPago] = useState('efectivo');
-  const [costoEnvio, setCostoEnvio] = useState(0);
+  // Cotización del servidor: precios vigentes, subtotal, envío y total
+  const [cotizacion, setCotizacion] = useState(null);
   
   // Datos para envío
   const [telefono, setTelefono] = useState('');
@@ -15,26 +16,45 @@ function ModalFinalizarCompra({ show, onClose, onConfirm, total, items }) {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
 
-  // Obtener el costo de envío desde el backend
+  // Cotizar el carrito en el servidor (un solo request) al abrir el modal
   useEffect(() => {
-    const fetchCostoEnvio = async () => {
+    if (!show || items.length === 0) return;
+    let cancelado = false;
+
+    const cotizarCarrito = async () => {
       try {
-        const response = await fetch('http://localhost:5000/api/pedidos/config/costo-envio');
+        const response = await fetch('http://localhost:5000/api/carrito/cotizar', {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({
+            items: items.map(item => ({
+              producto_id: item.producto_id || item.id,
+              cantidad: item.cantidad,
+              es_fraccionado: item.es_caso_2 || false,
+              cantidad_personalizada: item.cantidad_personalizada
+            }))
+          })
+        });
         const data = await response.json();
-        setCostoEnvio(data.costo_envio);
+        if (!response.ok) {
+          throw new Error(data.error || 'Error al cotizar el carrito');
+        }
+        if (!cancelado) setCotizacion(data);
       } catch (err) {
-        console.error('Error al obtener costo de envío:', err);
-        setCostoEnvio(500); // Valor por defecto
+        console.error('Error al cotizar el carrito:', err);
+        if (!cancelado) setCotizacion(null);
       }
     };
-    
-    if (show) {
-      fetchCostoEnvio();
-    }
-  }, [show]);
 
-  // Calcular el total con envío
-  const totalConEnvio = tipoEntrega === 'envio' ? total + costoEnvio : total;
+    cotizarCarrito();
+    return () => { cancelado = true; };
+  }, [show, items]);
+
+  // Mientras llega la cotización se muestra el total del carrito
+  const subtotal = cotizacion ? cotizacion.subtotal : total;
+  const costoEnvio = cotizacion ? cotizacion.costo_envio_domicilio : 0;
+  const totalConEnvio = tipoEntrega === 'envio' ? subtotal + costoEnvio : subtotal;
+  const problemas = cotizacion ? cotizacion.problemas : [];
 
   const handleSubmit = (e) => {
     e.preventDefault();
@@ -139,6 +159,14 @@ function ModalFinalizarCompra({ show, onClose, onConfirm, total, items }) {
               </div>
             )}
 
+            {problemas.length > 0 && (
+              <div className="alert alert-warning" role="alert">
+                <i className="bi bi-exclamation-circle me-2"></i>
+                Algunos productos ya no están disponibles y no se incluyen en el total:{' '}
+                {problemas.map(p => p.nombre || `#${p.producto_id}`).join(', ')}
+              </div>
+            )}
+
             <form onSubmit={handleSubmit}>
               {/* Tipo de Entrega */}
               <div className="mb-4">
@@ -341,7 +369,7 @@ function ModalFinalizarCompra({ show, onClose, onConfirm, total, items }) {
                 <div className="d-flex justify-content-between align-items-center mb-2">
                   <span style={{ fontSize: '1rem', color: '#4a5568' }}>Subtotal:</span>
                   <span className="fw-bold" style={{ fontSize: '1.1rem' }}>
-                    {formatearPrecio(total)}
+                    {formatearPrecio(subtotal)}
                   </span>
                 </div>
                 
@@ -40,25 +40,20 @@ function ProductoDetalle() {
         return;
       }
 
-      // Buscar producto por ID
-      const productosRes = await axios.get('/api/productos');
-      const productoEncontrado = productosRes.data.find(prod => prod.id === productoId);
-
-      if (!productoEncontrado) {
+      // Traer solo este producto (con todas sus imágenes) por su slug
+      let productoEncontrado;
+      try {
+        const productoRes = await axios.get(`/api/productos/slug/${nombreProducto}`);
+        productoEncontrado = productoRes.data;
+      } catch (error) {
         console.error('Producto no encontrado con ID:', productoId);
         navigate('/tienda');
         return;
       }
 
-      // Cargar imágenes del producto si no están incluidas
-      if (!productoEncontrado.imagenes || productoEncontrado.imagenes.length === 0) {
-        try {
-          const imagenesRes = await axios.get(`/api/productos/${productoEncontrado.id}/imagenes`);
-          productoEncontrado.imagenes = imagenesRes.data;
-        } catch (error) {
-          console.warn('No se pudieron cargar las imágenes:', error);
-          productoEncontrado.imagenes = [];
-        }
+      // Si el nombre o la marca cambiaron, corregir la URL al slug actual
+      if (productoEncontrado.slug && productoEncontrado.slug !== nombreProducto) {
+        navigate(`/producto/${productoEncontrado.slug}`, { replace: true });
       }
 
       setProducto(productoEncontrado);
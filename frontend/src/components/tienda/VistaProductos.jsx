@@ -32,38 +32,29 @@ function VistaProductos() {
 
   const cargarCategorias = () => {
     setCargando(true);
-    // Cargar todas las categorías con conteo de productos
+    // Categorías (taxonomía cacheada) y solo los primeros productos de cada una
     Promise.all([
       axios.get('/api/categorias'),
-      axios.get('/api/productos')
+      axios.get('/api/productos/por-categoria')
     ])
-    .then(([categoriasRes, productosRes]) => {
+    .then(([categoriasRes, porCategoriaRes]) => {
       const todasCategorias = categoriasRes.data;
-      const todosProductos = productosRes.data;
+      const vistasPrevias = new Map(porCategoriaRes.data.map(grupo => [grupo.id, grupo]));
       
-      // Contar productos por categoría
-      const categoriasConConteo = todasCategorias.map(categoria => {
-        const productosEnCategoria = todosProductos.filter(
-          producto => producto.categoria_id === categoria.id && producto.disponible
-        );
-        return {
-          ...categoria,
-          totalProductos: productosEnCategoria.length
-        };
-      });
+      // El backend ya trae el total de productos disponibles por categoría
+      const categoriasConConteo = todasCategorias.map(categoria => ({
+        ...categoria,
+        totalProductos: vistasPrevias.get(categoria.id)?.total_productos || 0
+      }));
       
-      // Organizar productos destacados por categoría (máximo 4 por categoría)
-      const productosDestacadosPorCategoria = todasCategorias.map(categoria => {
-        const productosEnCategoria = todosProductos
-          .filter(producto => producto.categoria_id === categoria.id && producto.disponible)
-          .slice(0, 4); // Solo los primeros 4
-        
-        return {
+      // Productos destacados por categoría (máximo 4, elegidos por el backend)
+      const productosDestacadosPorCategoria = todasCategorias
+        .filter(categoria => vistasPrevias.has(categoria.id))
+        .map(categoria => ({
           categoria,
-          productos: productosEnCategoria,
-          totalProductos: todosProductos.filter(p => p.categoria_id === categoria.id && p.disponible).length
-        };
-      }).filter(item => item.productos.length > 0); // Solo categorías con productos
+          productos: vistasPrevias.get(categoria.id).productos,
+          totalProductos: vistasPrevias.get(categoria.id).total_productos
+        }));
       
       setCategorias(categoriasConConteo);
       setProductosDestacados(productosDestacadosPorCategoria);
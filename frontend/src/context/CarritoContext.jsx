@@ -1,8 +1,47 @@
-import React, { createContext, useContext, useState, useEffect } from 'react';
+import React, { createContext, useContext, useState, useEffect, useRef } from 'react';
+import axios from 'axios';
 import { useAuth } from './AuthContext';
 
 const CarritoContext = createContext();
 
+// Clave de un ítem: un producto puede estar por unidad y fraccionado a la vez
+const claveItem = (item) => `${item.producto_id}_${item.es_caso_2 ? 'fraccionado' : 'unidad'}`;
+
+// Ítem en el formato del carrito guardado en el servidor (/api/carrito)
+const itemParaServidor = (item) => item.es_caso_2
+  ? { producto_id: item.producto_id, es_fraccionado: true, cantidad_personalizada: item.cantidad_personalizada }
+  : { producto_id: item.producto_id, cantidad: item.cantidad };
+
+// Línea cotizada por el servidor convertida a un ítem del carrito
+const itemDesdeServidor = (linea) => ({
+  id: claveItem({ producto_id: linea.producto_id, es_caso_2: linea.es_fraccionado }),
+  producto_id: linea.producto_id,
+  nombre: linea.nombre,
+  marca: linea.marca,
+  precio: linea.precio,
+  cantidad: linea.cantidad,
+  imagen: linea.imagen_principal,
+  es_caso_1: !linea.es_fraccionado,
+  es_caso_2: linea.es_fraccionado,
+  cantidad_personalizada: linea.cantidad_personalizada,
+  unidad_abrev: linea.unidad,
+  // Lo que se necesita del producto para recalcular al cambiar los gramos
+  producto_original: {
+    id: linea.producto_id,
+    nombre: linea.nombre.split(' (')[0],
+    precio_fraccionado_por_100: linea.precio_fraccionado_por_100
+  }
+});
+
+// Precio cada 100 gr/ml de un ítem fraccionado (los guardados antes no traen el producto)
+const precioPor100 = (item) => item.producto_original?.precio_fraccionado_por_100
+  || (item.cantidad_personalizada ? item.precio * 100 / item.cantidad_personalizada : 0);
+
+const headersAutenticacion = () => {
+  const token = localStorage.getItem('token');
+  return token ? { Authorization: `Bearer ${token}` } : null;
+};
+
 export const useCarrito = () => {
   const context = useContext(CarritoContext);
   if (!context) {
@@ -15,6 +54,10 @@ export const CarritoProvider = ({ children }) => {
   const [items, setItems] = useState([]);
   const { user, loading } = useAuth(); // Agregamos loading del AuthContext
   const [carritoInicializado, setCarritoInicializado] = useState(false);
+  // Último estado del carrito, para leerlo desde respuestas asíncronas
+  const itemsRef = useRef(items);
+  itemsRef.current = items;
+  const usuarioSincronizado = useRef(null);
 
   // Generar clave única para el carrito del usuario
   const getCarritoKey = () => {
@@ -151,11 +194,49 @@ export const CarritoProvider = ({ children }) => {
     console.log(`💾 Carrito guardado para ${user ? `usuario ${user.id}` : 'invitado'}:`, items);
   }, [items, user, carritoInicializado]);
 
+  // Al iniciar sesión, unir el carrito local con el guardado en el servidor (otros dispositivos)
+  useEffect(() => {
+    if (!user) {
+      usuarioSincronizado.current = null;
+      return;
+    }
+    if (!carritoInicializado || usuarioSincronizado.current === user.id) return;
+    usuarioSincronizado.current = user.id;
+
+    const headers = headersAutenticacion();
+    if (!headers) return;
+
+    axios.get('/api/carrito', { headers })
+      .then(res => {
+        const servidor = res.data.items.map(itemDesdeServidor);
+        const claves = new Set(servidor.map(claveItem));
+        const soloLocales = itemsRef.current.filter(item => !claves.has(claveItem(item)));
+
+        // Lo que solo estaba en este navegador se sube en un solo request
+        if (soloLocales.length > 0) {
+          axios.post('/api/carrito/items', { items: soloLocales.map(itemParaServidor) }, { headers })
+            .catch(error => console.error('Error subiendo el carrito local:', error));
+        }
+        setItems([...servidor, ...soloLocales]);
+        console.log(`☁️ Carrito sincronizado con el servidor: ${servidor.length} guardados, ${soloLocales.length} locales`);
+      })
+      .catch(error => console.error('Error cargando el carrito guardado:', error));
+  }, [user, carritoInicializado]);
+
+  // Replicar un cambio en el carrito guardado del servidor (solo usuarios logueados)
+  const sincronizar = (peticion) => {
+    if (!user) return;
+    const headers = headersAutenticacion();
+    if (!headers) return;
+    peticion(headers).catch(error => console.error('Error sincronizando el carrito:', error));
+  };
+
   // Limpiar carrito del usuario actual
   const vaciarCarrito = () => {
     setItems([]);
     const carritoKey = getCarritoKey();
     localStorage.removeItem(carritoKey);
+    sincronizar(headers => axios.delete('/api/carrito', { headers }));
     console.log(`🗑️ Carrito vaciado para ${user ? `usuario ${user.id}` : 'invitado'}`);
   };
 
@@ -189,7 +270,7 @@ export const CarritoProvider = ({ children }) => {
           // Para Caso 2: Agregar la cantidad de gramos a la cantidad personalizada existente
           const itemExistente = itemsActualizados[indiceExistente];
           const nuevaCantidadGramos = itemExistente.cantidad_personalizada + producto.cantidad_personalizada;
-          const nuevoPrecio = (producto.producto_original?.precio_fraccionado_por_100 || itemExistente.producto_original?.precio_fraccionado_por_100) * nuevaCantidadGramos / 100;
+          const nuevoPrecio = (producto.producto_original?.precio_fraccionado_por_100 || precioPor100(itemExistente)) * nuevaCantidadGramos / 100;
           
           itemsActualizados[indiceExistente] = {
             ...itemExistente,
@@ -232,10 +313,24 @@ export const CarritoProvider = ({ children }) => {
       
       return itemsActualizados;
     });
+
+    // En el servidor se suma a lo que ya había, igual que acá
+    sincronizar(headers => axios.post('/api/carrito/items', producto.es_caso_2
+      ? { producto_id: producto.id, es_fraccionado: true, cantidad_personalizada: producto.cantidad_personalizada }
+      : { producto_id: producto.id, cantidad: 1 },
+      { headers }
+    ));
   };
 
   const eliminarDelCarrito = (itemId) => {
+    const item = items.find(i => i.id === itemId);
     setItems(prevItems => prevItems.filter(item => item.id !== itemId));
+    if (item) {
+      sincronizar(headers => axios.delete(
+        `/api/carrito/items/${item.producto_id}?es_fraccionado=${item.es_caso_2 ? 'true' : 'false'}`,
+        { headers }
+      ));
+    }
   };
 
   const actualizarCantidad = (itemId, nuevaCantidad) => {
@@ -244,6 +339,11 @@ export const CarritoProvider = ({ children }) => {
       return;
     }
     
+    const item = items.find(i => i.id === itemId);
+    if (item && !item.es_caso_2) {
+      sincronizar(headers => axios.put(`/api/carrito/items/${item.producto_id}`, { cantidad: nuevaCantidad }, { headers }));
+    }
+    
     setItems(prevItems => 
       prevItems.map(item => 
         item.id === itemId 
@@ -253,6 +353,31 @@ export const CarritoProvider = ({ children }) => {
     );
   };
 
+  // Cambiar los gramos/ml de un ítem fraccionado (mínimo 25, en múltiplos de 5)
+  const actualizarGramos = (itemId, cantidadGramos) => {
+    if (cantidadGramos < 25 || cantidadGramos % 5 !== 0) return;
+
+    const item = items.find(i => i.id === itemId);
+    if (!item || !item.es_caso_2) return;
+
+    const nombreBase = item.producto_original?.nombre?.split(' (')[0] || item.nombre.split(' (')[0];
+    setItems(prevItems =>
+      prevItems.map(actual => actual.id === itemId
+        ? {
+            ...actual,
+            cantidad_personalizada: cantidadGramos,
+            precio: precioPor100(actual) * cantidadGramos / 100,
+            nombre: `${nombreBase} (${cantidadGramos}${actual.unidad_abrev || 'gr'})`
+          }
+        : actual)
+    );
+    sincronizar(headers => axios.put(
+      `/api/carrito/items/${item.producto_id}`,
+      { es_fraccionado: true, cantidad_personalizada: cantidadGramos },
+      { headers }
+    ));
+  };
+
   const obtenerTotal = () => {
     return items.reduce((total, item) => {
       if (item.es_caso_2) {
@@ -292,6 +417,7 @@ export const CarritoProvider = ({ children }) => {
     agregarAlCarrito,
     eliminarDelCarrito,
     actualizarCantidad,
+    actualizarGramos,
     vaciarCarrito,
     finalizarPedido,
     obtenerTotal,
@@ -1,4 +1,4 @@
-import React, { createContext, useContext, useState, useEffect } from 'react';
+import React, { createContext, useContext, useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import { useAuth } from './AuthContext';
 
@@ -14,19 +14,52 @@ export const useWishlist = () => {
 
 export const WishlistProvider = ({ children }) => {
   const [wishlistItems, setWishlistItems] = useState([]);
+  // Set de ids para que cada WishlistButton consulte la membresía sin hacer requests
+  const [idsWishlist, setIdsWishlist] = useState(new Set());
+  const etagIdsRef = useRef(null);
   const [loading, setLoading] = useState(false);
   const { isAuthenticated, user } = useAuth();
 
   // Cargar wishlist cuando el usuario se autentica
   useEffect(() => {
     if (isAuthenticated && user) {
+      cargarIdsWishlist();
       cargarWishlist();
     } else {
       // Limpiar wishlist cuando no está autenticado
       setWishlistItems([]);
+      setIdsWishlist(new Set());
+      etagIdsRef.current = null;
     }
   }, [isAuthenticated, user]);
 
+  const actualizarMembresia = (data, etag) => {
+    setIdsWishlist(new Set(data.ids));
+    etagIdsRef.current = etag || null;
+  };
+
+  const cargarIdsWishlist = async () => {
+    const token = localStorage.getItem('token');
+    if (!token) return;
+
+    try {
+      const headers = { Authorization: `Bearer ${token}` };
+      if (etagIdsRef.current) {
+        headers['If-None-Match'] = etagIdsRef.current;
+      }
+      const response = await axios.get('/api/wishlist/ids', {
+        headers,
+        validateStatus: (status) => status === 200 || status === 304
+      });
+      // 304: la membresía no cambió desde la última carga
+      if (response.status === 200) {
+        actualizarMembresia(response.data, response.headers.etag);
+      }
+    } catch (error) {
+      console.error('❌ WishlistContext: Error al cargar ids de wishlist:', error.response?.status);
+    }
+  };
+
   const cargarWishlist = async () => {
     if (!isAuthenticated) {
       console.log('🔍 WishlistContext: Usuario no autenticado, saltando carga');
@@ -75,6 +108,9 @@ export const WishlistProvider = ({ children }) => {
         }
       });
       
+      setIdsWishlist(prev => new Set(prev).add(productoId));
+      etagIdsRef.current = null;
+
       // Recargar wishlist para obtener datos actualizados
       await cargarWishlist();
       
@@ -102,6 +138,12 @@ export const WishlistProvider = ({ children }) => {
       
       // Actualizar estado local inmediatamente
       setWishlistItems(prev => prev.filter(item => item.id !== productoId));
+      setIdsWishlist(prev => {
+        const nuevos = new Set(prev);
+        nuevos.delete(productoId);
+        return nuevos;
+      });
+      etagIdsRef.current = null;
       
     } catch (error) {
       console.error('Error al remover de wishlist:', error);
@@ -112,7 +154,36 @@ export const WishlistProvider = ({ children }) => {
   };
 
   const estaEnWishlist = (productoId) => {
-    return wishlistItems.some(item => item.id === productoId);
+    return idsWishlist.has(productoId);
+  };
+
+  const agregarVariosAWishlist = async (productoIds) => {
+    const token = localStorage.getItem('token');
+    if (!isAuthenticated || !token) {
+      throw new Error('Debes iniciar sesión para agregar productos a tu wishlist');
+    }
+
+    const response = await axios.post('/api/wishlist/bulk', {
+      producto_ids: productoIds
+    }, {
+      headers: { Authorization: `Bearer ${token}` }
+    });
+    actualizarMembresia(response.data, response.headers.etag);
+    await cargarWishlist();
+    return response.data;
+  };
+
+  const removerVariosDeWishlist = async (productoIds) => {
+    const token = localStorage.getItem('token');
+    if (!isAuthenticated || !token) return;
+
+    const response = await axios.delete('/api/wishlist/bulk', {
+      data: { producto_ids: productoIds },
+      headers: { Authorization: `Bearer ${token}` }
+    });
+    actualizarMembresia(response.data, response.headers.etag);
+    setWishlistItems(prev => prev.filter(item => !productoIds.includes(item.id)));
+    return response.data;
   };
 
   const toggleWishlist = async (producto) => {
@@ -131,6 +202,8 @@ export const WishlistProvider = ({ children }) => {
 
   const limpiarWishlist = () => {
     setWishlistItems([]);
+    setIdsWishlist(new Set());
+    etagIdsRef.current = null;
   };
 
   const obtenerCount = () => {
@@ -148,6 +221,9 @@ export const WishlistProvider = ({ children }) => {
     removerDeWishlist,
     estaEnWishlist,
     toggleWishlist,
+    agregarVariosAWishlist,
+    removerVariosDeWishlist,
+    cargarIdsWishlist,
     limpiarWishlist,
     cargarWishlist,
     obtenerCount,